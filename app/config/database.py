@@ -1,12 +1,19 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Connection, Engine, ExceptionContext, make_url
+from sqlalchemy.exc import DBAPIError, OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
 from decouple import config
-import logging
-from typing import Generator
-
-# Configuración de logging
-logging.basicConfig()
-logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
+from app.config.logging_config import configure_sql_logging
+from app.utils.cache import TTLCache
+from app.utils.metrics import Counter, instrument_engine
+from app.utils.resilience import CircuitBreaker, DatabaseUnavailableError
+from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Dict, Generator, Iterator, List, Optional, Set
+import asyncio
+import itertools
+import threading
+import time
 
 # URL de la base de datos desde variables de entorno con manejo de tipos
 _database_url = config("DATABASE_URL")
@@ -15,16 +22,318 @@ if not _database_url:
 
 DATABASE_URL: str = str(_database_url)
 
+# Modo asíncrono (AsyncSession + driver asyncmy/aiomysql) seleccionable por configuración
+DB_ASYNC: bool = config("DB_ASYNC", default=False, cast=bool)
+
+# Drivers síncronos y su equivalente asíncrono
+_ASYNC_DRIVERS = {
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def _to_async_url(url: str) -> str:
+    """Convertir la URL síncrona en su equivalente con driver asíncrono"""
+    scheme, separator, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+ASYNC_DATABASE_URL: str = str(config("ASYNC_DATABASE_URL", default=_to_async_url(DATABASE_URL)))
+
+def _url_list(value: str) -> List[str]:
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+# Réplicas de solo lectura (lista separada por comas; vacía = todo va al primario)
+DB_REPLICA_URLS: List[str] = _url_list(str(config("DB_REPLICA_URLS", default="")))
+# Tiempo que una réplica queda fuera de la rotación después de un error de conexión
+DB_REPLICA_COOLDOWN_SECONDS: float = config("DB_REPLICA_COOLDOWN_SECONDS", default=30, cast=float)
+# Ventana tras una escritura en la que las lecturas de ese usuario van al primario
+# (debe cubrir el retraso de replicación)
+DB_READ_YOUR_WRITES_SECONDS: float = config("DB_READ_YOUR_WRITES_SECONDS", default=5, cast=float)
+
+# Configuración del pool de conexiones
+DB_POOL_SIZE: int = config("DB_POOL_SIZE", default=5, cast=int)
+DB_MAX_OVERFLOW: int = config("DB_MAX_OVERFLOW", default=10, cast=int)
+DB_POOL_TIMEOUT: float = config("DB_POOL_TIMEOUT", default=30, cast=float)
+DB_POOL_RECYCLE: int = config("DB_POOL_RECYCLE", default=300, cast=int)
+# pessimistic: ping en cada checkout (un round trip extra)
+# optimistic: sin ping; las conexiones caídas se invalidan al fallar y se reciclan por edad
+DB_PRE_PING: str = str(config("DB_PRE_PING", default="pessimistic")).lower()
+# Conexiones que se abren al arrancar, antes de recibir tráfico
+DB_POOL_WARMUP: int = config("DB_POOL_WARMUP", default=0, cast=int)
+# Cada cuánto se vuelve a consultar la base para /health/ready
+DB_HEALTH_CACHE_SECONDS: float = config("DB_HEALTH_CACHE_SECONDS", default=5, cast=float)
+DB_HEALTH_TIMEOUT_SECONDS: float = config("DB_HEALTH_TIMEOUT_SECONDS", default=2, cast=float)
+# Chequeo de la base al arrancar: intentos, timeout de cada uno y espera inicial entre
+# intentos (se duplica en cada reintento)
+DB_STARTUP_ATTEMPTS: int = config("DB_STARTUP_ATTEMPTS", default=5, cast=int)
+DB_STARTUP_TIMEOUT_SECONDS: float = config("DB_STARTUP_TIMEOUT_SECONDS", default=5, cast=float)
+DB_STARTUP_BACKOFF_SECONDS: float = config("DB_STARTUP_BACKOFF_SECONDS", default=0.5, cast=float)
+
+# Circuit breaker del primario: fallos de conexión seguidos para abrirlo, segundos que queda
+# abierto (respondiendo 503 sin tocar el pool) y peticiones de prueba en medio abierto
+DB_BREAKER_FAILURE_THRESHOLD: int = config("DB_BREAKER_FAILURE_THRESHOLD", default=5, cast=int)
+DB_BREAKER_RESET_SECONDS: float = config("DB_BREAKER_RESET_SECONDS", default=10, cast=float)
+DB_BREAKER_HALF_OPEN_MAX: int = config("DB_BREAKER_HALF_OPEN_MAX", default=1, cast=int)
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    """Opciones del motor; SQLite (pruebas locales) no usa el dimensionamiento del pool"""
+    options: Dict[str, Any] = {
+        "pool_pre_ping": DB_PRE_PING == "pessimistic",
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    return options
+
+db_breaker = CircuitBreaker(DB_BREAKER_FAILURE_THRESHOLD, DB_BREAKER_RESET_SECONDS, DB_BREAKER_HALF_OPEN_MAX)
+
+# Motores que alimentan el breaker (el primario, síncrono y asíncrono)
+_breaker_engines: Set[Engine] = set()
+
+def guard_engine(target: Engine) -> None:
+    """Alimentar el circuit breaker con las desconexiones y los éxitos del motor"""
+    _breaker_engines.add(target)
+
+    @event.listens_for(target, "handle_error")
+    def _on_error(context: ExceptionContext) -> None:
+        # Solo una desconexión dice que la base no está disponible; un OperationalError
+        # puede ser un lock o un deadlock de una sola consulta
+        if context.is_disconnect:
+            db_breaker.record_failure()
+
+    @event.listens_for(target, "after_cursor_execute")
+    def _on_success(*args: Any) -> None:
+        db_breaker.record_success()
+
+def _connection_error(error: DBAPIError) -> bool:
+    """Error del servidor o conexión perdida (que no siempre llega como OperationalError)"""
+    return isinstance(error, OperationalError) or error.connection_invalidated
+
+@contextmanager
+def _unavailable_on_error(count_pool_timeout: bool) -> Iterator[None]:
+    """Convertir un error de conexión o un timeout del pool en 503 (DatabaseUnavailableError)"""
+    try:
+        yield
+    except PoolTimeoutError as e:
+        # Pool agotado: la base no da abasto, cuenta como fallo
+        if count_pool_timeout:
+            db_breaker.record_failure()
+        raise DatabaseUnavailableError(DB_BREAKER_RESET_SECONDS) from e
+    except DBAPIError as e:
+        if _connection_error(e):
+            raise DatabaseUnavailableError(DB_BREAKER_RESET_SECONDS) from e
+        raise
+
+@contextmanager
+def guarded_connection(target: Engine, begin: bool = False) -> Iterator[Connection]:
+    """
+    engine.connect() (o engine.begin() con begin=True) para los servicios que usan el motor
+    sin sesión: pasa por el circuit breaker si el motor lo alimenta y responde 503 ante un
+    error de conexión, igual que GuardedSession
+    """
+    guarded = target in _breaker_engines
+    trial = db_breaker.acquire() if guarded else False
+    try:
+        with _unavailable_on_error(count_pool_timeout=guarded):
+            with (target.begin() if begin else target.connect()) as connection:
+                yield connection
+    finally:
+        db_breaker.release(trial)
+
+class GuardedSession(Session):
+    """
+    Sesión protegida por el circuit breaker: con el circuito abierto, la primera consulta
+    al primario responde 503 sin esperar al pool, y un error de conexión o un timeout
+    del pool se convierte en 503 (DatabaseUnavailableError) en lugar de un 500.
+    """
+
+    def _on_primary(self) -> bool:
+        return True
+
+    def execute(self, *args: Any, **kwargs: Any) -> Any:
+        if not self._on_primary():
+            return super().execute(*args, **kwargs)
+        if "breaker_trial" not in self.info:
+            self.info["breaker_trial"] = db_breaker.acquire()
+        with _unavailable_on_error(count_pool_timeout=True):
+            return super().execute(*args, **kwargs)
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            db_breaker.release(self.info.pop("breaker_trial", False))
+
 # Crear el motor de la base de datos
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,  # Para ver las consultas SQL en desarrollo
-    pool_pre_ping=True,  # Verificar conexiones antes de usar
-    pool_recycle=300  # Reciclar conexiones cada 5 minutos
-)
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+instrument_engine(engine, "primary")
+# Log de SQL muestreado/estructurado y de consultas lentas (reemplaza echo=True)
+configure_sql_logging(engine, "primary")
+guard_engine(engine)
 
 # Crear la sesión
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=GuardedSession, autocommit=False, autoflush=False, bind=engine)
+
+# Motor y sesión asíncronos (solo se crean si DB_ASYNC está activo, así el driver es opcional)
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+    instrument_engine(async_engine.sync_engine, "primary_async")
+    configure_sql_logging(async_engine.sync_engine, "primary_async")
+    guard_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False, sync_session_class=GuardedSession
+    )
+
+DB_REPLICA_FALLBACKS = Counter(
+    "db_replica_fallbacks_total", "Lecturas reintentadas en el primario por una réplica caída", ["replica"]
+)
+
+class Replica:
+    def __init__(self, name: str, engine: Engine) -> None:
+        self.name = name
+        self.engine = engine
+        self.unhealthy_until = 0.0
+        self.failures = 0
+
+class ReplicaRouter:
+    """Reparte las lecturas entre réplicas en round-robin, saltando las marcadas como caídas"""
+
+    def __init__(self, replicas: List[Replica], cooldown: float) -> None:
+        self.replicas = replicas
+        self.cooldown = cooldown
+        self._cycle = itertools.cycle(replicas) if replicas else None
+        self._lock = threading.Lock()
+
+    def pick(self) -> Optional[Replica]:
+        """Siguiente réplica sana; None si no hay (se usa el primario)"""
+        if self._cycle is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                replica = next(self._cycle)
+                if replica.unhealthy_until <= now:
+                    return replica
+        return None
+
+    def mark_failed(self, replica: Replica) -> None:
+        replica.failures += 1
+        replica.unhealthy_until = time.monotonic() + self.cooldown
+        DB_REPLICA_FALLBACKS.inc(replica=replica.name)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "name": replica.name,
+                "healthy": replica.unhealthy_until <= now,
+                "failures": replica.failures,
+                "pool": pool_status(replica.engine),
+            }
+            for replica in self.replicas
+        ]
+
+class RoutingSession(GuardedSession):
+    """
+    Sesión de solo lectura: cada sesión usa una réplica (elegida al primer acceso) salvo que
+    se haya pedido el primario (use_primary) o que haya escrituras pendientes de flush.
+    Si la réplica falla por conexión o su pool se agota, la marca como caída y repite la
+    lectura en el primario.
+    El circuit breaker solo aplica a las lecturas que van al primario.
+    """
+
+    def __init__(self, *args: Any, router: ReplicaRouter, primary: Engine, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.router = router
+        self.primary = primary
+        self._replica: Optional[Replica] = None
+        self._replica_chosen = False
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kwargs: Any) -> Engine:
+        if self.info.get("use_primary") or self._flushing:
+            return self.primary
+        if not self._replica_chosen:
+            self._replica = self.router.pick()
+            self._replica_chosen = True
+        return self._replica.engine if self._replica is not None else self.primary
+
+    def _on_primary(self) -> bool:
+        return self.get_bind() is self.primary
+
+    def execute(self, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return super().execute(*args, **kwargs)
+        except (DBAPIError, PoolTimeoutError) as e:
+            # Conexión perdida o pool de la réplica agotado: la lectura se repite en el primario
+            replica = self._replica
+            if isinstance(e, DBAPIError) and not _connection_error(e):
+                raise
+            if replica is None or self.info.get("use_primary"):
+                raise
+            self.router.mark_failed(replica)
+            self.rollback()
+            self.info["use_primary"] = True
+            return super().execute(*args, **kwargs)
+
+def _create_replica(index: int, url: str, create: Any) -> Replica:
+    name = f"replica{index}"
+    replica_engine = create(url, **_engine_options(url))
+    sync_engine = getattr(replica_engine, "sync_engine", replica_engine)
+    instrument_engine(sync_engine, name)
+    configure_sql_logging(sync_engine, name)
+    return Replica(name, sync_engine)
+
+replica_router = ReplicaRouter(
+    [_create_replica(index, url, create_engine) for index, url in enumerate(DB_REPLICA_URLS, start=1)],
+    DB_REPLICA_COOLDOWN_SECONDS,
+)
+ReadSessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False,
+    router=replica_router, primary=engine,
+)
+
+async_replica_router: Optional[ReplicaRouter] = None
+AsyncReadSessionLocal = None
+
+if DB_ASYNC and async_engine is not None:
+    async_replica_router = ReplicaRouter(
+        [
+            _create_replica(index, _to_async_url(url), create_async_engine)
+            for index, url in enumerate(DB_REPLICA_URLS, start=1)
+        ],
+        DB_REPLICA_COOLDOWN_SECONDS,
+    )
+    # AsyncSession delega en una Session síncrona: el enrutamiento es el mismo
+    AsyncReadSessionLocal = async_sessionmaker(
+        autoflush=False, expire_on_commit=False, sync_session_class=RoutingSession,
+        router=async_replica_router, primary=async_engine.sync_engine,
+    )
+
+# Usuarios que escribieron hace poco: sus lecturas van al primario (lectura de lo propio escrito).
+# El registro es por proceso: solo cubre las peticiones que atiende el mismo worker que hizo
+# la escritura. Con varios workers, otro worker puede leer de la réplica un dato anterior
+# mientras dure el retraso de replicación.
+_recent_writes = TTLCache(10000, DB_READ_YOUR_WRITES_SECONDS)
+
+def mark_write(id_usuario: int) -> None:
+    """Registrar que el usuario acaba de escribir (p. ej. cambio de contraseña)"""
+    _recent_writes.set(id_usuario, True)
+
+def route_reads_for(db: Any, id_usuario: Optional[int]) -> None:
+    """Enviar las lecturas de la sesión al primario si el usuario escribió hace poco"""
+    if id_usuario is not None and _recent_writes.get(id_usuario):
+        db.info["use_primary"] = True
 
 # Base para los modelos
 Base = declarative_base()
@@ -37,6 +346,32 @@ def get_db() -> Generator:
     finally:
         db.close()
 
+# Dependencia para obtener la sesión asíncrona de la base de datos
+async def get_async_db() -> AsyncGenerator:
+    if AsyncSessionLocal is None:
+        raise RuntimeError("DB_ASYNC no está activo: no hay motor asíncrono configurado")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependencia de sesión según el modo configurado (síncrono o asíncrono)
+get_session = get_async_db if DB_ASYNC else get_db
+
+# Dependencias de solo lectura: réplicas si hay configuradas, si no el primario
+def get_read_db() -> Generator:
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db() -> AsyncGenerator:
+    if AsyncReadSessionLocal is None:
+        raise RuntimeError("DB_ASYNC no está activo: no hay motor asíncrono configurado")
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+get_read_session = get_async_read_db if DB_ASYNC else get_read_db
+
 # Función para probar la conexión
 def test_connection() -> bool:
     try:
@@ -46,4 +381,132 @@ def test_connection() -> bool:
             return True
     except Exception as e:
         print(f"❌ Error conectando a la base de datos: {e}")
-        return False
\ No newline at end of file
+        return False
+
+# Función para probar la conexión asíncrona
+async def test_async_connection() -> bool:
+    if async_engine is None:
+        return False
+    try:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            print("✅ Conexión asíncrona a la base de datos exitosa")
+            return True
+    except Exception as e:
+        print(f"❌ Error conectando a la base de datos (async): {e}")
+        return False
+
+async def ping_database() -> None:
+    """SELECT 1 en el primario (motor asíncrono si está activo, si no en un hilo)"""
+    if async_engine is not None:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    else:
+        await asyncio.to_thread(_ping_sync)
+
+def _ping_sync() -> None:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+async def wait_for_database(
+    attempts: int = DB_STARTUP_ATTEMPTS,
+    timeout: float = DB_STARTUP_TIMEOUT_SECONDS,
+    backoff: float = DB_STARTUP_BACKOFF_SECONDS
+) -> bool:
+    """Probar la conexión al arrancar con timeout y reintentos (la base puede levantar después)"""
+    for attempt in range(1, attempts + 1):
+        try:
+            await asyncio.wait_for(ping_database(), timeout=timeout)
+            print("✅ Conexión a la base de datos exitosa")
+            return True
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            print(f"❌ Error conectando a la base de datos (intento {attempt}/{attempts}): {error}")
+            if attempt < attempts:
+                await asyncio.sleep(backoff * 2 ** (attempt - 1))
+    return False
+
+async def dispose_engines() -> None:
+    """Cerrar las conexiones de todos los pools (primario y réplicas) al detener la app"""
+    engine.dispose()
+    for replica in replica_router.replicas:
+        replica.engine.dispose()
+    if async_engine is not None:
+        from sqlalchemy.ext.asyncio import AsyncEngine
+
+        await async_engine.dispose()
+        for replica in async_replica_router.replicas if async_replica_router is not None else []:
+            # Las réplicas asíncronas guardan el motor síncrono interno
+            await AsyncEngine(replica.engine).dispose()
+
+# Abrir conexiones del pool antes de recibir tráfico
+def warm_up_pool(connections: int = DB_POOL_WARMUP) -> int:
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+async def warm_up_async_pool(connections: int = DB_POOL_WARMUP) -> int:
+    if async_engine is None:
+        return 0
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(await async_engine.connect())
+    finally:
+        for connection in opened:
+            await connection.close()
+    return len(opened)
+
+def pool_status(target: Optional[Engine] = None) -> Dict[str, Any]:
+    """Uso del pool: conexiones en uso, overflow y saturación (0 a 1)"""
+    pool = (target or (async_engine.sync_engine if async_engine is not None else engine)).pool
+    status: Dict[str, Any] = {"pool": type(pool).__name__}
+    # QueuePool y AsyncAdaptedQueuePool; los de SQLite en memoria o NullPool no tienen tamaño
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        status.update(
+            size=pool.size(),
+            checked_out=checked_out,
+            overflow=max(pool.overflow(), 0),
+            capacity=capacity,
+            saturation=round(checked_out / capacity, 3) if capacity else 0.0,
+        )
+    return status
+
+class DatabaseProbe:
+    """Chequeo de la base con resultado en caché: como máximo una consulta cada `interval` segundos"""
+
+    def __init__(self, interval: float, timeout: float) -> None:
+        self.interval = interval
+        self.timeout = timeout
+        self._checked_at = 0.0
+        self._result: Dict[str, Any] = {"reachable": False, "error": "sin verificar"}
+        self._lock = asyncio.Lock()
+
+    async def check(self) -> Dict[str, Any]:
+        if time.monotonic() - self._checked_at < self.interval:
+            return self._result
+        # Solo un chequeo en vuelo; el resto reutiliza el último resultado
+        if self._lock.locked():
+            return self._result
+        async with self._lock:
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(ping_database(), timeout=self.timeout)
+                self._result = {
+                    "reachable": True,
+                    "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+                }
+            except Exception as e:
+                self._result = {"reachable": False, "error": type(e).__name__}
+            self._checked_at = time.monotonic()
+            self._result["checked_at"] = time.time()
+        return self._result
+
+db_probe = DatabaseProbe(DB_HEALTH_CACHE_SECONDS, DB_HEALTH_TIMEOUT_SECONDS)
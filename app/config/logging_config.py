@@ -0,0 +1,153 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from decouple import config
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+from app.utils.request_context import current_route
+from app.utils.metrics import Gauge
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import time
+
+# Modo de log de SQL: off (nada), sampled (una fracción de las consultas) o full (todas)
+SQL_LOG_MODE: str = str(config("SQL_LOG_MODE", default="off")).lower()
+SQL_LOG_SAMPLE_RATE: float = config("SQL_LOG_SAMPLE_RATE", default=0.01, cast=float)
+# Los parámetros pueden contener datos personales (usernames): solo si se pide explícitamente
+SQL_LOG_PARAMETERS: bool = config("SQL_LOG_PARAMETERS", default=False, cast=bool)
+# Umbral del log de consultas lentas en milisegundos (0 lo desactiva)
+SLOW_QUERY_MS: float = config("SLOW_QUERY_MS", default=200, cast=float)
+LOG_QUEUE_SIZE: int = config("LOG_QUEUE_SIZE", default=10000, cast=int)
+
+sql_logger = logging.getLogger("app.sql")
+slow_query_logger = logging.getLogger("app.slow_query")
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos estructurados de record.data"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data = getattr(record, "data", None)
+        if data:
+            entry.update(data)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler que nunca bloquea: si la cola está llena descarta el registro"""
+
+    def __init__(self, log_queue: "queue.Queue[Any]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # El formateo se hace en el hilo del listener, no en el de la petición
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_log_queue: "queue.Queue[Any]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+queue_handler = DroppingQueueHandler(_log_queue)
+
+LOG_RECORDS_DROPPED = Gauge("log_records_dropped", "Registros de log descartados por cola llena")
+LOG_RECORDS_DROPPED.set_function(lambda: float(queue_handler.dropped))
+_listener: Optional[QueueListener] = None
+
+def start_logging() -> None:
+    """Conectar los loggers estructurados a la cola y arrancar el hilo escritor"""
+    global _listener
+    if _listener is not None:
+        return
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(JsonFormatter())
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=False)
+    _listener.start()
+    for logger in (sql_logger, slow_query_logger):
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if queue_handler not in logger.handlers:
+            logger.addHandler(queue_handler)
+
+def stop_logging() -> None:
+    """Vaciar la cola y detener el hilo escritor"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def _restart_after_fork() -> None:
+    """
+    Los hilos no sobreviven a fork (workers de `serve --preload`): cada worker arranca su
+    propio escritor con una cola nueva
+    """
+    global _listener
+    if _listener is None:
+        return
+    _listener = None
+    queue_handler.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    start_logging()
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+_WHITESPACE = re.compile(r"\s+")
+
+@lru_cache(maxsize=256)
+def _compact(statement: str) -> str:
+    return _WHITESPACE.sub(" ", statement).strip()
+
+def _should_log_statement() -> bool:
+    if SQL_LOG_MODE == "full":
+        return True
+    if SQL_LOG_MODE == "sampled":
+        return random.random() < SQL_LOG_SAMPLE_RATE
+    return False
+
+def configure_sql_logging(engine: Engine, name: str) -> None:
+    """Registrar el log de SQL (según SQL_LOG_MODE) y el de consultas lentas en el motor"""
+    if SQL_LOG_MODE == "off" and SLOW_QUERY_MS <= 0:
+        return
+    start_logging()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        conn.info.setdefault("sql_log_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        duration_ms = (time.perf_counter() - conn.info["sql_log_start_time"].pop()) * 1000
+        slow = SLOW_QUERY_MS > 0 and duration_ms >= SLOW_QUERY_MS
+        if not slow and not _should_log_statement():
+            return
+        data: Dict[str, Any] = {
+            "engine": name,
+            "route": current_route.get(),
+            "duration_ms": round(duration_ms, 3),
+            "statement": _compact(statement),
+        }
+        if SQL_LOG_PARAMETERS:
+            data["parameters"] = parameters
+        if slow:
+            slow_query_logger.warning("slow_query", extra={"data": data})
+        else:
+            sql_logger.info("sql", extra={"data": data})
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context: Any) -> None:
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("sql_log_start_time"):
+            conn.info["sql_log_start_time"].pop()
@@ -0,0 +1,289 @@
+"""
+Migraciones del esquema de autenticación y verificación de planes de consulta.
+
+Uso:
+    python -m app.config.migrations status    # migraciones aplicadas y pendientes
+    python -m app.config.migrations upgrade   # aplicar las pendientes
+    python -m app.config.migrations explain   # EXPLAIN de las consultas de auth (sale con 1 si hay full scans)
+
+Las tablas de un almacén en otra base (REFRESH_TOKEN_STORE_URL, LOGIN_AUDIT_STORE_URL) se
+crean allí aplicando solo su migración:
+    python -m app.config.migrations upgrade 0005_refresh_tokens --database-url <url>
+"""
+from sqlalchemy import Column, Index, Table, create_engine, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn
+from app.config.schema import (
+    administrador,
+    ix_usuarios_login,
+    ix_veterinario_especialidad,
+    login_audit,
+    login_stats,
+    recepcionista,
+    refresh_tokens,
+    revoked_tokens,
+    schema_migrations,
+    usuarios,
+    veterinario,
+)
+from decouple import config
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Set
+import argparse
+import asyncio
+import sys
+import time
+
+# Aplicar migraciones pendientes al arrancar (crear índices en tablas grandes puede bloquearlas:
+# en producción es preferible correr `upgrade` en el despliegue)
+DB_AUTO_MIGRATE: bool = config("DB_AUTO_MIGRATE", default=False, cast=bool)
+# Revisar con EXPLAIN las consultas de autenticación al arrancar y avisar de full scans
+SCHEMA_EXPLAIN_ON_STARTUP: bool = config("SCHEMA_EXPLAIN_ON_STARTUP", default=True, cast=bool)
+
+class Migration(NamedTuple):
+    id: str
+    description: str
+    apply: Callable[[Connection], None]
+
+def _covering_index(connection: Connection, table_name: str, columns: Sequence[str]) -> Optional[str]:
+    """Nombre de un índice existente cuyas primeras columnas son `columns` (None si no hay)"""
+    inspector = inspect(connection)
+    wanted = list(columns)
+    candidates: List[Dict[str, Any]] = [
+        {"name": index["name"], "column_names": index["column_names"]}
+        for index in inspector.get_indexes(table_name)
+    ]
+    candidates += [
+        {"name": unique["name"], "column_names": unique["column_names"]}
+        for unique in inspector.get_unique_constraints(table_name)
+    ]
+    primary_key = inspector.get_pk_constraint(table_name)
+    if primary_key.get("constrained_columns"):
+        candidates.append({"name": primary_key.get("name") or "PRIMARY", "column_names": primary_key["constrained_columns"]})
+    for candidate in candidates:
+        if list(candidate.get("column_names") or [])[:len(wanted)] == wanted:
+            return candidate.get("name") or "(sin nombre)"
+    return None
+
+def _ensure_index(index: Index) -> Callable[[Connection], None]:
+    """Crear el índice solo si ningún índice existente lo cubre ya"""
+    def apply(connection: Connection) -> None:
+        table = index.table
+        assert table is not None
+        if _covering_index(connection, table.name, [column.name for column in index.columns]) is None:
+            index.create(connection)
+    return apply
+
+def _ensure_lookup_indexes(tables: Sequence[Table], column: str) -> Callable[[Connection], None]:
+    """Asegurar en cada tabla un índice que empiece por `column` (el UNIQUE del esquema ya lo cumple)"""
+    def apply(connection: Connection) -> None:
+        for table in tables:
+            if _covering_index(connection, table.name, [column]) is None:
+                Index(f"ix_{table.name.lower()}_{column}", table.c[column]).create(connection)
+    return apply
+
+def _ensure_column(column: "Column[Any]") -> Callable[[Connection], None]:
+    """Agregar la columna (con su default) solo si la tabla todavía no la tiene"""
+    def apply(connection: Connection) -> None:
+        table = column.table
+        existing = {info["name"] for info in inspect(connection).get_columns(table.name)}
+        if column.name not in existing:
+            preparer = connection.dialect.identifier_preparer
+            definition = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {definition}"))
+    return apply
+
+def _ensure_table(*tables: Table) -> Callable[[Connection], None]:
+    """Crear las tablas con sus índices si todavía no existen"""
+    def apply(connection: Connection) -> None:
+        for table in tables:
+            table.create(connection, checkfirst=True)
+    return apply
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        "0001_usuarios_login_covering",
+        "Índice cubriente (username, estado, id_usuario, tipo_usuario) para login y get_current_user",
+        _ensure_index(ix_usuarios_login),
+    ),
+    Migration(
+        "0002_perfiles_id_usuario",
+        "Índices por id_usuario en Veterinario, Recepcionista y Administrador (joins del perfil)",
+        _ensure_lookup_indexes((veterinario, recepcionista, administrador), "id_usuario"),
+    ),
+    Migration(
+        "0003_veterinario_especialidad",
+        "Índice por id_especialidad en Veterinario",
+        _ensure_index(ix_veterinario_especialidad),
+    ),
+    Migration(
+        "0004_usuarios_token_version",
+        "Columna token_version en usuarios (tokens con claims confiables, AUTH_TRUSTED_CLAIMS)",
+        _ensure_column(usuarios.c.token_version),
+    ),
+    Migration(
+        "0005_refresh_tokens",
+        "Tabla refresh_tokens (rotación de refresh tokens con detección de reutilización)",
+        _ensure_table(refresh_tokens),
+    ),
+    Migration(
+        "0006_revoked_tokens",
+        "Tabla revoked_tokens (tokens revocados en un logout, hasta su expiración)",
+        _ensure_table(revoked_tokens),
+    ),
+    Migration(
+        "0007_login_audit",
+        "Tablas login_audit y login_stats (auditoría de logins escrita en segundo plano)",
+        _ensure_table(login_audit, login_stats),
+    ),
+]
+
+def applied_migrations(engine: Engine) -> List[str]:
+    """Migraciones registradas (solo lectura: sin schema_migrations no hay ninguna aplicada)"""
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(schema_migrations.name):
+            return []
+        return list(connection.execute(select(schema_migrations.c.id)).scalars())
+
+def pending_migrations(engine: Engine) -> List[Migration]:
+    done = set(applied_migrations(engine))
+    return [migration for migration in MIGRATIONS if migration.id not in done]
+
+def upgrade(engine: Engine, only: Optional[Sequence[str]] = None) -> List[str]:
+    """Aplicar las migraciones pendientes en orden (o solo las de `only`), cada una en su transacción"""
+    with engine.begin() as connection:
+        schema_migrations.create(connection, checkfirst=True)
+    applied: List[str] = []
+    for migration in pending_migrations(engine):
+        if only is not None and migration.id not in only:
+            continue
+        with engine.begin() as connection:
+            migration.apply(connection)
+            connection.execute(
+                schema_migrations.insert().values(id=migration.id, applied_at=datetime.utcnow())
+            )
+        applied.append(migration.id)
+    return applied
+
+def required_migrations() -> Set[str]:
+    """
+    Migraciones sin las cuales fallan las peticiones (tablas que escriben login, logout y
+    refresh; token_version con AUTH_TRUSTED_CLAIMS). Las de índices solo afectan el rendimiento.
+    """
+    from app.services.token_versions import AUTH_TRUSTED_CLAIMS
+
+    required = {"0005_refresh_tokens", "0006_revoked_tokens", "0007_login_audit"}
+    if AUTH_TRUSTED_CLAIMS:
+        required.add("0004_usuarios_token_version")
+    return required
+
+def missing_required_migrations(engine: Engine) -> List[str]:
+    required = required_migrations()
+    return [migration.id for migration in pending_migrations(engine) if migration.id in required]
+
+class SchemaCheck:
+    """
+    Migraciones requeridas sin aplicar, para el readiness. Mientras falten se vuelve a
+    consultar como máximo cada `interval` segundos (un `upgrade` externo se ve sin reiniciar);
+    una vez completas no se consulta más.
+    """
+
+    def __init__(self, engine: Engine, interval: float) -> None:
+        self.engine = engine
+        self.interval = interval
+        self.missing: Optional[List[str]] = None
+        self._checked_at = 0.0
+
+    async def check(self) -> List[str]:
+        if self.missing == [] or time.monotonic() - self._checked_at < self.interval:
+            return self.missing or []
+        try:
+            self.missing = await asyncio.to_thread(missing_required_migrations, self.engine)
+        except Exception:
+            # Base inalcanzable: eso ya lo reporta el chequeo de la base
+            pass
+        self._checked_at = time.monotonic()
+        return self.missing or []
+
+class QueryPlanWarning(NamedTuple):
+    query: str
+    detail: str
+
+# Valores de ejemplo para los parámetros de las consultas (solo se pide el plan)
+_EXPLAIN_PARAMS = {"username": "__explain__", "id_usuario": 0}
+
+def auth_queries() -> Dict[str, Any]:
+    """Consultas del camino de autenticación que deben resolverse por índice"""
+    from app.services.auth_service import CURRENT_PASSWORD_QUERY, LOGIN_QUERY, PROFILE_QUERIES
+    from app.utils.dependencies import ACTIVE_USER_QUERY
+
+    queries: Dict[str, Any] = {
+        "login": LOGIN_QUERY,
+        "active_user": ACTIVE_USER_QUERY,
+        "current_password": CURRENT_PASSWORD_QUERY,
+    }
+    for tipo_usuario, query in PROFILE_QUERIES.items():
+        queries[f"profile_{tipo_usuario}"] = query
+    return queries
+
+def _full_scans(connection: Connection, sql: str) -> List[str]:
+    """Ejecutar EXPLAIN según el motor y devolver los pasos que recorren una tabla completa"""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"), _EXPLAIN_PARAMS)
+        details = [row._mapping["detail"] for row in rows]
+        # "SCAN t" recorre toda la tabla; "SCAN t USING COVERING INDEX" todo el índice
+        return [detail for detail in details if detail.startswith("SCAN ") and "CONSTANT ROW" not in detail]
+    if dialect in ("mysql", "mariadb"):
+        rows = connection.execute(text(f"EXPLAIN {sql}"), _EXPLAIN_PARAMS)
+        return [
+            f"{row._mapping['table']}: type={row._mapping['type']}"
+            for row in rows if row._mapping["type"] in ("ALL", "index")
+        ]
+    if dialect == "postgresql":
+        rows = connection.execute(text(f"EXPLAIN {sql}"), _EXPLAIN_PARAMS)
+        return [row[0].strip() for row in rows if "Seq Scan" in row[0]]
+    return []
+
+def check_query_plans(engine: Engine) -> List[QueryPlanWarning]:
+    """EXPLAIN de cada consulta de autenticación; una advertencia por full scan"""
+    warnings: List[QueryPlanWarning] = []
+    with engine.connect() as connection:
+        for name, query in auth_queries().items():
+            for detail in _full_scans(connection, str(query)):
+                warnings.append(QueryPlanWarning(name, detail))
+    return warnings
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["status", "upgrade", "explain"])
+    parser.add_argument("migrations", nargs="*", help="upgrade: aplicar solo estas migraciones")
+    parser.add_argument("--database-url", help="Otra base (p. ej. la de REFRESH_TOKEN_STORE_URL)")
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from app.config.database import engine
+
+    if args.command == "status":
+        done = set(applied_migrations(engine))
+        for migration in MIGRATIONS:
+            mark = "x" if migration.id in done else " "
+            print(f"[{mark}] {migration.id}  {migration.description}")
+    elif args.command == "upgrade":
+        unknown = set(args.migrations) - {migration.id for migration in MIGRATIONS}
+        if unknown:
+            parser.error(f"migraciones desconocidas: {', '.join(sorted(unknown))}")
+        applied = upgrade(engine, args.migrations or None)
+        print("\n".join(f"aplicada: {migration_id}" for migration_id in applied) or "sin migraciones pendientes")
+    else:
+        warnings = check_query_plans(engine)
+        for warning in warnings:
+            print(f"full scan en {warning.query}: {warning.detail}")
+        if not warnings:
+            print("todas las consultas de autenticación usan índices")
+        sys.exit(1 if warnings else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+from sqlalchemy import (
+    CHAR, Column, Date, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, text
+)
+from typing import Any, List
+
+# Definición de las tablas de autenticación tal como existen en la base.
+# Sirve de referencia para las migraciones y para crear la base en local/pruebas;
+# las consultas de los servicios siguen siendo SQL textual.
+metadata = MetaData()
+
+usuarios = Table(
+    "usuarios",
+    metadata,
+    Column("id_usuario", Integer, primary_key=True),
+    Column("username", String(20), nullable=False, unique=True),
+    Column("contraseña", String(255), nullable=False),
+    Column("tipo_usuario", String(20), nullable=False),
+    Column("estado", String(10), nullable=False, server_default=text("'Activo'")),
+    Column("fecha_creacion", DateTime, nullable=False, server_default=text("CURRENT_TIMESTAMP")),
+    # Se incrementa al cambiar la contraseña o el estado: invalida los access tokens emitidos
+    Column("token_version", Integer, nullable=False, server_default=text("0")),
+)
+
+especialidad = Table(
+    "Especialidad",
+    metadata,
+    Column("id_especialidad", Integer, primary_key=True),
+    Column("descripcion", String(100), nullable=False),
+)
+
+def _persona_columns() -> List["Column[Any]"]:
+    """Columnas comunes de los perfiles (Veterinario, Recepcionista, Administrador)"""
+    return [
+        Column("id_usuario", Integer, ForeignKey("usuarios.id_usuario"), nullable=False, unique=True),
+        Column("nombre", String(50)),
+        Column("apellido_paterno", String(50)),
+        Column("apellido_materno", String(50)),
+        Column("email", String(100)),
+        Column("dni", String(8)),
+        Column("telefono", String(9)),
+        Column("genero", CHAR(1)),
+        Column("fecha_ingreso", Date),
+    ]
+
+veterinario = Table(
+    "Veterinario",
+    metadata,
+    Column("id_veterinario", Integer, primary_key=True),
+    *_persona_columns(),
+    Column("id_especialidad", Integer, ForeignKey("Especialidad.id_especialidad")),
+    Column("codigo_CMVP", String(20)),
+    Column("tipo_veterinario", String(20)),
+    Column("fecha_nacimiento", Date),
+    Column("disposicion", String(10)),
+    Column("turno", String(10)),
+)
+
+recepcionista = Table(
+    "Recepcionista",
+    metadata,
+    Column("id_recepcionista", Integer, primary_key=True),
+    *_persona_columns(),
+    Column("turno", String(10)),
+)
+
+administrador = Table(
+    "Administrador",
+    metadata,
+    Column("id_administrador", Integer, primary_key=True),
+    *_persona_columns(),
+)
+
+# Índices de los que dependen las consultas de autenticación (además de las PK y de
+# los UNIQUE de username e id_usuario). ix_usuarios_login cubre get_current_user
+# (username + estado -> id_usuario, tipo_usuario) sin leer la fila.
+ix_usuarios_login = Index(
+    "ix_usuarios_login",
+    usuarios.c.username, usuarios.c.estado, usuarios.c.id_usuario, usuarios.c.tipo_usuario,
+)
+ix_veterinario_especialidad = Index("ix_veterinario_especialidad", veterinario.c.id_especialidad)
+
+# Registro de migraciones aplicadas
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("id", String(64), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Refresh tokens (solo se guarda el hash del token; la clave primaria es el índice de búsqueda)
+refresh_tokens = Table(
+    "refresh_tokens",
+    metadata,
+    Column("token_hash", String(64), primary_key=True),
+    Column("family_id", String(32), nullable=False, index=True),
+    Column("id_usuario", Integer, nullable=False, index=True),
+    Column("username", String(20), nullable=False),
+    Column("tipo_usuario", String(20), nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+    Column("family_expires_at", DateTime, nullable=False),
+    Column("rotated_at", DateTime, nullable=True),
+    Column("replaced_by", String(64), nullable=True),
+    Column("revoked_at", DateTime, nullable=True),
+)
+
+# Tokens revocados en un logout, hasta su exp
+revoked_tokens = Table(
+    "revoked_tokens",
+    metadata,
+    Column("jti", String(64), primary_key=True),
+    Column("expires_at", DateTime, nullable=False, index=True),
+    Column("revoked_at", DateTime, nullable=False, index=True),
+)
+
+# Auditoría de autenticación: un registro por evento (login correcto/fallido/limitado,
+# logout, cambio de contraseña)
+login_audit = Table(
+    "login_audit",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("occurred_at", DateTime, nullable=False, index=True),
+    Column("event", String(32), nullable=False),
+    Column("username", String(20), nullable=False, index=True),
+    Column("id_usuario", Integer, nullable=True),
+    Column("client_ip", String(45), nullable=True),
+)
+
+# Resumen por usuario existente: último login y fallos consecutivos desde entonces
+login_stats = Table(
+    "login_stats",
+    metadata,
+    Column("id_usuario", Integer, primary_key=True, autoincrement=False),
+    Column("last_login_at", DateTime, nullable=True),
+    Column("last_login_ip", String(45), nullable=True),
+    Column("failed_attempts", Integer, nullable=False, default=0),
+    Column("last_failed_at", DateTime, nullable=True),
+)
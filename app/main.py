@@ -1,20 +1,102 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware  # ← Importación correcta
-from app.routes import auth
-from app.config.database import test_connection
+from app.routes import auth, health, well_known
+from app.config.database import (
+    DB_ASYNC,
+    DB_POOL_WARMUP,
+    dispose_engines,
+    wait_for_database,
+    warm_up_async_pool,
+    warm_up_pool,
+)
+from app.config.database import engine
+from app.config.migrations import (
+    DB_AUTO_MIGRATE,
+    SCHEMA_EXPLAIN_ON_STARTUP,
+    check_query_plans,
+    pending_migrations,
+    required_migrations,
+    upgrade,
+)
+from app.utils.security import password_hasher, warm_up as warm_up_security
+from app.services.login_audit import login_audit_writer
+from app.services.token_revocation import revocation_list
+from app.services.token_versions import AUTH_TRUSTED_CLAIMS, token_versions
+from app.utils.metrics import MetricsMiddleware, render_metrics
+from app.utils.resilience import BulkheadMiddleware
+from app.config.logging_config import stop_logging
+from contextlib import asynccontextmanager
 from decouple import config
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any
+import asyncio
+
+# Configurar CORS para desarrollo con múltiples desarrolladores
+FRONTEND_URL: str = str(config("FRONTEND_URL", default="http://localhost:5173"))
+
+def _report_warm_up(task: "asyncio.Task[None]") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        print(f"⚠️ No se pudieron precargar hashing y claves JWT: {str(task.exception())}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Arranque y apagado de la aplicación (en cada worker)"""
+    print("🚀 Iniciando API Veterinaria...")
+    print(f"🌐 Frontend permitido en: {FRONTEND_URL}")
+    # Pool de hashing creado antes de recibir tráfico (con procesos, vía forkserver/spawn)
+    await asyncio.to_thread(password_hasher.start)
+    # passlib/jose/claves se cargan en segundo plano: el worker acepta tráfico sin esperarlos
+    crypto_warm_up = asyncio.create_task(asyncio.to_thread(warm_up_security))
+    crypto_warm_up.add_done_callback(_report_warm_up)
+    connected = await wait_for_database()
+    # Migraciones y EXPLAIN usan el motor síncrono: corren en un hilo, fuera del event loop
+    if connected and DB_AUTO_MIGRATE:
+        for migration_id in await asyncio.to_thread(upgrade, engine):
+            print(f"🗂️ Migración aplicada: {migration_id}")
+    pending = await asyncio.to_thread(pending_migrations, engine) if connected else []
+    if pending:
+        print(f"⚠️ Migraciones pendientes: {', '.join(migration.id for migration in pending)} "
+              "(python -m app.config.migrations upgrade)")
+    if any(migration.id in required_migrations() for migration in pending):
+        print("❌ Faltan tablas que usan login, logout y refresh: /health/ready responde 503 hasta aplicarlas")
+    if AUTH_TRUSTED_CLAIMS and any(migration.id == "0004_usuarios_token_version" for migration in pending):
+        print("⚠️ AUTH_TRUSTED_CLAIMS requiere la migración 0004")
+    if connected and SCHEMA_EXPLAIN_ON_STARTUP:
+        try:
+            for warning in await asyncio.to_thread(check_query_plans, engine):
+                print(f"⚠️ Full scan en la consulta {warning.query}: {warning.detail}")
+        except Exception as e:
+            print(f"⚠️ No se pudieron revisar los planes de consulta: {str(e)}")
+    if connected and DB_POOL_WARMUP > 0:
+        opened = await warm_up_async_pool() if DB_ASYNC else await asyncio.to_thread(warm_up_pool)
+        print(f"🔥 Pool precalentado con {opened} conexiones")
+    # Tokens revocados: carga inicial antes de recibir tráfico y sincronización en segundo plano
+    if connected and await revocation_list.refresh():
+        print(f"🔒 Tokens revocados cargados: {len(revocation_list)}")
+    revocation_sync = asyncio.create_task(revocation_list.run())
+    # Mapa de token_version para autenticar sin base (la primera carga ocurre al iniciar la tarea)
+    version_refresh = asyncio.create_task(token_versions.run()) if AUTH_TRUSTED_CLAIMS else None
+
+    yield
+
+    revocation_sync.cancel()
+    if version_refresh is not None:
+        version_refresh.cancel()
+    # Escribir los eventos de auditoría pendientes antes de cerrar
+    login_audit_writer.stop()
+    password_hasher.shutdown()
+    await dispose_engines()
+    stop_logging()
 
 # Crear la aplicación FastAPI
 app = FastAPI(
     title="API Veterinaria",
     description="Sistema de gestión veterinaria",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
-# Configurar CORS para desarrollo con múltiples desarrolladores
-FRONTEND_URL: str = str(config("FRONTEND_URL", default="http://localhost:5173"))
-
 # URLs permitidas (incluyendo diferentes puertos para el equipo)
 allowed_origins = [
     FRONTEND_URL,
@@ -28,6 +110,10 @@ allowed_origins = [
     # Agregar más puertos si es necesario
 ]
 
+# Límite de concurrencia por grupo de rutas (503 al saturarse); queda dentro de CORS y de
+# las métricas para que los rechazos lleven cabeceras CORS y se cuenten por ruta
+app.add_middleware(BulkheadMiddleware)
+
 app.add_middleware(
     CORSMiddleware,  # ← Corregido: CORS (no CORs)
     allow_origins=allowed_origins,
@@ -36,15 +122,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas por ruta (latencia, peticiones en curso y códigos de estado)
+app.add_middleware(MetricsMiddleware)
+
 # Incluir rutas
 app.include_router(auth.router)
-
-@app.on_event("startup")
-async def startup_event() -> None:
-    """Eventos al iniciar la aplicación"""
-    print("🚀 Iniciando API Veterinaria...")
-    print(f"🌐 Frontend permitido en: {FRONTEND_URL}")
-    test_connection()
+app.include_router(health.router)
+app.include_router(well_known.router)
 
 @app.get("/")
 async def root() -> Dict[str, str]:
@@ -54,7 +138,7 @@ async def root() -> Dict[str, str]:
         "docs": "/docs"
     }
 
-@app.get("/health")
-async def health_check() -> Dict[str, str]:
-    """Endpoint para verificar el estado de la API"""
-    return {"status": "OK", "message": "API funcionando correctamente"}
\ No newline at end of file
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Métricas en formato Prometheus (rutas, base de datos, pool y hashing)"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
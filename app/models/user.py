@@ -1,6 +1,10 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Literal, Optional
+from typing import List, Literal, Optional
 from datetime import datetime, date
+from decouple import config
+
+# Máximo de id_usuario por solicitud de perfiles en lote
+PROFILE_BATCH_MAX_IDS: int = config("PROFILE_BATCH_MAX_IDS", default=200, cast=int)
 
 # Modelo para el login
 class UserLogin(BaseModel):
@@ -23,6 +27,25 @@ class TokenResponse(BaseModel):
     token_type: str
     user: UserResponse
 
+# Modelo para renovar el access token
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str = Field(..., min_length=20, description="Refresh token emitido en el login")
+
+# Modelo para cambiar la contraseña (en el cuerpo, nunca en la URL)
+class ChangePasswordRequest(BaseModel):
+    current_password: str = Field(..., min_length=3, description="Contraseña actual")
+    new_password: str = Field(..., min_length=8, description="Contraseña nueva")
+
+# Modelo para activar o desactivar un usuario (solo administradores)
+class UserStatusUpdate(BaseModel):
+    estado: Literal['Activo', 'Inactivo']
+
+# Modelo para la respuesta del refresh
+class RefreshTokenResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str
+
 # Modelo para el perfil completo del usuario
 class UserProfile(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -79,4 +102,14 @@ class UserProfileComplete(BaseModel):
     especialidad_descripcion: Optional[str] = None
     
     # Para Recepcionista
-    turno_recepcionista: Optional[Literal['Mañana', 'Tarde', 'Noche']] = None
\ No newline at end of file
+    turno_recepcionista: Optional[Literal['Mañana', 'Tarde', 'Noche']] = None
+
+# Modelo para resolver varios perfiles en una sola solicitud (listados)
+class ProfileBatchRequest(BaseModel):
+    # El tope se valida al parsear: un lote enorme no llega a construirse ni a deduplicarse
+    ids: List[int] = Field(..., min_length=1, max_length=PROFILE_BATCH_MAX_IDS, description="id_usuario a resolver")
+
+# Modelo para la respuesta de perfiles en lote
+class ProfileBatchResponse(BaseModel):
+    profiles: List[UserProfileComplete]
+    missing: List[int]
@@ -1,73 +1,209 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from datetime import datetime
-from app.config.database import get_db
-from app.models.user import UserLogin, TokenResponse, UserProfileComplete
-from app.services.auth_service import AuthService
-from app.utils.dependencies import get_current_user
-from typing import Dict, Any
+from app.config.database import get_read_session, get_session, mark_write
+from app.models.user import (
+    ChangePasswordRequest,
+    ProfileBatchRequest,
+    ProfileBatchResponse,
+    RefreshTokenRequest,
+    RefreshTokenResponse,
+    TokenResponse,
+    UserLogin,
+    UserProfileComplete,
+    UserStatusUpdate,
+)
+from app.services.auth_service import (
+    AuthService,
+    AsyncAuthService,
+    CachedProfile,
+    refresh_session,
+    rehash_password,
+)
+from app.utils.dependencies import get_current_principal
+from app.utils.http import etag_matches
+from app.services.token_revocation import revocation_list
+from app.services.login_throttle import login_throttle
+from app.services.login_audit import (
+    LOGIN_FAILURE,
+    LOGIN_SUCCESS,
+    LOGIN_THROTTLED,
+    LOGOUT,
+    PASSWORD_CHANGE,
+    login_audit_writer,
+)
+from typing import Dict, Any, Iterator, List, Union
+import logging
+import orjson
 
 router = APIRouter(prefix="/auth", tags=["Autenticación"])
 
+logger = logging.getLogger(__name__)
+
 class TokenResponseComplete(BaseModel):
     """Respuesta completa del login con token y perfil de usuario"""
     access_token: str
+    refresh_token: str
     token_type: str
     user: UserProfileComplete
 
 @router.post("/login", response_model=TokenResponseComplete)
-async def login(user_login: UserLogin, db: Session = Depends(get_db)) -> TokenResponseComplete:
+async def login(
+    user_login: UserLogin,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Union[Session, AsyncSession] = Depends(get_session)
+) -> ORJSONResponse:
     """
     Iniciar sesión con username y contraseña
     Retorna el token y el perfil completo del usuario
     """
+    client_ip = request.client.host if request.client else None
+    try:
+        # Límite por usuario e IP antes de tocar la base o bcrypt
+        try:
+            login_throttle.check(user_login.username, client_ip)
+        except HTTPException as e:
+            login_audit_writer.record(LOGIN_THROTTLED, user_login.username, client_ip=client_ip)
+            raise e
+        
+        try:
+            if isinstance(db, AsyncSession):
+                result: Dict[str, Any] = await AsyncAuthService.authenticate_user(db, user_login)
+            else:
+                # En modo síncrono la sesión y la espera del hash corren fuera del event loop
+                result = await run_in_threadpool(AuthService.authenticate_user, db, user_login)
+        except HTTPException as e:
+            if e.status_code == status.HTTP_401_UNAUTHORIZED:
+                login_throttle.record_failure(user_login.username, client_ip)
+                login_audit_writer.record(LOGIN_FAILURE, user_login.username, client_ip=client_ip)
+            raise e
+        login_throttle.record_success(user_login.username)
+        # Solo se encola: la escritura la hace el escritor de auditoría por lotes
+        login_audit_writer.record(
+            LOGIN_SUCCESS, user_login.username, result["user"].id_usuario, client_ip
+        )
+        
+        # El hash se actualiza después de enviar la respuesta (no suma latencia al login)
+        if result["rehash"]:
+            background_tasks.add_task(
+                rehash_password, result["user"].id_usuario, user_login.password, result["password_hash"]
+            )
+        
+        # El perfil ya viene validado y serializado: se responde sin pasar otra vez por Pydantic
+        return ORJSONResponse({
+            "access_token": result["access_token"],
+            "refresh_token": result["refresh_token"],
+            "token_type": result["token_type"],
+            "user": orjson.Fragment(result["user_json"])
+        })
+    except HTTPException as e:
+        raise e
+    except Exception:
+        # El detalle queda en el log; al cliente no se le expone el error interno
+        logger.exception("Error inesperado en el login")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
+
+@router.post("/refresh", response_model=RefreshTokenResponse)
+async def refresh(refresh_request: RefreshTokenRequest) -> Dict[str, Any]:
+    """
+    Renovar el access token con el refresh token (rotación con detección de reutilización)
+    Retorna un access token y un refresh token nuevos; el anterior deja de ser válido
+    """
     try:
-        result: Dict[str, Any] = AuthService.authenticate_user(db, user_login)
-        return TokenResponseComplete(**result)
+        return await run_in_threadpool(refresh_session, refresh_request.refresh_token)
     except HTTPException as e:
         raise e
-    except Exception as e:
+    except Exception:
+        logger.exception("Error inesperado al renovar el token")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error interno del servidor: {str(e)}"
+            detail="Error al renovar el token"
         )
 
 @router.get("/profile", response_model=UserProfileComplete)
 async def get_profile(
-    current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Session = Depends(get_db)
-) -> UserProfileComplete:
+    request: Request,
+    current_user: Dict[str, Any] = Depends(get_current_principal),
+    db: Union[Session, AsyncSession] = Depends(get_read_session)
+) -> Response:
     """
     Obtener perfil completo del usuario autenticado
+    Soporta ETag / If-None-Match (responde 304 si el perfil no cambió)
     """
     try:
-        # Crear un objeto UserInDB temporal para obtener el perfil actualizado
-        from app.models.user import UserInDB
-        from datetime import datetime
+        if isinstance(db, AsyncSession):
+            entry: CachedProfile = await AsyncAuthService.get_profile_entry(
+                db, current_user["id_usuario"], current_user["tipo_usuario"]
+            )
+        else:
+            # Un fallo de caché consulta la base: en modo síncrono no debe bloquear el event loop
+            entry = await run_in_threadpool(
+                AuthService.get_profile_entry, db, current_user["id_usuario"], current_user["tipo_usuario"]
+            )
         
-        user_in_db = UserInDB(
-            id_usuario=current_user["id_usuario"],
-            username=current_user["username"],
-            contraseña="",  # No necesitamos la contraseña para obtener el perfil
-            tipo_usuario=current_user["tipo_usuario"],
-            estado="Activo",  # Asumimos que está activo si tiene token válido
-            fecha_creacion=datetime.now()  # Usar fecha actual temporal
-        )
+        headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        # El JSON ya está serializado en la caché
+        return Response(content=entry.body, media_type="application/json", headers=headers)
         
-        profile = AuthService._get_user_profile(db, user_in_db)
-        return profile
+    except HTTPException as e:
+        raise e
+    except Exception:
+        logger.exception("Error inesperado al obtener el perfil")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error al obtener perfil"
+        )
+
+# Perfiles por fragmento del stream: menos mensajes ASGI sin armar todo el cuerpo de una vez
+_STREAM_CHUNK_PROFILES = 32
+
+def _stream_profiles(entries: List[CachedProfile], missing: List[int]) -> Iterator[bytes]:
+    """JSON {"profiles": [...], "missing": [...]} armado con los cuerpos ya serializados"""
+    yield b'{"profiles":['
+    for start in range(0, len(entries), _STREAM_CHUNK_PROFILES):
+        chunk = b",".join(entry.body for entry in entries[start:start + _STREAM_CHUNK_PROFILES])
+        yield chunk if start == 0 else b"," + chunk
+    yield b'],"missing":' + orjson.dumps(missing) + b"}"
+
+@router.post("/profiles/batch", response_model=ProfileBatchResponse)
+async def get_profiles_batch(
+    batch: ProfileBatchRequest,
+    current_user: Dict[str, Any] = Depends(get_current_principal),
+    db: Union[Session, AsyncSession] = Depends(get_read_session)
+) -> StreamingResponse:
+    """
+    Resolver varios id_usuario a sus perfiles (pantallas de citas y personal)
+    Usa la caché de perfiles y como máximo una consulta por rol para los que falten
+    """
+    try:
+        if isinstance(db, AsyncSession):
+            entries, missing = await AsyncAuthService.get_profile_entries(db, batch.ids)
+        else:
+            entries, missing = await run_in_threadpool(AuthService.get_profile_entries, db, batch.ids)
         
+        return StreamingResponse(_stream_profiles(entries, missing), media_type="application/json")
     except HTTPException as e:
         raise e
-    except Exception as e:
+    except Exception:
+        logger.exception("Error inesperado al obtener perfiles en lote")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al obtener perfil: {str(e)}"
+            detail="Error al obtener perfiles"
         )
 
 @router.get("/verify-token")
-async def verify_token(current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+async def verify_token(current_user: Dict[str, Any] = Depends(get_current_principal)) -> Dict[str, Any]:
     """
     Verificar si el token es válido
     """
@@ -82,29 +218,81 @@ async def verify_token(current_user: Dict[str, Any] = Depends(get_current_user))
     }
 
 @router.post("/logout")
-async def logout(current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, str]:
+async def logout(current_user: Dict[str, Any] = Depends(get_current_principal)) -> Dict[str, str]:
     """
-    Cerrar sesión (en el frontend se debe eliminar el token)
+    Cerrar sesión: el token queda revocado hasta su expiración
+    (en el frontend igual se debe eliminar el token)
     """
+    if current_user.get("jti") and current_user.get("exp"):
+        await run_in_threadpool(revocation_list.revoke, current_user["jti"], current_user["exp"])
+    login_audit_writer.record(LOGOUT, current_user["username"], current_user["id_usuario"])
     return {"message": f"Sesión cerrada exitosamente para {current_user['username']}"}
 
-# Endpoint adicional para cambiar contraseña (opcional)
 @router.put("/change-password")
 async def change_password(
-    current_password: str,
-    new_password: str,
-    current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    password_change: ChangePasswordRequest,
+    current_user: Dict[str, Any] = Depends(get_current_principal),
+    db: Union[Session, AsyncSession] = Depends(get_session)
 ) -> Dict[str, str]:
     """
     Cambiar contraseña del usuario autenticado
+    Cierra todas las sesiones: el token actual queda revocado y los refresh tokens también
+    """
+    try:
+        if isinstance(db, AsyncSession):
+            await AsyncAuthService.change_password(
+                db, current_user["id_usuario"], password_change.current_password, password_change.new_password
+            )
+        else:
+            await run_in_threadpool(
+                AuthService.change_password,
+                db, current_user["id_usuario"], password_change.current_password, password_change.new_password
+            )
+        
+        # Las próximas lecturas de este usuario van al primario hasta que las réplicas se pongan al día
+        mark_write(current_user["id_usuario"])
+        if current_user.get("jti") and current_user.get("exp"):
+            await run_in_threadpool(revocation_list.revoke, current_user["jti"], current_user["exp"])
+        login_audit_writer.record(PASSWORD_CHANGE, current_user["username"], current_user["id_usuario"])
+        return {"message": "Contraseña actualizada, inicie sesión nuevamente"}
+    except HTTPException as e:
+        raise e
+    except Exception:
+        logger.exception("Error inesperado al cambiar la contraseña")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error al cambiar contraseña"
+        )
+
+@router.put("/users/{id_usuario}/estado")
+async def set_user_status(
+    id_usuario: int,
+    status_update: UserStatusUpdate,
+    current_user: Dict[str, Any] = Depends(get_current_principal),
+    db: Union[Session, AsyncSession] = Depends(get_session)
+) -> Dict[str, str]:
+    """
+    Activar o desactivar un usuario (solo administradores)
+    Al desactivarlo sus tokens dejan de ser válidos y se cierran todas sus sesiones
     """
+    if current_user["tipo_usuario"] != "Administrador":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo un administrador puede cambiar el estado de un usuario"
+        )
     try:
-        # Aquí implementarías la lógica para cambiar contraseña
-        # Por ahora solo retornamos un mensaje
-        return {"message": "Funcionalidad de cambio de contraseña pendiente de implementar"}
-    except Exception as e:
+        if isinstance(db, AsyncSession):
+            await AsyncAuthService.set_user_status(db, id_usuario, status_update.estado)
+        else:
+            await run_in_threadpool(AuthService.set_user_status, db, id_usuario, status_update.estado)
+        
+        mark_write(id_usuario)
+        return {"message": f"Usuario {id_usuario} ahora está {status_update.estado}"}
+    except HTTPException as e:
+        raise e
+    except Exception:
+        logger.exception("Error inesperado al cambiar el estado del usuario")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al cambiar contraseña: {str(e)}"
-        )
\ No newline at end of file
+            detail="Error al cambiar el estado del usuario"
+        )
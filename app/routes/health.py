@@ -0,0 +1,85 @@
+from fastapi import APIRouter, status
+from fastapi.responses import ORJSONResponse
+from app.config.database import (
+    DB_HEALTH_CACHE_SECONDS,
+    async_replica_router,
+    db_breaker,
+    db_probe,
+    engine,
+    pool_status,
+    replica_router,
+)
+from app.config.migrations import SchemaCheck
+from app.services.auth_service import profile_cache
+from app.services.token_revocation import revocation_list
+from app.services.login_audit import login_audit_writer
+from app.services.token_versions import token_versions
+from app.utils.dependencies import principal_cache
+from app.utils.resilience import bulkheads
+from app.utils.security import password_hasher, token_cache
+from typing import Dict, Any
+
+router = APIRouter(prefix="/health", tags=["Salud"])
+
+schema_check = SchemaCheck(engine, DB_HEALTH_CACHE_SECONDS)
+
+@router.get("")
+async def health_check() -> Dict[str, str]:
+    """Endpoint para verificar el estado de la API"""
+    return {"status": "OK", "message": "API funcionando correctamente"}
+
+@router.get("/live")
+async def liveness() -> Dict[str, str]:
+    """Liveness: el proceso responde (no consulta la base de datos)"""
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness() -> ORJSONResponse:
+    """
+    Readiness: base de datos alcanzable (chequeo en caché), migraciones requeridas
+    aplicadas y saturación del pool
+    Responde 503 si la base no está disponible o le faltan tablas que usan login/logout
+    """
+    database = await db_probe.check()
+    missing = await schema_check.check() if database.get("reachable") else []
+    ready = bool(database.get("reachable")) and not missing
+    return ORJSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "database": database,
+            "pending_migrations": missing,
+            "pool": pool_status(),
+            # Una réplica caída no afecta el readiness: sus lecturas van al primario
+            "replicas": (async_replica_router or replica_router).stats()
+        }
+    )
+
+@router.get("/hashing")
+async def hashing_stats() -> Dict[str, Any]:
+    """Uso del pool de hashing de contraseñas (tiempos de cola y de ejecución)"""
+    return password_hasher.stats()
+
+@router.get("/audit")
+async def audit_stats() -> Dict[str, Any]:
+    """Estado del escritor de auditoría de logins (cola, lotes escritos y descartes)"""
+    return login_audit_writer.stats()
+
+@router.get("/resilience")
+async def resilience_stats() -> Dict[str, Any]:
+    """Estado del circuit breaker de la base y de los bulkheads (en curso, en espera y rechazadas)"""
+    return {
+        "db_breaker": db_breaker.stats(),
+        "bulkheads": {name: bulkhead.stats() for name, bulkhead in bulkheads.items()}
+    }
+
+@router.get("/cache")
+async def cache_stats() -> Dict[str, Any]:
+    """Aciertos, fallos y tamaño de las cachés en memoria"""
+    return {
+        "principals": principal_cache.stats(),
+        "tokens": token_cache.stats(),
+        "profiles": profile_cache.stats(),
+        "revoked_tokens": revocation_list.stats(),
+        "token_versions": token_versions.stats()
+    }
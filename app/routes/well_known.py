@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Request, Response, status
+from app.utils.http import etag_matches
+from app.utils.security import JWKS_MAX_AGE_SECONDS, key_store
+
+router = APIRouter(prefix="/.well-known", tags=["Claves públicas"])
+
+_EMPTY_JWKS = b'{"keys":[]}'
+
+@router.get("/jwks.json")
+async def jwks(request: Request) -> Response:
+    """
+    Claves públicas para verificar los tokens localmente (RS*/ES*)
+    Con HS256 no se publica nada: el secreto es compartido
+    """
+    if key_store is None:
+        return Response(content=_EMPTY_JWKS, media_type="application/json")
+    
+    document = key_store.jwks()
+    headers = {"ETag": document.etag, "Cache-Control": f"public, max-age={JWKS_MAX_AGE_SECONDS}"}
+    if etag_matches(request.headers.get("if-none-match"), document.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=document.body, media_type="application/json", headers=headers)
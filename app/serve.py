@@ -0,0 +1,151 @@
+"""
+Servidor de producción (uvicorn con uvloop/httptools y varios workers).
+
+Uso:
+    python -m app.serve                          # un worker por CPU disponible
+    python -m app.serve --workers 4 --preload    # la app se importa una vez y los workers se forkean
+
+Sin --preload cada worker es un proceso nuevo que importa la app por su cuenta. Con --preload
+el import se hace una sola vez en el proceso principal y los workers lo heredan al forkear
+(arranque más rápido y memoria compartida); la conexión a la base, los pools y los hilos se
+crean en cada worker, en el arranque de la app.
+"""
+from decouple import config
+from importlib.util import find_spec
+from typing import Any, Dict, Set
+import argparse
+import math
+import os
+import signal
+import sys
+import time
+
+APP = "app.main:app"
+
+WEB_HOST: str = str(config("WEB_HOST", default="0.0.0.0"))
+WEB_PORT: int = config("WEB_PORT", default=8000, cast=int)
+# 0 = automático (un worker por CPU disponible, hasta WEB_MAX_WORKERS)
+WEB_WORKERS: int = config("WEB_WORKERS", default=0, cast=int)
+WEB_MAX_WORKERS: int = config("WEB_MAX_WORKERS", default=8, cast=int)
+WEB_PRELOAD: bool = config("WEB_PRELOAD", default=False, cast=bool)
+WEB_BACKLOG: int = config("WEB_BACKLOG", default=2048, cast=int)
+WEB_KEEP_ALIVE_SECONDS: int = config("WEB_KEEP_ALIVE_SECONDS", default=5, cast=int)
+WEB_ACCESS_LOG: bool = config("WEB_ACCESS_LOG", default=True, cast=bool)
+WEB_LOG_LEVEL: str = str(config("WEB_LOG_LEVEL", default="info"))
+
+def available_cpus() -> int:
+    """CPUs que puede usar el proceso (afinidad y cuota de CPU del contenedor)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    # cgroup v2: "<cuota> <periodo>" o "max <periodo>" si no hay límite
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as handle:
+            quota, period = handle.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(cpus, 1)
+
+def auto_workers() -> int:
+    """
+    Un worker por CPU: cada worker es un event loop de un hilo y el hashing de contraseñas
+    ya corre en su propio pool. Con más workers que CPUs solo aumentan los cambios de
+    contexto y las conexiones a la base (cada worker tiene su pool).
+    """
+    cpus = available_cpus()
+    return min(cpus, WEB_MAX_WORKERS) if WEB_MAX_WORKERS > 0 else cpus
+
+def event_loop() -> str:
+    return "uvloop" if sys.platform != "win32" and find_spec("uvloop") is not None else "asyncio"
+
+def http_protocol() -> str:
+    return "httptools" if find_spec("httptools") is not None else "h11"
+
+def _serve_preloaded(workers: int, options: Dict[str, Any]) -> None:
+    """Importar la app una vez, abrir el socket y forkear los workers; reemplaza los que mueren"""
+    import uvicorn
+    from app.main import app
+
+    server_config = uvicorn.Config(app, **options)
+    sock = server_config.bind_socket()
+    children: Set[int] = set()
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            # Grupo de procesos propio: Ctrl+C llega solo al principal, que avisa con SIGTERM
+            os.setpgid(0, 0)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                uvicorn.Server(server_config).run(sockets=[sock])
+            finally:
+                os._exit(0)
+        children.add(pid)
+
+    def stop(signum: int, frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(workers):
+        spawn()
+    while children:
+        try:
+            pid, _status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"⚠️ Worker {pid} terminó inesperadamente, iniciando uno nuevo")
+            time.sleep(1)
+            spawn()
+    sock.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=WEB_HOST)
+    parser.add_argument("--port", type=int, default=WEB_PORT)
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS, help="0 = un worker por CPU")
+    parser.add_argument("--preload", action=argparse.BooleanOptionalAction, default=WEB_PRELOAD)
+    parser.add_argument("--log-level", default=WEB_LOG_LEVEL)
+    args = parser.parse_args()
+
+    workers = args.workers if args.workers > 0 else auto_workers()
+    options: Dict[str, Any] = {
+        "host": args.host,
+        "port": args.port,
+        "loop": event_loop(),
+        "http": http_protocol(),
+        "backlog": WEB_BACKLOG,
+        "timeout_keep_alive": WEB_KEEP_ALIVE_SECONDS,
+        "access_log": WEB_ACCESS_LOG,
+        "log_level": args.log_level,
+        "lifespan": "on",
+    }
+    print(
+        f"🚀 Servidor en {args.host}:{args.port} con {workers} worker(s), "
+        f"loop={options['loop']}, http={options['http']}, preload={'sí' if args.preload else 'no'}"
+    )
+
+    import uvicorn
+
+    if workers == 1:
+        uvicorn.run(APP, **options)
+    elif args.preload and hasattr(os, "fork"):
+        _serve_preloaded(workers, options)
+    else:
+        uvicorn.run(APP, workers=workers, **options)
+
+if __name__ == "__main__":
+    main()
@@ -1,185 +1,595 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from sqlalchemy.engine import Row
-from app.models.user import UserLogin, UserResponse, UserInDB, UserProfileComplete
-from app.utils.security import verify_password, create_access_token
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Date, DateTime, bindparam, text
+from sqlalchemy.engine import CursorResult, Result, Row
+from app.models.user import PROFILE_BATCH_MAX_IDS, UserLogin, UserResponse, UserInDB, UserProfileComplete
+from app.utils.security import (
+    HASH_RETRY_AFTER_SECONDS,
+    HashingOverloadedError,
+    create_access_token,
+    get_password_hash_async,
+    get_password_hash_blocking,
+    password_needs_rehash,
+    verify_password_async,
+    verify_password_blocking,
+)
+from app.utils.cache import TTLCache
+from app.utils.dependencies import invalidate_principal
+from app.config.database import SessionLocal
+from app.services.refresh_token_service import refresh_token_service
+from app.services.token_versions import (
+    AUTH_TRUSTED_CLAIMS,
+    TOKEN_VERSION_BUMP,
+    TOKEN_VERSION_COLUMN,
+    token_versions,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi import HTTPException, status
 from datetime import timedelta
 from decouple import config
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, NamedTuple, Optional, Sequence, Tuple, cast
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
 
 ACCESS_TOKEN_EXPIRE_MINUTES: int = int(config("ACCESS_TOKEN_EXPIRE_MINUTES", default="30"))
 
+# Caché de perfiles por id_usuario (el perfil casi nunca cambia)
+PROFILE_CACHE_TTL_SECONDS: int = config("PROFILE_CACHE_TTL_SECONDS", default=300, cast=int)
+PROFILE_CACHE_MAX_SIZE: int = config("PROFILE_CACHE_MAX_SIZE", default=1024, cast=int)
+
+class CachedProfile(NamedTuple):
+    """Perfil junto con su JSON ya serializado y su ETag"""
+    profile: UserProfileComplete
+    body: bytes
+    etag: str
+
+profile_cache = TTLCache(PROFILE_CACHE_MAX_SIZE, PROFILE_CACHE_TTL_SECONDS)
+
+def _cache_profile(profile: UserProfileComplete) -> CachedProfile:
+    """Serializar el perfil una sola vez, calcular su ETag fuerte y guardarlo en caché"""
+    body = profile.model_dump_json().encode()
+    entry = CachedProfile(profile, body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+    profile_cache.set(profile.id_usuario, entry)
+    return entry
+
+def invalidate_profile(id_usuario: int) -> None:
+    """Quitar el perfil de la caché (llamar cuando cambien sus datos)"""
+    profile_cache.delete(id_usuario)
+
+# Consultas compartidas por el servicio síncrono y el asíncrono. Se definen una sola vez
+# a nivel de módulo para que SQLAlchemy reutilice la compilación en su caché.
+# Las columnas de fecha se tipan para que cualquier driver entregue date/datetime.
+_DATE_COLUMNS = {"fecha_ingreso": Date(), "fecha_nacimiento": Date()}
+
+# Login en un solo round trip: credenciales y perfil del rol (según tipo_usuario)
+LOGIN_QUERY = text(f"""
+    SELECT 
+        u.id_usuario, u.username, u.contraseña, u.tipo_usuario, u.estado, u.fecha_creacion,
+        COALESCE(v.id_usuario, r.id_usuario, a.id_usuario) AS id_perfil,
+        COALESCE(v.nombre, r.nombre, a.nombre) AS nombre,
+        COALESCE(v.apellido_paterno, r.apellido_paterno, a.apellido_paterno) AS apellido_paterno,
+        COALESCE(v.apellido_materno, r.apellido_materno, a.apellido_materno) AS apellido_materno,
+        COALESCE(v.email, r.email, a.email) AS email,
+        COALESCE(v.dni, r.dni, a.dni) AS dni,
+        COALESCE(v.telefono, r.telefono, a.telefono) AS telefono,
+        COALESCE(v.genero, r.genero, a.genero) AS genero,
+        COALESCE(v.fecha_ingreso, r.fecha_ingreso, a.fecha_ingreso) AS fecha_ingreso,
+        v.id_especialidad, v.codigo_CMVP, v.tipo_veterinario, v.fecha_nacimiento,
+        v.disposicion, v.turno, e.descripcion AS especialidad_descripcion,
+        r.turno AS turno_recepcionista, {TOKEN_VERSION_COLUMN} AS token_version
+    FROM usuarios u
+    LEFT JOIN Veterinario v ON u.tipo_usuario = 'Veterinario' AND v.id_usuario = u.id_usuario
+    LEFT JOIN Especialidad e ON v.id_especialidad = e.id_especialidad
+    LEFT JOIN Recepcionista r ON u.tipo_usuario = 'Recepcionista' AND r.id_usuario = u.id_usuario
+    LEFT JOIN Administrador a ON u.tipo_usuario = 'Administrador' AND a.id_usuario = u.id_usuario
+    WHERE u.username = :username
+""").columns(fecha_creacion=DateTime(), **_DATE_COLUMNS)
+
+# SELECT del perfil por rol; la versión individual y la de lotes solo cambian el WHERE
+_PROFILE_SELECTS = {
+    'Veterinario': """
+        SELECT 
+            u.id_usuario, u.username, u.tipo_usuario, u.estado, u.fecha_creacion,
+            v.nombre, v.apellido_paterno, v.apellido_materno, v.email, v.dni, 
+            v.telefono, v.genero, v.fecha_ingreso, v.id_especialidad, 
+            v.codigo_CMVP, v.tipo_veterinario, v.fecha_nacimiento, 
+            v.disposicion, v.turno, e.descripcion as especialidad_descripcion
+        FROM usuarios u
+        JOIN Veterinario v ON u.id_usuario = v.id_usuario
+        LEFT JOIN Especialidad e ON v.id_especialidad = e.id_especialidad
+    """,
+    'Recepcionista': """
+        SELECT 
+            u.id_usuario, u.username, u.tipo_usuario, u.estado, u.fecha_creacion,
+            r.nombre, r.apellido_paterno, r.apellido_materno, r.email, r.dni, 
+            r.telefono, r.genero, r.fecha_ingreso, r.turno AS turno_recepcionista
+        FROM usuarios u
+        JOIN Recepcionista r ON u.id_usuario = r.id_usuario
+    """,
+    'Administrador': """
+        SELECT 
+            u.id_usuario, u.username, u.tipo_usuario, u.estado, u.fecha_creacion,
+            a.nombre, a.apellido_paterno, a.apellido_materno, a.email, a.dni, 
+            a.telefono, a.genero, a.fecha_ingreso
+        FROM usuarios u
+        JOIN Administrador a ON u.id_usuario = a.id_usuario
+    """,
+}
+
+PROFILE_QUERIES = {
+    tipo_usuario: text(select_sql + "WHERE u.id_usuario = :id_usuario").columns(
+        fecha_creacion=DateTime(), **_DATE_COLUMNS
+    )
+    for tipo_usuario, select_sql in _PROFILE_SELECTS.items()
+}
+
+# Una consulta por rol para resolver muchos id_usuario a la vez (listados)
+PROFILE_BATCH_QUERIES = {
+    tipo_usuario: text(select_sql + "WHERE u.id_usuario IN :ids")
+    .bindparams(bindparam("ids", expanding=True))
+    .columns(fecha_creacion=DateTime(), **_DATE_COLUMNS)
+    for tipo_usuario, select_sql in _PROFILE_SELECTS.items()
+}
+
+CURRENT_PASSWORD_QUERY = text("""
+    SELECT contraseña FROM usuarios WHERE id_usuario = :id_usuario AND estado = 'Activo'
+""")
+
+# Solo se escribe si el hash no cambió desde que se leyó (evita pisar un cambio concurrente)
+PASSWORD_UPDATE = text("""
+    UPDATE usuarios SET contraseña = :contraseña
+    WHERE id_usuario = :id_usuario AND contraseña = :contraseña_anterior
+""")
+
+# Cambio de contraseña del usuario: además invalida los access tokens ya emitidos
+# (el rehash del login usa PASSWORD_UPDATE y no los invalida)
+PASSWORD_CHANGE_UPDATE = text(f"""
+    UPDATE usuarios SET contraseña = :contraseña{TOKEN_VERSION_BUMP}
+    WHERE id_usuario = :id_usuario AND contraseña = :contraseña_anterior
+""")
+
+USER_STATUS_UPDATE = text(f"""
+    UPDATE usuarios SET estado = :estado{TOKEN_VERSION_BUMP}
+    WHERE id_usuario = :id_usuario AND estado <> :estado
+""")
+
+def _check_user(user_data: Optional[Row[Any]]) -> UserInDB:
+    """Validar que el usuario exista y esté activo"""
+    
+    # Verificar si el usuario existe
+    if not user_data:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuario o contraseña incorrectos"
+        )
+    
+    # Crear objeto UserInDB para mejor tipado (fila confiable de la DB: sin revalidar)
+    user_in_db = UserInDB.model_construct(
+        id_usuario=user_data[0],
+        username=user_data[1],
+        contraseña=user_data[2],
+        tipo_usuario=user_data[3],
+        estado=user_data[4],
+        fecha_creacion=user_data[5]
+    )
+    
+    # Verificar si el usuario está activo
+    if user_in_db.estado != 'Activo':
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuario inactivo"
+        )
+    
+    return user_in_db
+
+def _check_password(valid: bool) -> None:
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuario o contraseña incorrectos"
+        )
+
+def _hashing_overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servicio de autenticación saturado, intente nuevamente",
+        headers={"Retry-After": str(HASH_RETRY_AFTER_SECONDS)}
+    )
+
+def _check_new_password(current_hash: Optional[Row[Any]], current_password: str, new_password: str) -> str:
+    """Validar la solicitud de cambio y devolver el hash actual"""
+    if not current_hash:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario no encontrado o inactivo"
+        )
+    if current_password == new_password:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La contraseña nueva debe ser distinta de la actual"
+        )
+    return current_hash[0]
+
+def _check_current_password(valid: bool) -> None:
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La contraseña actual es incorrecta"
+        )
+
+def _rowcount(result: Result[Any]) -> int:
+    """Filas afectadas por un UPDATE (execute() lo devuelve tipado como Result genérico)"""
+    return cast(CursorResult[Any], result).rowcount
+
+def _check_password_updated(result: Result[Any]) -> None:
+    if _rowcount(result) != 1:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La contraseña fue modificada por otra solicitud, intente nuevamente"
+        )
+
+def _password_changed(id_usuario: int) -> None:
+    """Invalidar credenciales en caché y cerrar las demás sesiones tras cambiar la contraseña"""
+    invalidate_principal(id_usuario=id_usuario)
+    token_versions.bump(id_usuario)
+    refresh_token_service.revoke_user(id_usuario)
+
+def _check_status_updated(result: Result[Any]) -> None:
+    if _rowcount(result) != 1:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario no encontrado o ya tiene ese estado"
+        )
+
+def _status_changed(id_usuario: int, estado: str) -> None:
+    """Invalidar cachés y, al desactivar, cerrar todas las sesiones del usuario"""
+    invalidate_principal(id_usuario=id_usuario)
+    invalidate_profile(id_usuario)
+    token_versions.bump(id_usuario, active=estado == 'Activo')
+    if estado != 'Activo':
+        refresh_token_service.revoke_user(id_usuario)
+
+def _login_token_version(user_data: Row[Any]) -> int:
+    """token_version de la fila del login (el usuario está activo: ya pasó _check_user)"""
+    token_version = int(user_data._mapping["token_version"])
+    if AUTH_TRUSTED_CLAIMS:
+        token_versions.set(user_data[0], token_version, True)
+    return token_version
+
+def rehash_password(id_usuario: int, plain_password: str, old_hash: str) -> None:
+    """
+    Re-hashear la contraseña con el esquema/costo configurado.
+    Corre como tarea en segundo plano después de responder el login.
+    """
+    try:
+        new_hash = get_password_hash_blocking(plain_password)
+    except HashingOverloadedError:
+        # Pool saturado: se vuelve a intentar en el próximo login
+        return
+    try:
+        with SessionLocal() as db:
+            db.execute(PASSWORD_UPDATE, {
+                "contraseña": new_hash, "id_usuario": id_usuario, "contraseña_anterior": old_hash
+            })
+            db.commit()
+    except Exception:
+        logger.warning("No se pudo actualizar el hash del usuario %s", id_usuario, exc_info=True)
+
+def issue_access_token(username: str, tipo_usuario: str, id_usuario: int, token_version: int = 0) -> str:
+    """
+    Crear el token de acceso con los claims del usuario (solo se emite a usuarios activos).
+    Con AUTH_TRUSTED_CLAIMS los claims bastan para autenticar sin consultar la base.
+    """
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    return create_access_token(
+        data={
+            "sub": username,
+            "tipo_usuario": tipo_usuario,
+            "id_usuario": id_usuario,
+            "estado": "Activo",
+            "token_version": token_version
+        },
+        expires_delta=access_token_expires
+    )
+
+def _token_response(
+    user_in_db: UserInDB, token_version: int, profile_entry: CachedProfile, refresh_token: str
+) -> Dict[str, Any]:
+    """Crear token de acceso y armar la respuesta del login"""
+    access_token = issue_access_token(
+        user_in_db.username, user_in_db.tipo_usuario, user_in_db.id_usuario, token_version
+    )
+    
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "user": profile_entry.profile,
+        # Perfil ya serializado, para responder sin volver a convertirlo a JSON
+        "user_json": profile_entry.body,
+        # Hash con esquema o costo anterior: el login lo re-hashea en segundo plano
+        "rehash": password_needs_rehash(user_in_db.contraseña),
+        "password_hash": user_in_db.contraseña
+    }
+
+def refresh_session(refresh_token: str) -> Dict[str, Any]:
+    """Rotar el refresh token y emitir un access token nuevo (sin bcrypt ni consultas de perfil)"""
+    new_refresh_token, record = refresh_token_service.rotate(refresh_token)
+    token_version = 0
+    if AUTH_TRUSTED_CLAIMS:
+        # El access token nuevo lleva la versión vigente (una consulta por PK al primario)
+        entry = token_versions.fetch(record.id_usuario)
+        if entry is None or not entry.active:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Usuario inactivo"
+            )
+        token_version = entry.version
+    return {
+        "access_token": issue_access_token(record.username, record.tipo_usuario, record.id_usuario, token_version),
+        "refresh_token": new_refresh_token,
+        "token_type": "bearer"
+    }
+
+class ProfileMapper:
+    """
+    Convierte filas en UserProfileComplete con las posiciones de cada campo ya calculadas.
+    Las filas vienen de nuestra propia base, así que se construye sin revalidar (model_construct).
+    """
+
+    def __init__(self, columns: Sequence[str]) -> None:
+        fields = UserProfileComplete.model_fields
+        self.positions: Tuple[Tuple[str, int], ...] = tuple(
+            (name, index) for index, name in enumerate(columns) if name in fields
+        )
+
+    def __call__(self, row: Row[Any]) -> UserProfileComplete:
+        return UserProfileComplete.model_construct(**{name: row[index] for name, index in self.positions})
+
+# Un mapper por consulta ('login' o el tipo de usuario), creado con la primera fila
+_profile_mappers: Dict[str, ProfileMapper] = {}
+
+def _map_profile(query_name: str, row: Row[Any]) -> UserProfileComplete:
+    mapper = _profile_mappers.get(query_name)
+    if mapper is None:
+        mapper = _profile_mappers[query_name] = ProfileMapper(row._fields)
+    return mapper(row)
+
+def _profile_from_login_row(login_data: Optional[Row[Any]]) -> UserProfileComplete:
+    """Crear el UserProfileComplete desde la fila combinada del login"""
+    
+    if not login_data or login_data._mapping["id_perfil"] is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Perfil de usuario no encontrado"
+        )
+    
+    return _map_profile("login", login_data)
+
+def _build_profile(tipo_usuario: str, profile_data: Optional[Row[Any]]) -> UserProfileComplete:
+    """Crear el UserProfileComplete a partir de la fila del perfil"""
+    
+    if not profile_data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Perfil de usuario no encontrado"
+        )
+    
+    return _map_profile(tipo_usuario, profile_data)
+
+def _check_batch_size(ids: Sequence[int]) -> List[int]:
+    """Validar el tamaño del lote y quitar duplicados conservando el orden"""
+    unique_ids = list(dict.fromkeys(ids))
+    if len(unique_ids) > PROFILE_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Se permiten como máximo {PROFILE_BATCH_MAX_IDS} usuarios por solicitud"
+        )
+    return unique_ids
+
+def _cached_profile_entries(ids: List[int]) -> Tuple[Dict[int, CachedProfile], List[int]]:
+    """Separar los perfiles que ya están en caché de los que hay que consultar"""
+    found: Dict[int, CachedProfile] = {}
+    pending: List[int] = []
+    for id_usuario in ids:
+        entry: Optional[CachedProfile] = profile_cache.get(id_usuario)
+        if entry is not None:
+            found[id_usuario] = entry
+        else:
+            pending.append(id_usuario)
+    return found, pending
+
+def _collect_profile_rows(
+    tipo_usuario: str, rows: Sequence[Row[Any]], found: Dict[int, CachedProfile], pending: List[int]
+) -> List[int]:
+    """Cachear los perfiles de un rol y devolver los id_usuario que siguen sin resolver"""
+    for row in rows:
+        entry = _cache_profile(_map_profile(tipo_usuario, row))
+        found[entry.profile.id_usuario] = entry
+    return [id_usuario for id_usuario in pending if id_usuario not in found]
+
+def _ordered_entries(ids: List[int], found: Dict[int, CachedProfile]) -> Tuple[List[CachedProfile], List[int]]:
+    """(perfiles en el orden pedido, id_usuario sin perfil)"""
+    return [found[i] for i in ids if i in found], [i for i in ids if i not in found]
+
 class AuthService:
     
     @staticmethod
     def authenticate_user(db: Session, user_login: UserLogin) -> Dict[str, Any]:
         """Autenticar usuario y devolver token con perfil completo"""
         
-        # Buscar usuario en la base de datos
-        query = text("""
-            SELECT id_usuario, username, contraseña, tipo_usuario, estado, fecha_creacion
-            FROM usuarios 
-            WHERE username = :username
-        """)
-        
-        result = db.execute(query, {"username": user_login.username})
+        # Buscar usuario y perfil en la base de datos (una sola consulta)
+        result = db.execute(LOGIN_QUERY, {"username": user_login.username})
         user_data: Optional[Row[Any]] = result.fetchone()
         
-        # Verificar si el usuario existe
-        if not user_data:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Usuario o contraseña incorrectos"
-            )
+        user_in_db = _check_user(user_data)
+        assert user_data is not None  # _check_user ya respondió 401 si no existe
+        
+        # Verificar contraseña en el pool de hashing
+        try:
+            _check_password(verify_password_blocking(user_login.password, user_in_db.contraseña))
+        except HashingOverloadedError:
+            raise _hashing_overloaded()
         
-        # Crear objeto UserInDB para mejor tipado
-        user_in_db = UserInDB(
-            id_usuario=user_data[0],
-            username=user_data[1],
-            contraseña=user_data[2],
-            tipo_usuario=user_data[3],
-            estado=user_data[4],
-            fecha_creacion=user_data[5]
+        profile_entry = _cache_profile(_profile_from_login_row(user_data))
+        refresh_token = refresh_token_service.issue(
+            user_in_db.id_usuario, user_in_db.username, user_in_db.tipo_usuario
         )
+        return _token_response(user_in_db, _login_token_version(user_data), profile_entry, refresh_token)
+
+    @staticmethod
+    def change_password(db: Session, id_usuario: int, current_password: str, new_password: str) -> None:
+        """Verificar la contraseña actual y guardar la nueva (hashing en el pool)"""
         
-        # Verificar si el usuario está activo
-        if user_in_db.estado != 'Activo':
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Usuario inactivo"
-            )
+        result = db.execute(CURRENT_PASSWORD_QUERY, {"id_usuario": id_usuario})
+        current_hash = _check_new_password(result.fetchone(), current_password, new_password)
         
-        # Verificar contraseña
-        if not verify_password(user_login.password, user_in_db.contraseña):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Usuario o contraseña incorrectos"
-            )
+        try:
+            _check_current_password(verify_password_blocking(current_password, current_hash))
+            new_hash = get_password_hash_blocking(new_password)
+        except HashingOverloadedError:
+            raise _hashing_overloaded()
         
-        user_profile = AuthService._get_user_profile(db, user_in_db)
-
-        # Crear token de acceso
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={
-                "sub": user_in_db.username,
-                "tipo_usuario": user_in_db.tipo_usuario,
-                "id_usuario": user_in_db.id_usuario
-            },
-            expires_delta=access_token_expires
-        )
+        result = db.execute(PASSWORD_CHANGE_UPDATE, {
+            "contraseña": new_hash, "id_usuario": id_usuario, "contraseña_anterior": current_hash
+        })
+        _check_password_updated(result)
+        db.commit()
+        _password_changed(id_usuario)
+
+    @staticmethod
+    def set_user_status(db: Session, id_usuario: int, estado: str) -> None:
+        """Activar o desactivar un usuario (desactivar invalida sus tokens y sesiones)"""
+        
+        result = db.execute(USER_STATUS_UPDATE, {"estado": estado, "id_usuario": id_usuario})
+        _check_status_updated(result)
+        db.commit()
+        _status_changed(id_usuario, estado)
+
+    @staticmethod
+    def get_profile_entry(db: Session, id_usuario: int, tipo_usuario: str) -> CachedProfile:
+        """Obtener el perfil desde la caché o, si no está, desde la base de datos"""
+        
+        entry: Optional[CachedProfile] = profile_cache.get(id_usuario)
+        if entry is not None:
+            return entry
         
-        return {
-            "access_token": access_token,
-            "token_type": "bearer",
-            "user": user_profile
-        }
+        query = PROFILE_QUERIES[tipo_usuario]
+        result = db.execute(query, {"id_usuario": id_usuario})
+        profile_data: Optional[Row[Any]] = result.fetchone()
+        
+        return _cache_profile(_build_profile(tipo_usuario, profile_data))
+
+    @staticmethod
+    def get_profile_entries(db: Session, ids: Sequence[int]) -> Tuple[List[CachedProfile], List[int]]:
+        """
+        Resolver muchos perfiles: primero la caché y luego como máximo una consulta
+        IN por rol (se detiene cuando ya no quedan id_usuario por resolver)
+        """
+        unique_ids = _check_batch_size(ids)
+        found, pending = _cached_profile_entries(unique_ids)
+        
+        for tipo_usuario, query in PROFILE_BATCH_QUERIES.items():
+            if not pending:
+                break
+            rows = db.execute(query, {"ids": pending}).fetchall()
+            pending = _collect_profile_rows(tipo_usuario, rows, found, pending)
+        
+        return _ordered_entries(unique_ids, found)
+
     @staticmethod
     def _get_user_profile(db: Session, user_in_db: UserInDB) -> UserProfileComplete:
         """Obtener perfil completo del usuario según su tipo"""
+        return AuthService.get_profile_entry(db, user_in_db.id_usuario, user_in_db.tipo_usuario).profile
+
+class AsyncAuthService:
+    """Versión asíncrona de AuthService para usar con AsyncSession (DB_ASYNC=True)"""
+    
+    @staticmethod
+    async def authenticate_user(db: AsyncSession, user_login: UserLogin) -> Dict[str, Any]:
+        """Autenticar usuario y devolver token con perfil completo"""
         
-        if user_in_db.tipo_usuario == 'Veterinario':
-            query = text("""
-                SELECT 
-                    u.id_usuario, u.username, u.tipo_usuario, u.estado, u.fecha_creacion,
-                    v.nombre, v.apellido_paterno, v.apellido_materno, v.email, v.dni, 
-                    v.telefono, v.genero, v.fecha_ingreso, v.id_especialidad, 
-                    v.codigo_CMVP, v.tipo_veterinario, v.fecha_nacimiento, 
-                    v.disposicion, v.turno, e.descripcion as especialidad_descripcion
-                FROM usuarios u
-                JOIN Veterinario v ON u.id_usuario = v.id_usuario
-                LEFT JOIN Especialidad e ON v.id_especialidad = e.id_especialidad
-                WHERE u.id_usuario = :id_usuario
-            """)
-            
-        elif user_in_db.tipo_usuario == 'Recepcionista':
-            query = text("""
-                SELECT 
-                    u.id_usuario, u.username, u.tipo_usuario, u.estado, u.fecha_creacion,
-                    r.nombre, r.apellido_paterno, r.apellido_materno, r.email, r.dni, 
-                    r.telefono, r.genero, r.fecha_ingreso, r.turno
-                FROM usuarios u
-                JOIN Recepcionista r ON u.id_usuario = r.id_usuario
-                WHERE u.id_usuario = :id_usuario
-            """)
-            
-        elif user_in_db.tipo_usuario == 'Administrador':
-            query = text("""
-                SELECT 
-                    u.id_usuario, u.username, u.tipo_usuario, u.estado, u.fecha_creacion,
-                    a.nombre, a.apellido_paterno, a.apellido_materno, a.email, a.dni, 
-                    a.telefono, a.genero, a.fecha_ingreso
-                FROM usuarios u
-                JOIN Administrador a ON u.id_usuario = a.id_usuario
-                WHERE u.id_usuario = :id_usuario
-            """)
-        
-        result = db.execute(query, {"id_usuario": user_in_db.id_usuario})
-        profile_data: Optional[Row[Any]] = result.fetchone()
+        result = await db.execute(LOGIN_QUERY, {"username": user_login.username})
+        user_data: Optional[Row[Any]] = result.fetchone()
         
-        if not profile_data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Perfil de usuario no encontrado"
-            )
+        user_in_db = _check_user(user_data)
+        assert user_data is not None  # _check_user ya respondió 401 si no existe
         
-        # Crear objeto UserProfileComplete
-        if user_in_db.tipo_usuario == 'Veterinario':
-            return UserProfileComplete(
-                id_usuario=profile_data[0],
-                username=profile_data[1],
-                tipo_usuario=profile_data[2],
-                estado=profile_data[3],
-                fecha_creacion=profile_data[4],
-                nombre=profile_data[5],
-                apellido_paterno=profile_data[6],
-                apellido_materno=profile_data[7],
-                email=profile_data[8],
-                dni=profile_data[9],
-                telefono=profile_data[10],
-                genero=profile_data[11],
-                fecha_ingreso=profile_data[12],
-                id_especialidad=profile_data[13],
-                codigo_CMVP=profile_data[14],
-                tipo_veterinario=profile_data[15],
-                fecha_nacimiento=profile_data[16],
-                disposicion=profile_data[17],
-                turno=profile_data[18],
-                especialidad_descripcion=profile_data[19]
-            )
+        try:
+            _check_password(await verify_password_async(user_login.password, user_in_db.contraseña))
+        except HashingOverloadedError:
+            raise _hashing_overloaded()
         
-        elif user_in_db.tipo_usuario == 'Recepcionista':
-            return UserProfileComplete(
-                id_usuario=profile_data[0],
-                username=profile_data[1],
-                tipo_usuario=profile_data[2],
-                estado=profile_data[3],
-                fecha_creacion=profile_data[4],
-                nombre=profile_data[5],
-                apellido_paterno=profile_data[6],
-                apellido_materno=profile_data[7],
-                email=profile_data[8],
-                dni=profile_data[9],
-                telefono=profile_data[10],
-                genero=profile_data[11],
-                fecha_ingreso=profile_data[12],
-                turno_recepcionista=profile_data[13]
-            )
+        profile_entry = _cache_profile(_profile_from_login_row(user_data))
+        refresh_token = await run_in_threadpool(
+            refresh_token_service.issue, user_in_db.id_usuario, user_in_db.username, user_in_db.tipo_usuario
+        )
+        return _token_response(user_in_db, _login_token_version(user_data), profile_entry, refresh_token)
+
+    @staticmethod
+    async def change_password(db: AsyncSession, id_usuario: int, current_password: str, new_password: str) -> None:
+        """Verificar la contraseña actual y guardar la nueva (hashing en el pool)"""
+        
+        result = await db.execute(CURRENT_PASSWORD_QUERY, {"id_usuario": id_usuario})
+        current_hash = _check_new_password(result.fetchone(), current_password, new_password)
         
-        else:  # Administrador
-            return UserProfileComplete(
-                id_usuario=profile_data[0],
-                username=profile_data[1],
-                tipo_usuario=profile_data[2],
-                estado=profile_data[3],
-                fecha_creacion=profile_data[4],
-                nombre=profile_data[5],
-                apellido_paterno=profile_data[6],
-                apellido_materno=profile_data[7],
-                email=profile_data[8],
-                dni=profile_data[9],
-                telefono=profile_data[10],
-                genero=profile_data[11],
-                fecha_ingreso=profile_data[12]
-            )
\ No newline at end of file
+        try:
+            _check_current_password(await verify_password_async(current_password, current_hash))
+            new_hash = await get_password_hash_async(new_password)
+        except HashingOverloadedError:
+            raise _hashing_overloaded()
+        
+        result = await db.execute(PASSWORD_CHANGE_UPDATE, {
+            "contraseña": new_hash, "id_usuario": id_usuario, "contraseña_anterior": current_hash
+        })
+        _check_password_updated(result)
+        await db.commit()
+        await run_in_threadpool(_password_changed, id_usuario)
+
+    @staticmethod
+    async def set_user_status(db: AsyncSession, id_usuario: int, estado: str) -> None:
+        """Activar o desactivar un usuario (desactivar invalida sus tokens y sesiones)"""
+        
+        result = await db.execute(USER_STATUS_UPDATE, {"estado": estado, "id_usuario": id_usuario})
+        _check_status_updated(result)
+        await db.commit()
+        await run_in_threadpool(_status_changed, id_usuario, estado)
+
+    @staticmethod
+    async def get_profile_entry(db: AsyncSession, id_usuario: int, tipo_usuario: str) -> CachedProfile:
+        """Obtener el perfil desde la caché o, si no está, desde la base de datos"""
+        
+        entry: Optional[CachedProfile] = profile_cache.get(id_usuario)
+        if entry is not None:
+            return entry
+        
+        query = PROFILE_QUERIES[tipo_usuario]
+        result = await db.execute(query, {"id_usuario": id_usuario})
+        profile_data: Optional[Row[Any]] = result.fetchone()
+        
+        return _cache_profile(_build_profile(tipo_usuario, profile_data))
+
+    @staticmethod
+    async def get_profile_entries(db: AsyncSession, ids: Sequence[int]) -> Tuple[List[CachedProfile], List[int]]:
+        """
+        Resolver muchos perfiles: primero la caché y luego como máximo una consulta
+        IN por rol (se detiene cuando ya no quedan id_usuario por resolver)
+        """
+        unique_ids = _check_batch_size(ids)
+        found, pending = _cached_profile_entries(unique_ids)
+        
+        for tipo_usuario, query in PROFILE_BATCH_QUERIES.items():
+            if not pending:
+                break
+            result = await db.execute(query, {"ids": pending})
+            pending = _collect_profile_rows(tipo_usuario, result.fetchall(), found, pending)
+        
+        return _ordered_entries(unique_ids, found)
+
+    @staticmethod
+    async def _get_user_profile(db: AsyncSession, user_in_db: UserInDB) -> UserProfileComplete:
+        """Obtener perfil completo del usuario según su tipo"""
+        entry = await AsyncAuthService.get_profile_entry(db, user_in_db.id_usuario, user_in_db.tipo_usuario)
+        return entry.profile
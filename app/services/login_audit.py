@@ -0,0 +1,292 @@
+from sqlalchemy import DateTime, String, bindparam, case, create_engine, func, insert, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from app.config.database import DATABASE_URL, engine as primary_engine, guarded_connection
+from app.config.schema import login_audit, login_stats
+from app.utils.metrics import Counter, Gauge, Histogram
+from decouple import config
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+import logging
+import queue
+import threading
+import time
+
+LOGIN_AUDIT_ENABLED: bool = config("LOGIN_AUDIT_ENABLED", default=True, cast=bool)
+# Cola acotada: si se llena, los eventos se descartan (el login nunca espera a la auditoría)
+LOGIN_AUDIT_QUEUE_SIZE: int = config("LOGIN_AUDIT_QUEUE_SIZE", default=10000, cast=int)
+# Se escribe un lote al llegar a BATCH_SIZE eventos o cada FLUSH_SECONDS, lo que ocurra primero
+LOGIN_AUDIT_BATCH_SIZE: int = config("LOGIN_AUDIT_BATCH_SIZE", default=500, cast=int)
+LOGIN_AUDIT_FLUSH_SECONDS: float = config("LOGIN_AUDIT_FLUSH_SECONDS", default=1.0, cast=float)
+LOGIN_AUDIT_SHUTDOWN_SECONDS: float = config("LOGIN_AUDIT_SHUTDOWN_SECONDS", default=10.0, cast=float)
+# Base donde se guarda la auditoría (por defecto la misma de la aplicación). Las tablas las
+# crea la migración 0007_login_audit
+LOGIN_AUDIT_STORE_URL: str = str(config("LOGIN_AUDIT_STORE_URL", default=DATABASE_URL))
+
+logger = logging.getLogger(__name__)
+
+LOGIN_SUCCESS = "login_success"
+LOGIN_FAILURE = "login_failure"
+LOGIN_THROTTLED = "login_throttled"
+LOGOUT = "logout"
+PASSWORD_CHANGE = "password_change"
+
+LOGIN_AUDIT_EVENTS = Counter(
+    "login_audit_events_total", "Eventos de auditoría por resultado", ["outcome"]
+)
+LOGIN_AUDIT_FLUSH = Histogram(
+    "login_audit_flush_seconds", "Duración de cada escritura por lotes de la auditoría"
+)
+LOGIN_AUDIT_QUEUE = Gauge("login_audit_queue_depth", "Eventos de auditoría pendientes de escribir")
+
+class AuditEvent(NamedTuple):
+    occurred_at: datetime
+    event: str
+    username: str
+    id_usuario: Optional[int] = None
+    client_ip: Optional[str] = None
+
+class _UserStats:
+    """Cambios acumulados de un usuario dentro de un lote"""
+
+    __slots__ = ("last_login_at", "last_login_ip", "failures", "reset", "last_failed_at")
+
+    def __init__(self) -> None:
+        self.last_login_at: Optional[datetime] = None
+        self.last_login_ip: Optional[str] = None
+        self.failures = 0
+        self.reset = False
+        self.last_failed_at: Optional[datetime] = None
+
+    def apply(self, event: AuditEvent) -> None:
+        if event.event == LOGIN_SUCCESS:
+            # Un login correcto reinicia el contador: solo cuentan los fallos posteriores
+            self.last_login_at = event.occurred_at
+            self.last_login_ip = event.client_ip
+            self.failures = 0
+            self.reset = True
+        elif event.event == LOGIN_FAILURE:
+            self.failures += 1
+            self.last_failed_at = event.occurred_at
+
+def _username_key(username: str) -> str:
+    """Forma comparable de un username (sin distinguir mayúsculas ni espacios finales, como MySQL)"""
+    return username.rstrip(" ").casefold()
+
+_USERS_BY_USERNAME = text(
+    "SELECT username, id_usuario FROM usuarios WHERE username IN :usernames"
+).bindparams(bindparam("usernames", expanding=True))
+
+_EXISTING_STATS = select(login_stats.c.id_usuario).where(
+    login_stats.c.id_usuario.in_(bindparam("ids", expanding=True))
+)
+
+# Fallos acumulados de forma atómica en SQL (varios workers pueden escribir el mismo usuario)
+_STATS_UPDATE = (
+    update(login_stats)
+    .where(login_stats.c.id_usuario == bindparam("b_id_usuario"))
+    .values(
+        last_login_at=func.coalesce(bindparam("b_last_login_at", type_=DateTime), login_stats.c.last_login_at),
+        last_login_ip=case(
+            (bindparam("b_reset") == 1, bindparam("b_last_login_ip", type_=String)),
+            else_=login_stats.c.last_login_ip,
+        ),
+        failed_attempts=case(
+            (bindparam("b_reset") == 1, bindparam("b_failures")),
+            else_=login_stats.c.failed_attempts + bindparam("b_failures"),
+        ),
+        last_failed_at=func.coalesce(bindparam("b_last_failed_at", type_=DateTime), login_stats.c.last_failed_at),
+    )
+)
+
+_STOP = object()
+
+class LoginAuditWriter:
+    """
+    Escritor de auditoría en segundo plano. record() solo encola (nunca toca la base);
+    un hilo escribe los eventos en lotes multi-fila junto con el resumen por usuario.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        enabled: bool,
+        queue_size: int,
+        batch_size: int,
+        flush_seconds: float
+    ) -> None:
+        self.engine = engine
+        self.enabled = enabled
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self.enqueued = 0
+        self.written = 0
+        self.dropped_full = 0
+        self.dropped_error = 0
+        self.flushes = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name="login-audit", daemon=True)
+                self._thread.start()
+
+    def record(
+        self,
+        event: str,
+        username: str,
+        id_usuario: Optional[int] = None,
+        client_ip: Optional[str] = None
+    ) -> None:
+        """Encolar un evento sin bloquear; si la cola está llena se descarta"""
+        if not self.enabled or self._stopped:
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(AuditEvent(datetime.utcnow(), event, username, id_usuario, client_ip))
+        except queue.Full:
+            self.dropped_full += 1
+            LOGIN_AUDIT_EVENTS.inc(outcome="dropped_queue_full")
+            return
+        self.enqueued += 1
+
+    def _run(self) -> None:
+        batch: List[AuditEvent] = []
+        deadline = time.monotonic() + self.flush_seconds
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush(batch)
+                return
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_seconds
+
+    def _flush(self, batch: List[AuditEvent]) -> None:
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            try:
+                self._write(batch)
+            except IntegrityError:
+                # Otro worker creó la fila de resumen del mismo usuario: se reintenta con UPDATE
+                self._write(batch)
+        except Exception:
+            self.dropped_error += len(batch)
+            LOGIN_AUDIT_EVENTS.inc(len(batch), outcome="dropped_write_error")
+            logger.warning("No se pudo escribir un lote de %s eventos de auditoría", len(batch), exc_info=True)
+            return
+        finally:
+            LOGIN_AUDIT_FLUSH.observe(time.perf_counter() - started)
+        self.flushes += 1
+        self.written += len(batch)
+        LOGIN_AUDIT_EVENTS.inc(len(batch), outcome="written")
+
+    def _write(self, batch: List[AuditEvent]) -> None:
+        with guarded_connection(self.engine, begin=True) as connection:
+            connection.execute(insert(login_audit), [event._asdict() for event in batch])
+            self._write_stats(connection, batch)
+
+    def _write_stats(self, connection: Connection, batch: List[AuditEvent]) -> None:
+        events = [event for event in batch if event.event in (LOGIN_SUCCESS, LOGIN_FAILURE)]
+        if not events:
+            return
+
+        # Solo se resumen usuarios existentes (un username inventado no crea filas). Con la
+        # collation de MySQL el IN también trae "admin" para "ADMIN" o "admin ": se empareja
+        # por la forma normalizada y lo que no empareje se ignora
+        ids: Dict[str, int] = {
+            _username_key(row.username): row.id_usuario
+            for row in connection.execute(
+                _USERS_BY_USERNAME, {"usernames": list({event.username for event in events})}
+            )
+        }
+        stats: Dict[int, _UserStats] = {}
+        for event in events:
+            id_usuario = ids.get(_username_key(event.username))
+            if id_usuario is not None:
+                stats.setdefault(id_usuario, _UserStats()).apply(event)
+        if not stats:
+            return
+        existing = set(connection.execute(
+            _EXISTING_STATS, {"ids": list(stats)}
+        ).scalars())
+
+        updates: List[Dict[str, Any]] = []
+        inserts: List[Dict[str, Any]] = []
+        for id_usuario, entry in stats.items():
+            if id_usuario in existing:
+                updates.append({
+                    "b_id_usuario": id_usuario,
+                    "b_last_login_at": entry.last_login_at,
+                    "b_last_login_ip": entry.last_login_ip,
+                    "b_reset": 1 if entry.reset else 0,
+                    "b_failures": entry.failures,
+                    "b_last_failed_at": entry.last_failed_at,
+                })
+            else:
+                inserts.append({
+                    "id_usuario": id_usuario,
+                    "last_login_at": entry.last_login_at,
+                    "last_login_ip": entry.last_login_ip,
+                    "failed_attempts": entry.failures,
+                    "last_failed_at": entry.last_failed_at,
+                })
+        if updates:
+            connection.execute(_STATS_UPDATE, updates)
+        if inserts:
+            connection.execute(insert(login_stats), inserts)
+
+    def stop(self, timeout: float = LOGIN_AUDIT_SHUTDOWN_SECONDS) -> None:
+        """Dejar de aceptar eventos y escribir los pendientes antes de salir"""
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+        if thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            # Con la cola llena se espera a que el hilo haga lugar, pero no más que el plazo
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Auditoría: cola llena al apagar, se descartan %s eventos", self._queue.qsize())
+            return
+        thread.join(max(deadline - time.monotonic(), 0.0))
+        if thread.is_alive():
+            logger.warning("Auditoría: el escritor no terminó en %.1fs, quedan %s eventos", timeout, self._queue.qsize())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "batch_size": self.batch_size,
+            "flush_seconds": self.flush_seconds,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "flushes": self.flushes,
+            "dropped_queue_full": self.dropped_full,
+            "dropped_write_error": self.dropped_error,
+        }
+
+login_audit_writer = LoginAuditWriter(
+    primary_engine if LOGIN_AUDIT_STORE_URL == DATABASE_URL else create_engine(LOGIN_AUDIT_STORE_URL),
+    LOGIN_AUDIT_ENABLED,
+    LOGIN_AUDIT_QUEUE_SIZE,
+    LOGIN_AUDIT_BATCH_SIZE,
+    LOGIN_AUDIT_FLUSH_SECONDS,
+)
+LOGIN_AUDIT_QUEUE.set_function(lambda: float(login_audit_writer.stats()["queue_depth"]))
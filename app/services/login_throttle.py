@@ -0,0 +1,135 @@
+from fastapi import HTTPException, status
+from app.utils.cache import TTLCache
+from app.utils.metrics import Counter
+from abc import ABC, abstractmethod
+from decouple import config
+from typing import Any, Callable, Dict, Optional, Tuple
+import math
+import threading
+import time
+
+# Token bucket por username y por IP: ráfaga permitida y recarga por minuto
+LOGIN_USER_BURST: int = config("LOGIN_USER_BURST", default=5, cast=int)
+LOGIN_USER_PER_MINUTE: float = config("LOGIN_USER_PER_MINUTE", default=5, cast=float)
+LOGIN_IP_BURST: int = config("LOGIN_IP_BURST", default=20, cast=int)
+LOGIN_IP_PER_MINUTE: float = config("LOGIN_IP_PER_MINUTE", default=30, cast=float)
+# Bloqueo tras fallos consecutivos; la duración se duplica en cada bloqueo hasta el máximo
+LOGIN_LOCKOUT_USER_FAILURES: int = config("LOGIN_LOCKOUT_USER_FAILURES", default=5, cast=int)
+LOGIN_LOCKOUT_IP_FAILURES: int = config("LOGIN_LOCKOUT_IP_FAILURES", default=20, cast=int)
+LOGIN_LOCKOUT_BASE_SECONDS: float = config("LOGIN_LOCKOUT_BASE_SECONDS", default=30, cast=float)
+LOGIN_LOCKOUT_MAX_SECONDS: float = config("LOGIN_LOCKOUT_MAX_SECONDS", default=900, cast=float)
+LOGIN_THROTTLE_MAX_KEYS: int = config("LOGIN_THROTTLE_MAX_KEYS", default=100000, cast=int)
+# Tiempo sin actividad tras el cual se olvida el estado de una clave
+LOGIN_THROTTLE_STATE_TTL: float = config("LOGIN_THROTTLE_STATE_TTL", default=3600, cast=float)
+
+State = Dict[str, Any]
+
+LOGIN_THROTTLED = Counter("login_throttled_total", "Intentos de login rechazados por el limitador")
+
+class ThrottleStore(ABC):
+    """
+    Almacén del estado del limitador. update() debe ser atómico por clave;
+    un backend compartido (p. ej. Redis con un script) implementa la misma interfaz.
+    """
+
+    @abstractmethod
+    def update(self, key: str, function: Callable[[Optional[State]], State], ttl_seconds: float) -> State: ...
+
+class InMemoryThrottleStore(ThrottleStore):
+    """Estado en el proceso, acotado en tamaño (LRU) y con expiración por inactividad"""
+
+    def __init__(self, max_keys: int, ttl_seconds: float) -> None:
+        self._states = TTLCache(max_keys, ttl_seconds)
+        self._lock = threading.Lock()
+
+    def update(self, key: str, function: Callable[[Optional[State]], State], ttl_seconds: float) -> State:
+        with self._lock:
+            state = function(self._states.get(key))
+            self._states.set(key, state, ttl_seconds=ttl_seconds)
+            return state
+
+def _new_state(burst: int, now: float) -> State:
+    return {"tokens": float(burst), "updated": now, "failures": 0, "locked_until": 0.0, "lockouts": 0}
+
+class _Limit:
+    def __init__(self, prefix: str, burst: int, per_minute: float, lockout_failures: int) -> None:
+        self.prefix = prefix
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self.lockout_failures = lockout_failures
+
+class LoginThrottle:
+    """Limitador de intentos de login por username y por IP, previo a la base y a bcrypt"""
+
+    def __init__(self, store: ThrottleStore) -> None:
+        self.store = store
+        self.user_limit = _Limit("user", LOGIN_USER_BURST, LOGIN_USER_PER_MINUTE, LOGIN_LOCKOUT_USER_FAILURES)
+        self.ip_limit = _Limit("ip", LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE, LOGIN_LOCKOUT_IP_FAILURES)
+
+    def _keys(self, username: str, client_ip: Optional[str]) -> Tuple[Tuple[_Limit, str], ...]:
+        keys: Tuple[Tuple[_Limit, str], ...] = ((self.user_limit, f"user:{username.lower()}"),)
+        if client_ip:
+            keys += ((self.ip_limit, f"ip:{client_ip}"),)
+        return keys
+
+    def _take(self, limit: _Limit, key: str, now: float) -> float:
+        """Consumir un token; devuelve los segundos de espera (0 si se permite)"""
+        wait = 0.0
+
+        def _apply(state: Optional[State]) -> State:
+            nonlocal wait
+            state = dict(state) if state else _new_state(limit.burst, now)
+            if state["locked_until"] > now:
+                wait = state["locked_until"] - now
+                return state
+            tokens = min(float(limit.burst), state["tokens"] + (now - state["updated"]) * limit.rate)
+            state["updated"] = now
+            if tokens < 1.0:
+                wait = (1.0 - tokens) / limit.rate if limit.rate > 0 else LOGIN_LOCKOUT_MAX_SECONDS
+                state["tokens"] = tokens
+                return state
+            state["tokens"] = tokens - 1.0
+            return state
+
+        self.store.update(key, _apply, LOGIN_THROTTLE_STATE_TTL)
+        return wait
+
+    def check(self, username: str, client_ip: Optional[str]) -> None:
+        """Lanzar 429 con Retry-After si el intento supera el límite o hay bloqueo activo"""
+        now = time.time()
+        wait = max(self._take(limit, key, now) for limit, key in self._keys(username, client_ip))
+        if wait > 0:
+            LOGIN_THROTTLED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Demasiados intentos de inicio de sesión, intente más tarde",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))}
+            )
+
+    def record_failure(self, username: str, client_ip: Optional[str]) -> None:
+        now = time.time()
+        for limit, key in self._keys(username, client_ip):
+
+            def _apply(state: Optional[State], limit: _Limit = limit) -> State:
+                state = dict(state) if state else _new_state(limit.burst, now)
+                state["failures"] += 1
+                if state["failures"] >= limit.lockout_failures:
+                    duration = min(LOGIN_LOCKOUT_BASE_SECONDS * (2 ** state["lockouts"]), LOGIN_LOCKOUT_MAX_SECONDS)
+                    state["locked_until"] = now + duration
+                    state["lockouts"] += 1
+                    state["failures"] = 0
+                return state
+
+            self.store.update(key, _apply, LOGIN_THROTTLE_STATE_TTL)
+
+    def record_success(self, username: str) -> None:
+        """Un login correcto limpia los fallos y el historial de bloqueos del usuario"""
+
+        def _apply(state: Optional[State]) -> State:
+            state = dict(state) if state else _new_state(self.user_limit.burst, time.time())
+            state.update(failures=0, lockouts=0)
+            return state
+
+        self.store.update(f"user:{username.lower()}", _apply, LOGIN_THROTTLE_STATE_TTL)
+
+login_throttle = LoginThrottle(InMemoryThrottleStore(LOGIN_THROTTLE_MAX_KEYS, LOGIN_THROTTLE_STATE_TTL))
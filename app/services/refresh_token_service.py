@@ -0,0 +1,182 @@
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.engine import Engine
+from fastapi import HTTPException, status
+from app.config.database import DATABASE_URL, engine as primary_engine, guarded_connection
+from app.config.schema import refresh_tokens
+from abc import ABC, abstractmethod
+from decouple import config
+from datetime import datetime, timedelta
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+import hashlib
+import secrets
+
+# Ventana deslizante: cada refresh extiende la sesión, hasta el máximo absoluto
+REFRESH_TOKEN_EXPIRE_DAYS: int = config("REFRESH_TOKEN_EXPIRE_DAYS", default=7, cast=int)
+REFRESH_SESSION_MAX_DAYS: int = config("REFRESH_SESSION_MAX_DAYS", default=30, cast=int)
+# Base donde se guardan los refresh tokens (por defecto la misma de la aplicación). La tabla
+# la crea la migración 0005_refresh_tokens; en una base aparte se aplica con
+# `python -m app.config.migrations upgrade 0005_refresh_tokens --database-url <url>`
+REFRESH_TOKEN_STORE_URL: str = str(config("REFRESH_TOKEN_STORE_URL", default=DATABASE_URL))
+
+class RefreshTokenRecord(NamedTuple):
+    token_hash: str
+    family_id: str
+    id_usuario: int
+    username: str
+    tipo_usuario: str
+    created_at: datetime
+    expires_at: datetime
+    family_expires_at: datetime
+    rotated_at: Optional[datetime] = None
+    replaced_by: Optional[str] = None
+    revoked_at: Optional[datetime] = None
+
+class RefreshTokenStore(ABC):
+    """Interfaz del almacén de refresh tokens"""
+
+    @abstractmethod
+    def get(self, token_hash: str) -> Optional[RefreshTokenRecord]: ...
+
+    @abstractmethod
+    def insert(self, record: RefreshTokenRecord) -> None: ...
+
+    @abstractmethod
+    def rotate(self, old_hash: str, new_record: RefreshTokenRecord, now: datetime) -> bool:
+        """Marcar old_hash como usado y guardar el nuevo; False si ya estaba usado o revocado"""
+
+    @abstractmethod
+    def revoke_family(self, family_id: str, now: datetime) -> None: ...
+
+    @abstractmethod
+    def revoke_user(self, id_usuario: int, now: datetime) -> None: ...
+
+class SqlRefreshTokenStore(RefreshTokenStore):
+    """Almacén sobre SQLAlchemy Core (MySQL en producción, SQLite en local/pruebas)"""
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+
+    @classmethod
+    def from_url(cls, url: str) -> "SqlRefreshTokenStore":
+        return cls(create_engine(url))
+
+    def get(self, token_hash: str) -> Optional[RefreshTokenRecord]:
+        with guarded_connection(self.engine) as connection:
+            row = connection.execute(
+                select(refresh_tokens).where(refresh_tokens.c.token_hash == token_hash)
+            ).fetchone()
+        return RefreshTokenRecord(*row) if row else None
+
+    def insert(self, record: RefreshTokenRecord) -> None:
+        with guarded_connection(self.engine, begin=True) as connection:
+            connection.execute(insert(refresh_tokens).values(**record._asdict()))
+
+    def rotate(self, old_hash: str, new_record: RefreshTokenRecord, now: datetime) -> bool:
+        with guarded_connection(self.engine, begin=True) as connection:
+            # El UPDATE condicionado hace atómica la rotación: solo una petición puede ganar
+            result = connection.execute(
+                update(refresh_tokens)
+                .where(
+                    refresh_tokens.c.token_hash == old_hash,
+                    refresh_tokens.c.rotated_at.is_(None),
+                    refresh_tokens.c.revoked_at.is_(None),
+                )
+                .values(rotated_at=now, replaced_by=new_record.token_hash)
+            )
+            if result.rowcount != 1:
+                return False
+            connection.execute(insert(refresh_tokens).values(**new_record._asdict()))
+            return True
+
+    def revoke_family(self, family_id: str, now: datetime) -> None:
+        with guarded_connection(self.engine, begin=True) as connection:
+            connection.execute(
+                update(refresh_tokens)
+                .where(refresh_tokens.c.family_id == family_id, refresh_tokens.c.revoked_at.is_(None))
+                .values(revoked_at=now)
+            )
+
+    def revoke_user(self, id_usuario: int, now: datetime) -> None:
+        with guarded_connection(self.engine, begin=True) as connection:
+            connection.execute(
+                update(refresh_tokens)
+                .where(refresh_tokens.c.id_usuario == id_usuario, refresh_tokens.c.revoked_at.is_(None))
+                .values(revoked_at=now)
+            )
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token inválido o expirado",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+class RefreshTokenService:
+    """Emisión y rotación de refresh tokens con detección de reutilización"""
+
+    def __init__(self, store: RefreshTokenStore) -> None:
+        self.store = store
+
+    def _new_record(
+        self, claims: Dict[str, Any], family_id: str, family_expires_at: datetime, now: datetime
+    ) -> Tuple[str, RefreshTokenRecord]:
+        token = secrets.token_urlsafe(32)
+        record = RefreshTokenRecord(
+            token_hash=_hash_token(token),
+            family_id=family_id,
+            id_usuario=claims["id_usuario"],
+            username=claims["username"],
+            tipo_usuario=claims["tipo_usuario"],
+            created_at=now,
+            expires_at=min(now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS), family_expires_at),
+            family_expires_at=family_expires_at,
+        )
+        return token, record
+
+    def issue(self, id_usuario: int, username: str, tipo_usuario: str) -> str:
+        """Crear un refresh token para una sesión nueva (login)"""
+        now = datetime.utcnow()
+        claims = {"id_usuario": id_usuario, "username": username, "tipo_usuario": tipo_usuario}
+        token, record = self._new_record(
+            claims, secrets.token_hex(16), now + timedelta(days=REFRESH_SESSION_MAX_DAYS), now
+        )
+        self.store.insert(record)
+        return token
+
+    def rotate(self, token: str) -> Tuple[str, RefreshTokenRecord]:
+        """
+        Canjear un refresh token por uno nuevo de la misma sesión.
+        Si el token ya había sido usado se revoca toda la sesión (posible robo).
+        """
+        now = datetime.utcnow()
+        record = self.store.get(_hash_token(token))
+        if record is None or record.revoked_at is not None:
+            raise _invalid_refresh_token()
+        if record.rotated_at is not None:
+            self.store.revoke_family(record.family_id, now)
+            raise _invalid_refresh_token()
+        if record.expires_at <= now or record.family_expires_at <= now:
+            raise _invalid_refresh_token()
+
+        new_token, new_record = self._new_record(
+            record._asdict(), record.family_id, record.family_expires_at, now
+        )
+        if not self.store.rotate(record.token_hash, new_record, now):
+            # Otra petición canjeó el mismo token al mismo tiempo: se trata como reutilización
+            self.store.revoke_family(record.family_id, now)
+            raise _invalid_refresh_token()
+        return new_token, new_record
+
+    def revoke_user(self, id_usuario: int) -> None:
+        """Revocar todas las sesiones del usuario (p. ej. al cambiar la contraseña)"""
+        self.store.revoke_user(id_usuario, datetime.utcnow())
+
+refresh_token_service = RefreshTokenService(
+    SqlRefreshTokenStore(
+        primary_engine if REFRESH_TOKEN_STORE_URL == DATABASE_URL
+        else create_engine(REFRESH_TOKEN_STORE_URL)
+    )
+)
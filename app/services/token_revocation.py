@@ -0,0 +1,248 @@
+from sqlalchemy import delete, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from app.config.database import engine as primary_engine, guarded_connection
+from app.config.schema import revoked_tokens
+from app.utils.resilience import DatabaseUnavailableError
+from decouple import config
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import heapq
+import logging
+import threading
+import time
+
+# Cada cuánto se leen las revocaciones hechas por otros workers/instancias (0 = solo al arrancar)
+REVOCATION_SYNC_SECONDS: float = config("REVOCATION_SYNC_SECONDS", default=30, cast=float)
+# Cada sincronización vuelve a leer esta ventana hacia atrás: revoked_at lo pone el reloj de
+# cada worker antes del commit, así que una revocación puede llegar a la base con un revoked_at
+# anterior al último ya leído (commit lento o reloj atrasado). Debe cubrir ese desfase.
+REVOCATION_SYNC_OVERLAP_SECONDS: float = config("REVOCATION_SYNC_OVERLAP_SECONDS", default=120, cast=float)
+# Qué hacer si la lista no se pudo cargar o sincronizar (base caída):
+# abierta (False): se responde con lo que hay en memoria; un logout hecho en otro worker
+#   durante la caída puede no verse hasta que la base vuelva
+# cerrada (True): pasado REVOCATION_MAX_STALE_SECONDS sin sincronizar se responde 503
+REVOCATION_FAIL_CLOSED: bool = config("REVOCATION_FAIL_CLOSED", default=False, cast=bool)
+REVOCATION_MAX_STALE_SECONDS: float = config("REVOCATION_MAX_STALE_SECONDS", default=120, cast=float)
+# Tope de entradas en memoria; al superarlo se descartan las que expiran antes
+REVOCATION_MAX_ENTRIES: int = config("REVOCATION_MAX_ENTRIES", default=100000, cast=int)
+# Prefiltro Bloom opcional: descarta sin tocar el diccionario los jti que seguro no están
+REVOCATION_BLOOM_ENABLED: bool = config("REVOCATION_BLOOM_ENABLED", default=False, cast=bool)
+REVOCATION_BLOOM_BITS: int = config("REVOCATION_BLOOM_BITS", default=1 << 20, cast=int)
+REVOCATION_BLOOM_HASHES: int = config("REVOCATION_BLOOM_HASHES", default=4, cast=int)
+
+logger = logging.getLogger(__name__)
+
+class BloomFilter:
+    """Filtro de Bloom de tamaño fijo (sin falsos negativos)"""
+
+    def __init__(self, bits: int, hashes: int) -> None:
+        self.bits = bits
+        self.hashes = hashes
+        self._array = bytearray((bits + 7) // 8)
+
+    def _positions(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + index * second) % self.bits for index in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._array[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class RevocationList:
+    """
+    Lista de tokens revocados por jti. Cada entrada vive solo hasta el exp del token
+    (un heap ordenado por exp permite desalojarlas en orden), así la memoria depende
+    de los logouts dentro de la vida de un token y no del total histórico.
+    Se persiste en la base para sobrevivir reinicios. La carga y la sincronización con
+    la base corren en segundo plano (`refresh`/`run`); `is_revoked` solo mira la memoria.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        sync_seconds: float,
+        max_stale_seconds: float,
+        max_entries: int,
+        fail_closed: bool = False,
+        bloom: bool = False,
+        sync_overlap_seconds: float = REVOCATION_SYNC_OVERLAP_SECONDS,
+    ) -> None:
+        self.engine = engine
+        self.sync_seconds = sync_seconds
+        self.sync_overlap = timedelta(seconds=sync_overlap_seconds)
+        self.max_stale_seconds = max_stale_seconds
+        self.max_entries = max_entries
+        self.fail_closed = fail_closed
+        self.use_bloom = bloom
+        self._entries: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._bloom: Optional[BloomFilter] = BloomFilter(REVOCATION_BLOOM_BITS, REVOCATION_BLOOM_HASHES) if bloom else None
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._synced_at: Optional[float] = None
+        self._last_revoked_at: Optional[datetime] = None
+        self.sync_failures = 0
+        self.overflow_evictions = 0
+        self._reported_evictions = 0
+
+    def _add(self, jti: str, exp: float) -> None:
+        if jti in self._entries:
+            return
+        self._entries[jti] = exp
+        heapq.heappush(self._heap, (exp, jti))
+        if self._bloom is not None:
+            self._bloom.add(jti)
+        # Tope duro: se descartan primero los que expiran antes (los que menos tiempo
+        # quedarían aceptándose si vuelven a ser válidos)
+        while len(self._entries) > self.max_entries:
+            _, evicted = heapq.heappop(self._heap)
+            self._entries.pop(evicted, None)
+            self.overflow_evictions += 1
+
+    def _evict_expired(self, now: float) -> None:
+        evicted = False
+        while self._heap and self._heap[0][0] <= now:
+            _, jti = heapq.heappop(self._heap)
+            self._entries.pop(jti, None)
+            evicted = True
+        # Un Bloom no admite borrados: se reconstruye con las entradas vivas
+        if evicted and self.use_bloom:
+            self._rebuild_bloom()
+
+    def _rebuild_bloom(self) -> None:
+        bloom = BloomFilter(REVOCATION_BLOOM_BITS, REVOCATION_BLOOM_HASHES)
+        for jti in self._entries:
+            bloom.add(jti)
+        self._bloom = bloom
+
+    def _track_revoked_at(self, revoked_at: datetime) -> None:
+        if self._last_revoked_at is None or revoked_at > self._last_revoked_at:
+            self._last_revoked_at = revoked_at
+
+    def _apply(self, rows: Any) -> None:
+        with self._lock:
+            for jti, expires_at, revoked_at in rows:
+                self._add(jti, _timestamp(expires_at))
+                self._track_revoked_at(revoked_at)
+            self._evict_expired(time.time())
+            self._synced_at = time.monotonic()
+
+    def load(self) -> None:
+        """Reconstruir desde la base (solo tokens aún no expirados) y purgar los expirados"""
+        now = datetime.utcnow()
+        with guarded_connection(self.engine, begin=True) as connection:
+            connection.execute(delete(revoked_tokens).where(revoked_tokens.c.expires_at <= now))
+            rows = connection.execute(
+                select(revoked_tokens.c.jti, revoked_tokens.c.expires_at, revoked_tokens.c.revoked_at)
+            ).fetchall()
+        self._apply(rows)
+        self._loaded = True
+
+    def sync(self) -> None:
+        """Traer las revocaciones nuevas hechas por otros procesos (las ya conocidas se ignoran)"""
+        last = self._last_revoked_at
+        since = last - self.sync_overlap if last is not None else datetime.min
+        with guarded_connection(self.engine) as connection:
+            rows = connection.execute(
+                select(revoked_tokens.c.jti, revoked_tokens.c.expires_at, revoked_tokens.c.revoked_at)
+                .where(revoked_tokens.c.revoked_at >= since)
+            ).fetchall()
+        self._apply(rows)
+
+    async def refresh(self) -> bool:
+        """Cargar (la primera vez) o sincronizar en un hilo; False si la base falló"""
+        try:
+            await asyncio.to_thread(self.sync if self._loaded else self.load)
+        except Exception:
+            self.sync_failures += 1
+            logger.warning(
+                "No se pudo %s la lista de tokens revocados (%s)",
+                "sincronizar" if self._loaded else "cargar",
+                "se rechazan los tokens hasta recuperarla" if self.fail_closed else "se sigue con la copia en memoria",
+                exc_info=True,
+            )
+            return False
+        if self.overflow_evictions > self._reported_evictions:
+            logger.warning(
+                "Lista de tokens revocados llena (%d entradas): %d descartadas antes de expirar",
+                self.max_entries, self.overflow_evictions - self._reported_evictions,
+            )
+            self._reported_evictions = self.overflow_evictions
+        return True
+
+    async def run(self) -> None:
+        """Mantener la lista al día (tarea del lifespan de cada worker; la carga inicial la hace el arranque)"""
+        while self.sync_seconds > 0 or not self._loaded:
+            await asyncio.sleep(self.sync_seconds if self.sync_seconds > 0 else 1.0)
+            await self.refresh()
+
+    def _stale(self) -> bool:
+        synced_at = self._synced_at
+        if not self._loaded or synced_at is None:
+            return True
+        return self.sync_seconds > 0 and time.monotonic() - synced_at > self.max_stale_seconds
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """Consulta solo en memoria (sin I/O); los tokens ya expirados los rechaza verify_token"""
+        if not jti:
+            return False
+        if self.fail_closed and self._stale():
+            raise DatabaseUnavailableError(self.sync_seconds or 1.0)
+        bloom = self._bloom
+        if bloom is not None and jti not in bloom:
+            return False
+        return jti in self._entries
+
+    def revoke(self, jti: str, exp: float) -> None:
+        """Revocar el token hasta su exp (en memoria y en la base)"""
+        if exp <= time.time():
+            return
+        revoked_at = datetime.utcnow()
+        with self._lock:
+            self._add(jti, exp)
+        try:
+            with guarded_connection(self.engine, begin=True) as connection:
+                connection.execute(
+                    insert(revoked_tokens).values(
+                        jti=jti, expires_at=datetime.utcfromtimestamp(exp), revoked_at=revoked_at
+                    )
+                )
+        except IntegrityError:
+            # Otro logout del mismo token (p. ej. una petición repetida) ya lo guardó
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        synced_at = self._synced_at
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "loaded": self._loaded,
+            "age_seconds": round(time.monotonic() - synced_at, 3) if synced_at is not None else None,
+            "fail_closed": self.fail_closed,
+            "sync_failures": self.sync_failures,
+            "overflow_evictions": self.overflow_evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def _timestamp(value: datetime) -> float:
+    """datetime naive en UTC (como se guarda) a epoch"""
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+revocation_list = RevocationList(
+    primary_engine,
+    REVOCATION_SYNC_SECONDS,
+    REVOCATION_MAX_STALE_SECONDS,
+    REVOCATION_MAX_ENTRIES,
+    fail_closed=REVOCATION_FAIL_CLOSED,
+    bloom=REVOCATION_BLOOM_ENABLED,
+)
@@ -0,0 +1,143 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine, Row
+from app.config.database import engine as primary_engine, guarded_connection
+from decouple import config
+from typing import Any, Dict, NamedTuple, Optional
+import asyncio
+import logging
+import threading
+import time
+
+# Modo de claims confiables: get_current_user arma el usuario con los claims del token
+# (id_usuario, tipo_usuario, estado) y solo compara su token_version con un mapa en memoria,
+# sin consultar la base. Requiere la migración 0004 (columna usuarios.token_version).
+AUTH_TRUSTED_CLAIMS: bool = config("AUTH_TRUSTED_CLAIMS", default=False, cast=bool)
+# Cada cuánto se recarga el mapa completo: es la demora máxima con la que un worker ve
+# un cambio de contraseña o una desactivación hecha en otro worker o instancia
+TOKEN_VERSION_REFRESH_SECONDS: float = config("TOKEN_VERSION_REFRESH_SECONDS", default=15, cast=float)
+# Si la última recarga correcta es más vieja que esto (base caída), se deja de confiar
+# en el mapa y cada token se verifica contra la base
+TOKEN_VERSION_MAX_AGE_SECONDS: float = config("TOKEN_VERSION_MAX_AGE_SECONDS", default=60, cast=float)
+
+logger = logging.getLogger(__name__)
+
+# Sin el modo activo la columna puede no existir todavía: las consultas usan 0
+TOKEN_VERSION_COLUMN = "u.token_version" if AUTH_TRUSTED_CLAIMS else "0"
+# Se agrega al SET de los UPDATE que deben invalidar los tokens emitidos
+TOKEN_VERSION_BUMP = ", token_version = token_version + 1" if AUTH_TRUSTED_CLAIMS else ""
+
+ALL_TOKEN_VERSIONS_QUERY = text(f"""
+    SELECT u.id_usuario, {TOKEN_VERSION_COLUMN} AS token_version, u.estado FROM usuarios u
+""")
+
+TOKEN_VERSION_QUERY = text(f"""
+    SELECT u.id_usuario, {TOKEN_VERSION_COLUMN} AS token_version, u.estado FROM usuarios u
+    WHERE u.id_usuario = :id_usuario
+""")
+
+class UserVersion(NamedTuple):
+    version: int
+    active: bool
+
+    def accepts(self, token_version: int) -> Optional[bool]:
+        """True/False si el token es vigente o no; None si el token es más nuevo que el mapa"""
+        if token_version > self.version:
+            return None
+        return self.active and token_version == self.version
+
+def _user_version(row: Row[Any]) -> UserVersion:
+    return UserVersion(int(row[1]), row[2] == "Activo")
+
+class TokenVersionMap:
+    """
+    id_usuario -> (token_version, activo) de todos los usuarios, cargado en bloque y
+    recargado cada `refresh_seconds`. Los cambios hechos en este proceso se aplican al
+    instante; los de otros procesos, en la siguiente recarga.
+    """
+
+    def __init__(self, engine: Engine, refresh_seconds: float, max_age_seconds: float) -> None:
+        self.engine = engine
+        self.refresh_seconds = refresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self._versions: Dict[int, UserVersion] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.lookups = 0
+
+    def load(self) -> None:
+        """Leer las versiones de todos los usuarios del primario y reemplazar el mapa"""
+        with guarded_connection(self.engine) as connection:
+            rows = connection.execute(ALL_TOKEN_VERSIONS_QUERY).fetchall()
+        versions = {row[0]: _user_version(row) for row in rows}
+        with self._lock:
+            # Un bump() aplicado mientras se leía la base es más nuevo que la lectura: se conserva
+            for id_usuario, current in self._versions.items():
+                loaded = versions.get(id_usuario)
+                if loaded is not None and current.version > loaded.version:
+                    versions[id_usuario] = current
+            self._versions = versions
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+
+    async def run(self) -> None:
+        """Recargar el mapa periódicamente (tarea del lifespan de cada worker)"""
+        while True:
+            try:
+                await asyncio.to_thread(self.load)
+            except Exception:
+                self.refresh_failures += 1
+                logger.warning("No se pudo recargar el mapa de token_version", exc_info=True)
+            await asyncio.sleep(self.refresh_seconds)
+
+    def lookup(self, id_usuario: int) -> Optional[UserVersion]:
+        """Versión conocida del usuario; None si no está en el mapa o el mapa está vencido"""
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.max_age_seconds:
+            return None
+        return self._versions.get(id_usuario)
+
+    def remember(self, id_usuario: int, row: Optional[Row[Any]]) -> Optional[UserVersion]:
+        """Guardar la versión leída de la base para un usuario (None si ya no existe)"""
+        self.lookups += 1
+        with self._lock:
+            if row is None:
+                self._versions.pop(id_usuario, None)
+                return None
+            entry = self._versions[id_usuario] = _user_version(row)
+            return entry
+
+    def fetch(self, id_usuario: int) -> Optional[UserVersion]:
+        """Leer del primario la versión actual de un usuario y guardarla"""
+        with guarded_connection(self.engine) as connection:
+            row = connection.execute(TOKEN_VERSION_QUERY, {"id_usuario": id_usuario}).fetchone()
+        return self.remember(id_usuario, row)
+
+    def set(self, id_usuario: int, version: int, active: bool) -> None:
+        with self._lock:
+            self._versions[id_usuario] = UserVersion(version, active)
+
+    def bump(self, id_usuario: int, active: Optional[bool] = None) -> None:
+        """Aplicar en este proceso un cambio que ya incrementó token_version en la base"""
+        with self._lock:
+            entry = self._versions.get(id_usuario)
+            if entry is not None:
+                self._versions[id_usuario] = UserVersion(
+                    entry.version + 1, entry.active if active is None else active
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        loaded_at = self._loaded_at
+        return {
+            "enabled": AUTH_TRUSTED_CLAIMS,
+            "size": len(self._versions),
+            "age_seconds": round(time.monotonic() - loaded_at, 3) if loaded_at is not None else None,
+            "refresh_seconds": self.refresh_seconds,
+            "max_age_seconds": self.max_age_seconds,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "db_lookups": self.lookups,
+        }
+
+token_versions = TokenVersionMap(primary_engine, TOKEN_VERSION_REFRESH_SECONDS, TOKEN_VERSION_MAX_AGE_SECONDS)
@@ -0,0 +1,99 @@
+"""
+Calibración del costo de hashing de contraseñas para el hardware actual.
+
+Mide la mediana de una verificación para cada costo de bcrypt (y argon2 si su backend
+está instalado) y recomienda el costo más alto que cabe en el presupuesto de
+latencia. El resultado se aplica con BCRYPT_ROUNDS / PASSWORD_SCHEMES; los hashes
+existentes se actualizan solos en el siguiente login exitoso de cada usuario.
+
+Uso:
+    python -m app.utils.calibrate_hashing --budget-ms 250
+"""
+import argparse
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+# passlib.hash resuelve sus atributos de forma perezosa; los handlers se importan de su módulo
+from passlib.handlers.argon2 import argon2
+from passlib.handlers.bcrypt import bcrypt
+
+SAMPLE_PASSWORD = "calibracion-Contraseña-123"
+
+def _median_ms(handler: Any, samples: int) -> float:
+    """Mediana en milisegundos de una verificación (lo que paga cada login)"""
+    hashed = handler.hash(SAMPLE_PASSWORD)
+    timings: List[float] = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.verify(SAMPLE_PASSWORD, hashed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def calibrate_bcrypt(budget_ms: float, samples: int, min_rounds: int, max_rounds: int) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for rounds in range(min_rounds, max_rounds + 1):
+        latency = _median_ms(bcrypt.using(rounds=rounds), samples)
+        results.append({"scheme": "bcrypt", "cost": rounds, "latency_ms": latency})
+        # El costo se duplica en cada paso: no tiene sentido seguir midiendo
+        if latency > budget_ms * 2:
+            break
+    return results
+
+def calibrate_argon2(budget_ms: float, samples: int) -> List[Dict[str, Any]]:
+    if not argon2.has_backend():
+        return []
+    results: List[Dict[str, Any]] = []
+    for time_cost in range(1, 11):
+        latency = _median_ms(argon2.using(time_cost=time_cost), samples)
+        results.append({"scheme": "argon2", "cost": time_cost, "latency_ms": latency})
+        if latency > budget_ms:
+            break
+    return results
+
+def recommend(results: List[Dict[str, Any]], budget_ms: float) -> Optional[Dict[str, Any]]:
+    """Costo más alto cuya latencia cabe en el presupuesto"""
+    within = [r for r in results if r["latency_ms"] <= budget_ms]
+    return max(within, key=lambda r: r["cost"]) if within else None
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=250.0,
+                        help="Latencia máxima aceptable por verificación")
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Workers del pool de hashing (por defecto HASH_WORKERS)")
+    args = parser.parse_args()
+
+    workers = args.workers
+    if workers is None:
+        from decouple import config
+        workers = config("HASH_WORKERS", default=2, cast=int)
+
+    for scheme, results in (
+        ("bcrypt", calibrate_bcrypt(args.budget_ms, args.samples, args.min_rounds, args.max_rounds)),
+        ("argon2", calibrate_argon2(args.budget_ms, args.samples)),
+    ):
+        if not results:
+            print(f"{scheme}: backend no disponible, se omite")
+            continue
+        for r in results:
+            marker = "ok " if r["latency_ms"] <= args.budget_ms else "   "
+            # Cada worker atiende un hash a la vez: este es el techo de logins/s del pool
+            throughput = workers * 1000 / r["latency_ms"]
+            print(f"{marker}{scheme:<7} costo={r['cost']:<3} {r['latency_ms']:8.1f} ms/verify "
+                  f"-> ~{throughput:,.0f} logins/s con {workers} workers")
+
+        best = recommend(results, args.budget_ms)
+        if best is None:
+            print(f"{scheme}: ningún costo cabe en {args.budget_ms:.0f} ms")
+        elif scheme == "bcrypt":
+            print(f"recomendado: PASSWORD_SCHEMES=bcrypt BCRYPT_ROUNDS={best['cost']}")
+        else:
+            print(f"alternativa: PASSWORD_SCHEMES=argon2,bcrypt ARGON2_TIME_COST={best['cost']} "
+                  f"(migra los hashes bcrypt en el login)")
+
+if __name__ == "__main__":
+    main()
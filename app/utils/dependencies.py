@@ -1,52 +1,178 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from sqlalchemy.engine import Row
-from app.config.database import get_db
+from app.config.database import DB_ASYNC, get_async_read_db, get_read_db, route_reads_for
 from app.utils.security import verify_token
-from typing import Dict, Any, Optional
+from app.utils.cache import TTLCache
+from app.services.token_revocation import revocation_list
+from app.services.token_versions import AUTH_TRUSTED_CLAIMS, TOKEN_VERSION_QUERY, token_versions
+from decouple import config
+from typing import Dict, Any, Optional, Tuple
 
 # Esquema de seguridad
 security = HTTPBearer()
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> Dict[str, Any]:
-    """Obtener el usuario actual desde el token JWT"""
-    
-    credentials_exception = HTTPException(
+# Caché de usuarios autenticados para no consultar MySQL en cada request
+PRINCIPAL_CACHE_TTL_SECONDS: int = config("PRINCIPAL_CACHE_TTL_SECONDS", default=60, cast=int)
+PRINCIPAL_CACHE_MAX_SIZE: int = config("PRINCIPAL_CACHE_MAX_SIZE", default=1024, cast=int)
+
+principal_cache = TTLCache(PRINCIPAL_CACHE_MAX_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+# Índice id_usuario -> username para poder invalidar por id. Se toca junto con cada acierto de
+# principal_cache: así el LRU desaloja las mismas entradas en las dos cachés
+_principal_ids = TTLCache(PRINCIPAL_CACHE_MAX_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+
+ACTIVE_USER_QUERY = text("""
+    SELECT id_usuario, username, tipo_usuario, estado 
+    FROM usuarios 
+    WHERE username = :username AND estado = 'Activo'
+""")
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudieron validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    # Verificar el token
+
+def _payload_from_token(credentials: HTTPAuthorizationCredentials) -> Dict[str, Any]:
+    """Verificar el token (firma, exp y revocación) y devolver sus claims"""
     payload: Optional[Dict[str, Any]] = verify_token(credentials.credentials)
     if payload is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
-    username: Optional[str] = payload.get("sub")
-    if username is None:
-        raise credentials_exception
+    if payload.get("sub") is None:
+        raise _credentials_exception()
     
-    # Buscar el usuario en la base de datos
-    query = text("""
-        SELECT id_usuario, username, tipo_usuario, estado 
-        FROM usuarios 
-        WHERE username = :username AND estado = 'Activo'
-    """)
-    
-    result = db.execute(query, {"username": username})
-    user: Optional[Row[Any]] = result.fetchone()
+    # Revocado en un logout (consulta en memoria, sin ir a la base)
+    if revocation_list.is_revoked(payload.get("jti")):
+        raise _credentials_exception()
     
+    return payload
+
+def _with_token_claims(principal: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Agregar al usuario los datos del token necesarios para revocarlo"""
+    principal["jti"] = payload.get("jti")
+    principal["exp"] = payload.get("exp")
+    return principal
+
+def _user_from_row(user: Optional[Row[Any]]) -> Dict[str, Any]:
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
-    return {
+    principal = {
         "id_usuario": user[0],
         "username": user[1],
         "tipo_usuario": user[2],
         "estado": user[3]
-    }
\ No newline at end of file
+    }
+    principal_cache.set(principal["username"], principal)
+    _principal_ids.set(principal["id_usuario"], principal["username"])
+    return dict(principal)
+
+def _cached_principal(username: str) -> Optional[Dict[str, Any]]:
+    principal: Optional[Dict[str, Any]] = principal_cache.get(username)
+    if principal is None:
+        return None
+    _principal_ids.set(principal["id_usuario"], username)
+    return dict(principal)
+
+def _claims_principal(payload: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], int]]:
+    """(usuario armado con los claims, token_version); None si el token no trae los claims"""
+    try:
+        principal = {
+            "id_usuario": int(payload["id_usuario"]),
+            "username": payload["sub"],
+            "tipo_usuario": payload["tipo_usuario"],
+            "estado": payload["estado"]
+        }
+        return principal, int(payload["token_version"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _check_token_version(accepted: Optional[bool]) -> None:
+    if not accepted:
+        raise _credentials_exception()
+
+def invalidate_principal(username: Optional[str] = None, id_usuario: Optional[int] = None) -> None:
+    """Quitar un usuario de la caché (llamar al desactivarlo o al cambiar su contraseña)"""
+    if id_usuario is not None:
+        username = username or _principal_ids.get(id_usuario)
+    if username is not None:
+        principal: Optional[Dict[str, Any]] = principal_cache.get(username)
+        if principal is not None:
+            id_usuario = principal["id_usuario"]
+        principal_cache.delete(username)
+    if id_usuario is not None:
+        _principal_ids.delete(id_usuario)
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_read_db)
+) -> Dict[str, Any]:
+    """
+    Obtener el usuario actual desde el token JWT (lectura en réplica si hay)
+    Es síncrona a propósito: FastAPI la corre en el threadpool y db.execute no bloquea el event loop
+    """
+    
+    payload = _payload_from_token(credentials)
+    username: str = payload["sub"]
+    route_reads_for(db, payload.get("id_usuario"))
+    
+    claims = _claims_principal(payload) if AUTH_TRUSTED_CLAIMS else None
+    if claims is not None:
+        # Sin base: solo se compara la versión del token con el mapa en memoria
+        principal, token_version = claims
+        entry = token_versions.lookup(principal["id_usuario"])
+        accepted = entry.accepts(token_version) if entry is not None else None
+        if accepted is None:
+            # Mapa vencido, usuario nuevo o token más nuevo que el mapa: se lee su versión del primario
+            db.info["use_primary"] = True
+            row = db.execute(TOKEN_VERSION_QUERY, {"id_usuario": principal["id_usuario"]}).fetchone()
+            entry = token_versions.remember(principal["id_usuario"], row)
+            accepted = entry is not None and entry.accepts(token_version)
+        _check_token_version(accepted)
+        return _with_token_claims(principal, payload)
+    
+    cached = _cached_principal(username)
+    if cached is not None:
+        return _with_token_claims(cached, payload)
+    
+    # Buscar el usuario en la base de datos
+    result = db.execute(ACTIVE_USER_QUERY, {"username": username})
+    return _with_token_claims(_user_from_row(result.fetchone()), payload)
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_read_db)
+) -> Dict[str, Any]:
+    """Obtener el usuario actual desde el token JWT usando AsyncSession (lectura en réplica si hay)"""
+    
+    payload = _payload_from_token(credentials)
+    username: str = payload["sub"]
+    route_reads_for(db, payload.get("id_usuario"))
+    
+    claims = _claims_principal(payload) if AUTH_TRUSTED_CLAIMS else None
+    if claims is not None:
+        principal, token_version = claims
+        entry = token_versions.lookup(principal["id_usuario"])
+        accepted = entry.accepts(token_version) if entry is not None else None
+        if accepted is None:
+            db.info["use_primary"] = True
+            result = await db.execute(TOKEN_VERSION_QUERY, {"id_usuario": principal["id_usuario"]})
+            entry = token_versions.remember(principal["id_usuario"], result.fetchone())
+            accepted = entry is not None and entry.accepts(token_version)
+        _check_token_version(accepted)
+        return _with_token_claims(principal, payload)
+    
+    cached = _cached_principal(username)
+    if cached is not None:
+        return _with_token_claims(cached, payload)
+    
+    result = await db.execute(ACTIVE_USER_QUERY, {"username": username})
+    return _with_token_claims(_user_from_row(result.fetchone()), payload)
+
+# Dependencia de usuario actual según el modo configurado (síncrono o asíncrono)
+get_current_principal = get_current_user_async if DB_ASYNC else get_current_user
@@ -0,0 +1,196 @@
+"""
+Claves asimétricas para firmar los JWT (RS256/ES256 y variantes) con rotación por `kid`.
+
+Cada archivo `<kid>.pem` del directorio de claves es una clave: las privadas pueden firmar
+y todas se publican (solo su parte pública) en el JWKS para que otros servicios verifiquen
+localmente. Firma la indicada en JWT_ACTIVE_KID o, si no se indica, la privada más reciente.
+
+Rotación sin reiniciar:
+    1. python -m app.utils.jwt_keys generate --dir keys --algorithm ES256
+    2. se publica en el JWKS en la próxima recarga (JWT_KEYS_RELOAD_SECONDS) y empieza a
+       firmar cuando lleva JWT_KEY_ACTIVATION_SECONDS publicada
+    3. la anterior se borra (o se deja solo su .pem público) cuando vencen sus tokens
+"""
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, NamedTuple, Optional, Tuple
+import argparse
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+
+if TYPE_CHECKING:
+    from jose.backends.base import Key
+
+class CachedJwks(NamedTuple):
+    """Documento JWKS ya serializado, con su ETag"""
+    body: bytes
+    etag: str
+
+class _LoadedKey(NamedTuple):
+    kid: str
+    private: Optional["Key"]
+    public: "Key"
+    modified: float
+
+class KeyStore:
+    """
+    Claves parseadas una sola vez y guardadas por kid: verificar un token no vuelve a
+    leer ni parsear PEMs. El directorio se revisa como máximo cada `reload_seconds`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        algorithm: str,
+        active_kid: Optional[str],
+        reload_seconds: float,
+        activation_seconds: float
+    ) -> None:
+        self.directory = directory
+        self.algorithm = algorithm
+        self.active_kid = active_kid
+        self.reload_seconds = reload_seconds
+        self.activation_seconds = activation_seconds
+        self._lock = threading.Lock()
+        self._keys: Dict[str, _LoadedKey] = {}
+        self._signing: Optional[_LoadedKey] = None
+        self._jwks: Optional[CachedJwks] = None
+        self._directory_mtime: Optional[float] = None
+        self._checked_at = 0.0
+
+    def _load(self) -> Dict[str, _LoadedKey]:
+        from jose import jwk
+
+        keys: Dict[str, _LoadedKey] = {}
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".pem"):
+                continue
+            path = os.path.join(self.directory, name)
+            with open(path, "rb") as handle:
+                key = jwk.construct(handle.read(), self.algorithm)
+            kid = name[:-len(".pem")]
+            is_public = key.is_public()  # type: ignore[attr-defined]
+            keys[kid] = _LoadedKey(
+                kid,
+                None if is_public else key,
+                key if is_public else key.public_key(),  # type: ignore[attr-defined]
+                os.path.getmtime(path),
+            )
+        return keys
+
+    def _select_signing(self, keys: Dict[str, _LoadedKey]) -> _LoadedKey:
+        """
+        Clave que firma: JWT_ACTIVE_KID o la privada más reciente que ya lleva publicada
+        `activation_seconds` (los verificadores con el JWKS en caché ya la conocen)
+        """
+        if self.active_kid:
+            signing = keys.get(self.active_kid)
+            if signing is None or signing.private is None:
+                raise ValueError(f"JWT_ACTIVE_KID={self.active_kid} no tiene clave privada en {self.directory}")
+            return signing
+        private_keys = sorted(
+            (key for key in keys.values() if key.private is not None),
+            key=lambda key: (key.modified, key.kid),
+        )
+        if not private_keys:
+            raise ValueError(f"No hay claves privadas .pem en {self.directory}")
+        published = [key for key in private_keys if time.time() - key.modified >= self.activation_seconds]
+        # Si ninguna cumple la espera (primer arranque) firma la más antigua
+        return published[-1] if published else private_keys[0]
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if self._signing is not None and now - self._checked_at < self.reload_seconds:
+            return
+        with self._lock:
+            if self._signing is not None and now - self._checked_at < self.reload_seconds:
+                return
+            self._checked_at = now
+            try:
+                # Solo se vuelven a parsear PEMs si se agregaron o borraron archivos
+                mtime = os.path.getmtime(self.directory)
+                keys = self._keys
+                if self._signing is None or mtime != self._directory_mtime:
+                    keys = self._load()
+                signing = self._select_signing(keys)
+            except Exception:
+                # Sin claves previas no se puede firmar; si las hay, se siguen usando
+                # y se reintenta en la próxima revisión
+                if self._signing is None:
+                    raise
+                return
+            if keys is not self._keys:
+                self._keys = keys
+                self._jwks = None
+                self._directory_mtime = mtime
+            self._signing = signing
+
+    def signing_key(self) -> Tuple[str, "Key"]:
+        """(kid, clave privada) con la que se firman los tokens nuevos"""
+        self._refresh()
+        assert self._signing is not None and self._signing.private is not None
+        return self._signing.kid, self._signing.private
+
+    def verification_key(self, kid: Optional[str]) -> Optional["Key"]:
+        """Clave pública del kid; None si no existe (token de otra clave o manipulado)"""
+        if not kid:
+            return None
+        self._refresh()
+        loaded = self._keys.get(kid)
+        return loaded.public if loaded is not None else None
+
+    def jwks(self) -> CachedJwks:
+        """JWKS con las claves públicas vigentes, serializado una vez por recarga"""
+        self._refresh()
+        cached = self._jwks
+        if cached is None:
+            keys = []
+            for loaded in self._keys.values():
+                entry: Dict[str, Any] = loaded.public.to_dict()  # type: ignore[attr-defined]
+                entry.update(kid=loaded.kid, use="sig", alg=self.algorithm)
+                keys.append(entry)
+            body = json.dumps({"keys": keys}, separators=(",", ":"), sort_keys=True).encode()
+            cached = self._jwks = CachedJwks(body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+        return cached
+
+def generate_private_key(algorithm: str) -> bytes:
+    """PEM de una clave privada nueva para el algoritmo indicado"""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    if algorithm.startswith("RS"):
+        private_key: Any = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm.startswith("ES"):
+        curves = {"ES256": ec.SECP256R1(), "ES384": ec.SECP384R1(), "ES512": ec.SECP521R1()}
+        private_key = ec.generate_private_key(curves[algorithm])
+    else:
+        raise ValueError(f"Algoritmo no soportado para claves asimétricas: {algorithm}")
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["generate"])
+    parser.add_argument("--dir", default="keys")
+    parser.add_argument("--algorithm", default="ES256")
+    args = parser.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    kid = f"{datetime.utcnow():%Y%m%d}-{secrets.token_hex(4)}"
+    path = os.path.join(args.dir, f"{kid}.pem")
+    # Se escribe aparte y se renombra: el servidor nunca ve un PEM a medio escribir
+    temporary = f"{path}.tmp"
+    descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(descriptor, "wb") as handle:
+        handle.write(generate_private_key(args.algorithm))
+    os.rename(temporary, path)
+    print(f"clave {args.algorithm} creada: {path} (kid={kid})")
+
+if __name__ == "__main__":
+    main()
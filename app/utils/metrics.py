@@ -0,0 +1,299 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from functools import lru_cache
+from app.utils.request_context import current_route
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import re
+import threading
+import time
+
+# Métricas en formato de exposición de texto de Prometheus, sin dependencias externas
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List["_Metric"] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric") -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], Optional[float]]] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], Optional[float]], **labels: str) -> None:
+        """Leer el valor al momento del scrape (None = no reportar)"""
+        with self._lock:
+            self._functions[self._key(labels)] = function
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+            functions = list(self._functions.items())
+        for key, function in functions:
+            value = function()
+            if value is not None:
+                items.append((key, value))
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            total[0] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        lines: List[str] = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+# Rutas HTTP
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta", ("route", "method")
+)
+HTTP_REQUESTS_TOTAL = Counter(
+    "http_requests_total", "Peticiones HTTP por ruta y código de estado", ("route", "method", "status")
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso por ruta", ("route",)
+)
+
+# Base de datos
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Duración de las consultas SQL por sentencia", ("engine", "statement")
+)
+DB_QUERY_ERRORS = Counter(
+    "db_query_errors_total", "Consultas SQL que terminaron en error", ("engine", "statement")
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Conexiones del pool actualmente en uso", ("engine",)
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Conexiones abiertas por encima de pool_size", ("engine",)
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Tamaño configurado del pool", ("engine",)
+)
+
+# Hash de contraseñas
+PASSWORD_HASH_RUN = Histogram(
+    "password_hash_run_seconds", "Tiempo de CPU de bcrypt por operación", ("operation",)
+)
+PASSWORD_HASH_QUEUE = Histogram(
+    "password_hash_queue_seconds", "Tiempo de espera en la cola del pool de hashing", ("operation",)
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total", "Operaciones rechazadas por pool de hashing saturado"
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+def _unexpanded_statement(statement: str, context: Any) -> str:
+    """
+    SQL compilado antes de expandir los parámetros `IN :ids` (queda `IN (__[POSTCOMPILE_ids])`).
+    El texto que llega al cursor tiene un placeholder por elemento: cada tamaño de lote sería
+    una serie distinta. Sin SQL compilado (exec_driver_sql) se usa el texto tal cual.
+    """
+    compiled = getattr(context, "compiled", None)
+    return compiled.string if compiled is not None else statement
+
+@lru_cache(maxsize=256)
+def statement_label(statement: str) -> str:
+    """Etiqueta corta y estable para una sentencia SQL (inicio del texto + huella)"""
+    collapsed = _WHITESPACE.sub(" ", statement).strip()
+    if len(collapsed) <= 60:
+        return collapsed
+    fingerprint = hashlib.sha1(collapsed.encode()).hexdigest()[:8]
+    return f"{collapsed[:60]}... #{fingerprint}"
+
+def _pool_function(engine: Engine, method: str, minimum: Optional[float] = None) -> Callable[[], Optional[float]]:
+    def _read() -> Optional[float]:
+        function: Optional[Callable[[], float]] = getattr(engine.pool, method, None)
+        if not callable(function):
+            return None
+        value = float(function())
+        return value if minimum is None else max(value, minimum)
+    return _read
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Registrar eventos de SQLAlchemy para medir consultas y exponer el estado del pool"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        started = conn.info["query_start_time"].pop()
+        label = statement_label(_unexpanded_statement(statement, context))
+        DB_QUERY_DURATION.observe(time.perf_counter() - started, engine=name, statement=label)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context: Any) -> None:
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
+        statement = _unexpanded_statement(exception_context.statement or "", exception_context.execution_context)
+        DB_QUERY_ERRORS.inc(engine=name, statement=statement_label(statement))
+
+    DB_POOL_CHECKED_OUT.set_function(_pool_function(engine, "checkedout"), engine=name)
+    # QueuePool.overflow() es negativo mientras no se supera pool_size
+    DB_POOL_OVERFLOW.set_function(_pool_function(engine, "overflow", minimum=0.0), engine=name)
+    DB_POOL_SIZE.set_function(_pool_function(engine, "size"), engine=name)
+
+def _route_label(scope: Scope) -> str:
+    """Plantilla de la ruta (p. ej. /auth/login); 'other' si no coincide con ninguna"""
+    app = scope.get("app")
+    router = getattr(app, "router", None)
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match.value:
+            return getattr(route, "path", "other")
+    return "other"
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide latencia, peticiones en curso y códigos de estado por ruta"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = _route_label(scope)
+        method = scope.get("method", "")
+        status_code = 500
+
+        async def _send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(route=route)
+        route_token = current_route.set(route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            current_route.reset(route_token)
+            HTTP_REQUESTS_IN_FLIGHT.dec(route=route)
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, route=route, method=method)
+            HTTP_REQUESTS_TOTAL.inc(route=route, method=method, status=str(status_code))
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,4 @@
+from contextvars import ContextVar
+
+# Ruta (plantilla) de la petición HTTP en curso, para logs y métricas fuera de la capa web
+current_route: ContextVar[str] = ContextVar("current_route", default="-")
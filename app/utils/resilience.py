@@ -0,0 +1,228 @@
+from fastapi import HTTPException, status
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.utils.metrics import Counter, Gauge
+from decouple import config
+from typing import Any, Dict, Optional, Sequence, Tuple
+import asyncio
+import json
+import threading
+import time
+
+def _group_limits(value: str) -> Dict[str, int]:
+    return {
+        name.strip(): int(limit) for name, _, limit in (item.partition("=") for item in value.split(",")) if name.strip()
+    }
+
+# Bulkhead por grupo de rutas: "grupo=límite" separados por comas (0 desactiva el grupo)
+BULKHEAD_LIMITS: Dict[str, int] = _group_limits(
+    str(config("BULKHEAD_LIMITS", default="login=32,auth=64,default=64"))
+)
+# Espera máxima por un lugar libre y máximo de peticiones esperando; pasado eso se responde 503
+BULKHEAD_MAX_WAIT_SECONDS: float = config("BULKHEAD_MAX_WAIT_SECONDS", default=0.5, cast=float)
+BULKHEAD_MAX_QUEUE: int = config("BULKHEAD_MAX_QUEUE", default=100, cast=int)
+BULKHEAD_RETRY_AFTER_SECONDS: int = config("BULKHEAD_RETRY_AFTER_SECONDS", default=1, cast=int)
+
+# Grupos de rutas (por prefijo); las de salud, métricas y documentación nunca se limitan
+ROUTE_GROUPS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("login", ("/auth/login", "/auth/refresh", "/auth/change-password")),
+    ("auth", ("/auth/",)),
+)
+EXEMPT_PREFIXES: Tuple[str, ...] = ("/health", "/metrics", "/.well-known", "/docs", "/redoc", "/openapi.json")
+
+BULKHEAD_IN_FLIGHT = Gauge("bulkhead_in_flight", "Peticiones en curso por grupo de rutas", ["group"])
+BULKHEAD_SHED = Counter("bulkhead_shed_total", "Peticiones rechazadas con 503 por el bulkhead", ["group", "reason"])
+DB_BREAKER_STATE = Gauge("db_breaker_state", "Estado del circuit breaker de la base (0 cerrado, 1 medio abierto, 2 abierto)")
+DB_BREAKER_REJECTED = Counter("db_breaker_rejected_total", "Accesos a la base rechazados con el circuito abierto")
+DB_BREAKER_TRANSITIONS = Counter("db_breaker_transitions_total", "Cambios de estado del circuit breaker", ["state"])
+
+class DatabaseUnavailableError(HTTPException):
+    """
+    La base no está disponible (circuito abierto, pool agotado o error de conexión).
+    Es un HTTPException para que los handlers de las rutas lo propaguen como 503.
+    """
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Base de datos no disponible, intente nuevamente",
+            headers={"Retry-After": str(max(1, int(retry_after)))},
+        )
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0.0, HALF_OPEN: 1.0, OPEN: 2.0}
+
+class CircuitBreaker:
+    """
+    Circuit breaker de la base. Tras `failure_threshold` fallos seguidos se abre y rechaza
+    sin tocar el pool durante `reset_seconds`; luego deja pasar hasta `half_open_max`
+    peticiones de prueba: un éxito lo cierra y un fallo lo vuelve a abrir.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float, half_open_max: int) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.half_open_max = half_open_max
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trials = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        DB_BREAKER_STATE.set_function(lambda: _STATE_VALUES[self.state])
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        DB_BREAKER_TRANSITIONS.inc(state=state)
+
+    def _reject(self) -> DatabaseUnavailableError:
+        self.rejected += 1
+        DB_BREAKER_REJECTED.inc()
+        return DatabaseUnavailableError(self.opened_at + self.reset_seconds - time.monotonic())
+
+    def acquire(self) -> bool:
+        """
+        Pedir permiso para usar la base. Devuelve True si es una petición de prueba
+        (hay que liberarla con release) y lanza DatabaseUnavailableError si está abierto.
+        """
+        if self.state == CLOSED:
+            return False
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    raise self._reject()
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self.trials >= self.half_open_max:
+                    raise self._reject()
+                self.trials += 1
+                return True
+            return False
+
+    def release(self, trial: bool) -> None:
+        if trial:
+            with self._lock:
+                self.trials = max(self.trials - 1, 0)
+
+    def record_success(self) -> None:
+        if self.state == CLOSED and self.failures == 0:
+            return
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_seconds": self.reset_seconds,
+            "trials_in_flight": self.trials,
+            "rejected": self.rejected,
+        }
+
+class Bulkhead:
+    """Límite de concurrencia de un grupo de rutas con espera acotada"""
+
+    def __init__(self, name: str, limit: int, max_wait: float, max_queue: int) -> None:
+        self.name = name
+        self.limit = limit
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        BULKHEAD_IN_FLIGHT.set_function(lambda: float(self.in_flight), group=name)
+
+    def _shed(self, reason: str) -> bool:
+        self.shed += 1
+        BULKHEAD_SHED.inc(group=self.name, reason=reason)
+        return False
+
+    async def acquire(self) -> bool:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                return self._shed("queue_full")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.max_wait)
+            except asyncio.TimeoutError:
+                return self._shed("timeout")
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "shed": self.shed,
+        }
+
+def route_group(path: str, groups: Sequence[Tuple[str, Tuple[str, ...]]] = ROUTE_GROUPS) -> Optional[str]:
+    """Grupo de la ruta por prefijo; None para las rutas exentas"""
+    if path.startswith(EXEMPT_PREFIXES):
+        return None
+    for name, prefixes in groups:
+        if path.startswith(prefixes):
+            return name
+    return "default"
+
+bulkheads: Dict[str, Bulkhead] = {
+    name: Bulkhead(name, limit, BULKHEAD_MAX_WAIT_SECONDS, BULKHEAD_MAX_QUEUE)
+    for name, limit in BULKHEAD_LIMITS.items() if limit > 0
+}
+
+_SHED_BODY = json.dumps({"detail": "Servidor saturado, intente nuevamente"}).encode()
+
+class BulkheadMiddleware:
+    """Middleware ASGI que aplica el bulkhead del grupo de cada ruta y responde 503 al saturarse"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        group = route_group(scope["path"]) if scope["type"] == "http" else None
+        bulkhead = bulkheads.get(group) if group is not None else None
+        if bulkhead is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await bulkhead.acquire():
+            await send({
+                "type": "http.response.start",
+                "status": status.HTTP_503_SERVICE_UNAVAILABLE,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_SHED_BODY)).encode()),
+                    (b"retry-after", str(BULKHEAD_RETRY_AFTER_SECONDS).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": _SHED_BODY})
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            bulkhead.release()
@@ -1,28 +1,110 @@
-from passlib.context import CryptContext
-from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from decouple import config
-from typing import Optional, Dict, Any
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Dict, Any, Callable, List, Tuple
+from app.utils.cache import TTLCache
+from app.utils.jwt_keys import KeyStore
+from app.utils.metrics import PASSWORD_HASH_QUEUE, PASSWORD_HASH_REJECTED, PASSWORD_HASH_RUN
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import secrets
+import threading
+import time
 
-# Configuración para el hash de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+# passlib y jose (con cryptography) se importan al primer uso y no al arrancar: son la mayor
+# parte del import de la aplicación fuera de FastAPI/SQLAlchemy. warm_up() los carga antes
+# del primer login.
+
+def _scheme_list(value: str) -> List[str]:
+    return [scheme.strip() for scheme in value.split(",") if scheme.strip()]
+
+# Configuración para el hash de contraseñas. El primer esquema es el que se usa
+# para hashes nuevos; los demás solo se verifican y se re-hashean en el login.
+# BCRYPT_ROUNDS se obtiene con `python -m app.utils.calibrate_hashing`.
+PASSWORD_SCHEMES: List[str] = _scheme_list(str(config("PASSWORD_SCHEMES", default="bcrypt")))
+BCRYPT_ROUNDS: int = config("BCRYPT_ROUNDS", default=12, cast=int)
+ARGON2_TIME_COST: int = config("ARGON2_TIME_COST", default=3, cast=int)
+
+# min/max iguales al costo actual: cualquier hash con otro costo queda marcado para rehash
+_scheme_settings: Dict[str, Any] = {}
+if "bcrypt" in PASSWORD_SCHEMES:
+    _scheme_settings.update(
+        bcrypt__default_rounds=BCRYPT_ROUNDS,
+        bcrypt__min_rounds=BCRYPT_ROUNDS,
+        bcrypt__max_rounds=BCRYPT_ROUNDS,
+    )
+if "argon2" in PASSWORD_SCHEMES:
+    _scheme_settings.update(
+        argon2__default_rounds=ARGON2_TIME_COST,
+        argon2__min_rounds=ARGON2_TIME_COST,
+        argon2__max_rounds=ARGON2_TIME_COST,
+    )
+
+@lru_cache(maxsize=None)
+def get_pwd_context() -> "CryptContext":
+    """Contexto de passlib, creado al primer uso"""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=PASSWORD_SCHEMES, deprecated="auto", **_scheme_settings)
 
 # Configuración JWT con manejo de tipos
-_secret_key = config("SECRET_KEY")
-if not _secret_key:
+ALGORITHM: str = str(config("ALGORITHM", default="HS256"))
+# RS*/ES*: firma con clave privada y verificación con la pública (publicada en el JWKS)
+ASYMMETRIC_SIGNING: bool = ALGORITHM[:2] in ("RS", "ES")
+JWT_KEYS_DIR: str = str(config("JWT_KEYS_DIR", default="keys"))
+JWT_ACTIVE_KID: Optional[str] = str(config("JWT_ACTIVE_KID", default="")) or None
+JWT_KEYS_RELOAD_SECONDS: float = config("JWT_KEYS_RELOAD_SECONDS", default=60, cast=float)
+# Caché del JWKS en los clientes; una clave nueva espera al menos eso antes de firmar
+JWKS_MAX_AGE_SECONDS: int = config("JWKS_MAX_AGE_SECONDS", default=300, cast=int)
+JWT_KEY_ACTIVATION_SECONDS: float = config(
+    "JWT_KEY_ACTIVATION_SECONDS", default=JWKS_MAX_AGE_SECONDS + JWT_KEYS_RELOAD_SECONDS, cast=float
+)
+
+_secret_key = config("SECRET_KEY", default="")
+if not _secret_key and not ASYMMETRIC_SIGNING:
     raise ValueError("SECRET_KEY no está configurada en el archivo .env")
 
 SECRET_KEY: str = str(_secret_key)
-ALGORITHM: str = str(config("ALGORITHM", default="HS256"))
+
+key_store: Optional[KeyStore] = (
+    KeyStore(JWT_KEYS_DIR, ALGORITHM, JWT_ACTIVE_KID, JWT_KEYS_RELOAD_SECONDS, JWT_KEY_ACTIVATION_SECONDS)
+    if ASYMMETRIC_SIGNING else None
+)
 ACCESS_TOKEN_EXPIRE_MINUTES: int = int(config("ACCESS_TOKEN_EXPIRE_MINUTES", default="30"))
 
+# Pool dedicado para el hash de contraseñas (bcrypt es CPU puro y bloquearía el event loop)
+HASH_EXECUTOR: str = str(config("HASH_EXECUTOR", default="thread"))  # thread | process
+HASH_WORKERS: int = config("HASH_WORKERS", default=2, cast=int)
+HASH_MAX_QUEUE: int = config("HASH_MAX_QUEUE", default=16, cast=int)
+HASH_RETRY_AFTER_SECONDS: int = config("HASH_RETRY_AFTER_SECONDS", default=1, cast=int)
+# Cómo se crean los procesos con HASH_EXECUTOR=process. Nunca fork: el worker ya tiene hilos
+# (pool de la base, logging, auditoría) y un hijo forkeado puede heredar un lock tomado.
+HASH_PROCESS_START_METHOD: str = str(config("HASH_PROCESS_START_METHOD", default="forkserver"))  # forkserver | spawn
+
+# Caché de payloads ya verificados (clave: digest del token, expira a más tardar en su exp)
+TOKEN_CACHE_TTL_SECONDS: int = config("TOKEN_CACHE_TTL_SECONDS", default=300, cast=int)
+TOKEN_CACHE_MAX_SIZE: int = config("TOKEN_CACHE_MAX_SIZE", default=4096, cast=int)
+
+token_cache = TTLCache(TOKEN_CACHE_MAX_SIZE, TOKEN_CACHE_TTL_SECONDS)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verificar si la contraseña plana coincide con el hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Generar hash de la contraseña"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Indicar si el hash usa un esquema o costo distinto al configurado"""
+    return get_pwd_context().needs_update(hashed_password)
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Crear token JWT"""
@@ -33,16 +115,240 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
+    # jti identifica al token para poder revocarlo en el logout
+    to_encode.setdefault("jti", secrets.token_hex(16))
+    from jose import jwt
+
+    if key_store is not None:
+        kid, private_key = key_store.signing_key()
+        return jwt.encode(to_encode, private_key, algorithm=ALGORITHM, headers={"kid": kid})
     encoded_jwt: str = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[Dict[str, Any]]:
-    """Verificar y decodificar token JWT"""
+def _decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """Verificar firma y claims del token JWT (sin caché)"""
+    from jose import JWTError, jwt
+
     try:
-        payload: Dict[str, Any] = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        if key_store is not None:
+            # La clave se elige por el kid del header, ya parseada en memoria
+            public_key = key_store.verification_key(jwt.get_unverified_header(token).get("kid"))
+            if public_key is None:
+                return None
+            payload: Dict[str, Any] = jwt.decode(token, public_key, algorithms=[ALGORITHM])
+        else:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: Optional[str] = payload.get("sub")
         if username is None:
             return None
         return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+def warm_up() -> None:
+    """Cargar passlib, jose y las claves de firma (se llama en segundo plano al arrancar)"""
+    get_pwd_context()
+    from jose import jwt  # noqa: F401
+
+    if key_store is not None:
+        key_store.signing_key()
+
+def verify_token(token: str) -> Optional[Dict[str, Any]]:
+    """Verificar y decodificar token JWT"""
+    key = hashlib.sha256(token.encode()).digest()
+    cached: Optional[Dict[str, Any]] = token_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+    
+    payload = _decode_token(token)
+    if payload is None:
+        return None
+    
+    # La entrada nunca sobrevive al exp del propio token
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        token_cache.set(key, payload, ttl_seconds=exp - time.time())
+    return dict(payload)
+
+logger = logging.getLogger(__name__)
+
+class HashingOverloadedError(Exception):
+    """El pool de hashing está lleno (workers ocupados y cola al límite)"""
+
+def _timed_call(func: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    """Ejecutar func en el worker y devolver (resultado, tiempo de ejecución)"""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+def _load_worker() -> None:
+    """Cargar passlib en un proceso del pool antes del primer login"""
+    get_pwd_context()
+
+def _process_context(start_method: str) -> Any:
+    """Contexto de multiprocessing para el pool (spawn donde no hay forkserver, p. ej. Windows)"""
+    if start_method not in multiprocessing.get_all_start_methods():
+        start_method = "spawn"
+    context = multiprocessing.get_context(start_method)
+    if start_method == "forkserver":
+        # El servidor importa este módulo una vez y cada worker parte de esa copia
+        context.set_forkserver_preload([__name__])
+    return context
+
+class PasswordHasher:
+    """Ejecuta verify/hash en un pool acotado con control de admisión"""
+
+    def __init__(self, kind: str, workers: int, max_queue: int) -> None:
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._restarts = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_time_total = 0.0
+        self._queue_time_max = 0.0
+        self._run_time_total = 0.0
+        self._run_time_max = 0.0
+
+    def start(self) -> Executor:
+        """
+        Crear el pool (se llama en el arranque de cada worker de la app). Con procesos, los
+        hijos se levantan y cargan passlib de inmediato, antes de recibir tráfico.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create_executor()
+            return self._executor
+
+    def _create_executor(self) -> Executor:
+        if self.kind == "process":
+            executor: Executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=_process_context(HASH_PROCESS_START_METHOD)
+            )
+            for _ in range(self.workers):
+                executor.submit(_load_worker)
+            return executor
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+
+    def _replace_broken(self, broken: Executor) -> Executor:
+        """
+        Un worker que muere (OOM, SIGKILL) deja el ProcessPoolExecutor inutilizable:
+        se crea otro (una sola vez aunque varias peticiones lo detecten a la vez)
+        """
+        with self._lock:
+            if self._executor is broken or self._executor is None:
+                self._executor = self._create_executor()
+                self._restarts += 1
+                logger.warning("Pool de hashing roto (murió un worker): se creó uno nuevo")
+            executor = self._executor
+        broken.shutdown(wait=False, cancel_futures=True)
+        return executor
+
+    def _submit(self, func: Callable[..., Any], *args: Any) -> "Future[Any]":
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                PASSWORD_HASH_REJECTED.inc()
+                raise HashingOverloadedError("Pool de hashing saturado")
+            self._pending += 1
+            self._submitted += 1
+            executor = self._executor
+        # Fuera de la app (scripts) no hay lifespan que lo cree
+        if executor is None:
+            executor = self.start()
+
+        submitted_at = time.perf_counter()
+        outer: "Future[Any]" = Future()
+
+        def _done(inner: "Future[Tuple[Any, float]]") -> None:
+            total = time.perf_counter() - submitted_at
+            with self._lock:
+                self._pending -= 1
+            if inner.cancelled():
+                outer.cancel()
+                return
+            error = inner.exception()
+            if error is not None:
+                outer.set_exception(error)
+                return
+            result, run_time = inner.result()
+            self._record(func.__name__, max(total - run_time, 0.0), run_time)
+            outer.set_result(result)
+
+        try:
+            try:
+                inner = executor.submit(_timed_call, func, *args)
+            except BrokenProcessPool:
+                inner = self._replace_broken(executor).submit(_timed_call, func, *args)
+        except BaseException:
+            # Sin tarea encolada no habrá callback que libere el lugar
+            with self._lock:
+                self._pending -= 1
+            raise
+        inner.add_done_callback(_done)
+        return outer
+
+    def _record(self, operation: str, queue_time: float, run_time: float) -> None:
+        PASSWORD_HASH_QUEUE.observe(queue_time, operation=operation)
+        PASSWORD_HASH_RUN.observe(run_time, operation=operation)
+        with self._lock:
+            self._completed += 1
+            self._queue_time_total += queue_time
+            self._queue_time_max = max(self._queue_time_max, queue_time)
+            self._run_time_total += run_time
+            self._run_time_max = max(self._run_time_max, run_time)
+
+    def run_blocking(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Ejecutar en el pool esperando en el hilo actual (para código síncrono)"""
+        return self._submit(func, *args).result()
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Ejecutar en el pool sin bloquear el event loop"""
+        return await asyncio.wrap_future(self._submit(func, *args))
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas para dimensionar el pool (tiempos en milisegundos)"""
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "executor": self.kind,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._pending,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "restarts": self._restarts,
+                "queue_time_avg_ms": round(self._queue_time_total / completed * 1000, 3),
+                "queue_time_max_ms": round(self._queue_time_max * 1000, 3),
+                "run_time_avg_ms": round(self._run_time_total / completed * 1000, 3),
+                "run_time_max_ms": round(self._run_time_max * 1000, 3),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+password_hasher = PasswordHasher(HASH_EXECUTOR, HASH_WORKERS, HASH_MAX_QUEUE)
+
+def verify_password_blocking(plain_password: str, hashed_password: str) -> bool:
+    """Verificar contraseña en el pool de hashing desde código síncrono"""
+    return password_hasher.run_blocking(verify_password, plain_password, hashed_password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verificar contraseña en el pool de hashing sin bloquear el event loop"""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+def get_password_hash_blocking(password: str) -> str:
+    """Generar hash de la contraseña en el pool de hashing desde código síncrono"""
+    return password_hasher.run_blocking(get_password_hash, password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Generar hash de la contraseña en el pool de hashing"""
+    return await password_hasher.run(get_password_hash, password)
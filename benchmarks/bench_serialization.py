@@ -0,0 +1,106 @@
+"""
+Microbenchmark: CPU por petición para armar y serializar las respuestas de
+/auth/login y /auth/profile, comparando el camino anterior (validación de
+Pydantic en cada paso + response_model + json) con el actual (mappers por rol,
+model_construct, JSON del perfil en caché y ORJSONResponse).
+
+Uso:
+    python -m benchmarks.bench_serialization --iterations 20000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict
+
+_workdir = tempfile.mkdtemp()
+_database = os.path.join(_workdir, "bench.sqlite")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_database}")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+import orjson  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+
+from app.models.user import UserProfileComplete  # noqa: E402
+from app.routes.auth import TokenResponseComplete  # noqa: E402
+from app.services import auth_service  # noqa: E402
+from benchmarks.seed import bench_username, seed  # noqa: E402
+
+TOKEN = "e" * 180
+
+def _legacy_profile(row: Any) -> UserProfileComplete:
+    """Camino anterior: modelo validado campo por campo desde la fila"""
+    mapping = row._mapping
+    return UserProfileComplete(**{name: mapping[name] for name in UserProfileComplete.model_fields if name in mapping})
+
+def _measure(label: str, func: Callable[[], Any], iterations: int) -> float:
+    for _ in range(min(iterations, 500)):
+        func()
+    started = time.process_time()
+    for _ in range(iterations):
+        func()
+    per_call = (time.process_time() - started) / iterations * 1e6
+    print(f"  {label:<10} {per_call:8.2f} µs CPU/petición")
+    return per_call
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    seed(_database, 3, bcrypt_rounds=4)
+    engine = create_engine(os.environ["DATABASE_URL"])
+    with engine.connect() as connection:
+        # bench00001 es Recepcionista, bench00002 Administrador, bench00003 Veterinario
+        login_row = connection.execute(auth_service.LOGIN_QUERY, {"username": bench_username(3)}).fetchone()
+        profile_row = connection.execute(auth_service.PROFILE_QUERIES["Veterinario"], {"id_usuario": 3}).fetchone()
+
+    token_field = create_model_field(name="response", type_=TokenResponseComplete, mode="serialization")
+    profile_field = create_model_field(name="response", type_=UserProfileComplete, mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def legacy_response(field: Any, content: Any) -> bytes:
+        data = loop.run_until_complete(serialize_response(field=field, response_content=content))
+        return JSONResponse(data).body
+
+    def legacy_login() -> bytes:
+        result: Dict[str, Any] = {"access_token": TOKEN, "token_type": "bearer", "user": _legacy_profile(login_row)}
+        return legacy_response(token_field, TokenResponseComplete(**result))
+
+    def current_login() -> bytes:
+        entry = auth_service._cache_profile(auth_service._profile_from_login_row(login_row))
+        return ORJSONResponse({
+            "access_token": TOKEN, "token_type": "bearer", "user": orjson.Fragment(entry.body)
+        }).body
+
+    def legacy_profile() -> bytes:
+        return legacy_response(profile_field, _legacy_profile(profile_row))
+
+    def current_profile_miss() -> bytes:
+        return auth_service._cache_profile(auth_service._build_profile("Veterinario", profile_row)).body
+
+    cached_entry = auth_service._cache_profile(auth_service._build_profile("Veterinario", profile_row))
+
+    def current_profile_hit() -> bytes:
+        return cached_entry.body
+
+    assert orjson.loads(legacy_login()) == orjson.loads(current_login())
+    assert orjson.loads(legacy_profile()) == orjson.loads(current_profile_miss())
+
+    print("/auth/login")
+    before = _measure("anterior", legacy_login, args.iterations)
+    after = _measure("actual", current_login, args.iterations)
+    print(f"  ahorro     {before - after:8.2f} µs ({(1 - after / before) * 100:.0f}%)")
+    print("/auth/profile")
+    before = _measure("anterior", legacy_profile, args.iterations)
+    after = _measure("sin caché", current_profile_miss, args.iterations)
+    print(f"  ahorro     {before - after:8.2f} µs ({(1 - after / before) * 100:.0f}%)")
+    _measure("en caché", current_profile_hit, args.iterations)
+    loop.close()
+
+if __name__ == "__main__":
+    main()
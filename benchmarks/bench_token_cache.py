@@ -0,0 +1,42 @@
+"""
+Microbenchmark: verificación de JWT con y sin la caché de payloads verificados.
+
+Uso:
+    python -m benchmarks.bench_token_cache --iterations 20000
+"""
+import argparse
+import os
+import time
+from datetime import timedelta
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+from app.utils import security  # noqa: E402
+
+def _run(label: str, func, token: str, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func(token)
+    elapsed = time.perf_counter() - started
+    rate = iterations / elapsed
+    print(f"{label:<10} {iterations} verificaciones en {elapsed:.3f}s -> {rate:,.0f} ops/s "
+          f"({elapsed / iterations * 1e6:.2f} µs/op)")
+    return rate
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = security.create_access_token(
+        data={"sub": "benchmark", "tipo_usuario": "Administrador", "id_usuario": 1},
+        expires_delta=timedelta(minutes=30)
+    )
+
+    uncached = _run("sin caché", security._decode_token, token, args.iterations)
+    security.token_cache.clear()
+    cached = _run("con caché", security.verify_token, token, args.iterations)
+    print(f"aceleración: x{cached / uncached:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Prueba de carga de la API de autenticación con reporte de latencias reproducible.
+
+Siembra una base SQLite, levanta `app.main:app` con uvicorn en un subproceso y
+ejecuta /auth/login, /auth/profile y /auth/verify-token con la concurrencia
+indicada. Reporta throughput y latencias p50/p95/p99 y guarda los resultados en
+JSON; con --baseline imprime la diferencia contra una corrida anterior.
+
+Uso:
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.load_test --concurrency 32 --requests 2000 --output bench.json
+    python -m benchmarks.load_test --baseline bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.seed import BENCH_PASSWORD, bench_username, seed
+
+SCENARIOS = ("login", "profile", "verify-token")
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def start_server(database: str, port: int, workers: int, extra_env: Dict[str, str]) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{database}",
+        "SECRET_KEY": "benchmark-secret-key",
+        # La base sembrada solo tiene las tablas de usuarios: el resto lo crean las migraciones
+        "DB_AUTO_MIGRATE": "True",
+        # Todo el tráfico sale de 127.0.0.1 y reusa usuarios: sin límite de intentos de login
+        "LOGIN_USER_BURST": "1000000000",
+        "LOGIN_IP_BURST": "1000000000",
+        **extra_env,
+    }
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    return subprocess.Popen(command, env=env)
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get("/health")
+            if response.status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("El servidor no respondió a /health a tiempo")
+
+async def _login(client: httpx.AsyncClient, user_index: int) -> httpx.Response:
+    return await client.post(
+        "/auth/login", json={"username": bench_username(user_index), "password": BENCH_PASSWORD}
+    )
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    request: Callable[[int], Awaitable[httpx.Response]],
+    total: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        for sequence in counter:
+            started = time.perf_counter()
+            try:
+                response = await request(sequence)
+                outcome = str(response.status_code)
+            except httpx.HTTPError as error:
+                outcome = type(error).__name__
+            latencies.append(time.perf_counter() - started)
+            if outcome != "200":
+                errors[outcome] = errors.get(outcome, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(total / elapsed, 2),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 3),
+        "errors": errors,
+    }
+
+async def run_benchmark(args: argparse.Namespace, base_url: str) -> Dict[str, Dict[str, Any]]:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        await wait_until_ready(client)
+
+        # Un token por usuario para los escenarios autenticados
+        token_users = list(range(1, min(args.users, args.token_users) + 1))
+        tokens: List[str] = []
+        for user_index in token_users:
+            response = await _login(client, user_index)
+            response.raise_for_status()
+            tokens.append(response.json()["access_token"])
+        picks = [rng.randrange(len(tokens)) for _ in range(args.requests)]
+        login_picks = [rng.randint(1, args.users) for _ in range(args.login_requests)]
+
+        async def login(sequence: int) -> httpx.Response:
+            return await _login(client, login_picks[sequence])
+
+        def authenticated(path: str) -> Callable[[int], Awaitable[httpx.Response]]:
+            async def _request(sequence: int) -> httpx.Response:
+                headers = {"Authorization": f"Bearer {tokens[picks[sequence]]}"}
+                return await client.get(path, headers=headers)
+            return _request
+
+        requests = {
+            "login": (login, args.login_requests),
+            "profile": (authenticated("/auth/profile"), args.requests),
+            "verify-token": (authenticated("/auth/verify-token"), args.requests),
+        }
+        results: Dict[str, Dict[str, Any]] = {}
+        for name in args.scenarios:
+            request, total = requests[name]
+            # Calentamiento corto para no medir el arranque en frío
+            await run_scenario(client, request, min(total, args.concurrency * 2), args.concurrency)
+            results[name] = await run_scenario(client, request, total, args.concurrency)
+        return results
+
+def print_report(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]]) -> None:
+    header = f"{'escenario':<14}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  errores"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        print(f"{name:<14}{result['throughput_rps']:>10}{result['p50_ms']:>10}"
+              f"{result['p95_ms']:>10}{result['p99_ms']:>10}  {result['errors'] or '-'}")
+        previous = (baseline or {}).get("scenarios", {}).get(name)
+        if previous:
+            deltas = []
+            for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+                before = previous.get(metric) or 0
+                change = (result[metric] - before) / before * 100 if before else 0.0
+                deltas.append(f"{metric} {change:+.1f}%")
+            print(f"{'  vs baseline':<14}" + ", ".join(deltas))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000, help="Peticiones por escenario autenticado")
+    parser.add_argument("--login-requests", type=int, default=200)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--token-users", type=int, default=50)
+    parser.add_argument("--bcrypt-rounds", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1234, help="Semilla para reproducir la mezcla de usuarios")
+    parser.add_argument("--env", action="append", default=[], metavar="CLAVE=VALOR",
+                        help="Variables de entorno extra para el servidor (repetible)")
+    parser.add_argument("--output", help="Archivo JSON con los resultados")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    if args.bcrypt_rounds is not None:
+        # El servidor usa el mismo costo que la semilla: sin rehash en segundo plano durante la medición
+        extra_env.setdefault("BCRYPT_ROUNDS", str(args.bcrypt_rounds))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database = os.path.join(workdir, "bench.sqlite")
+        seed(database, args.users, args.bcrypt_rounds)
+        port = _free_port()
+        server = start_server(database, port, args.workers, extra_env)
+        try:
+            results = asyncio.run(run_benchmark(args, f"http://127.0.0.1:{port}"))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "concurrency": args.concurrency, "requests": args.requests,
+            "login_requests": args.login_requests, "users": args.users,
+            "workers": args.workers, "bcrypt_rounds": args.bcrypt_rounds,
+            "seed": args.seed, "env": extra_env,
+        },
+        "scenarios": results,
+    }
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Crear y poblar una base SQLite con el esquema de autenticación
+(usuarios, Especialidad, Veterinario, Recepcionista, Administrador).
+
+Uso:
+    python -m benchmarks.seed --database /tmp/bench.sqlite --users 300
+"""
+import argparse
+import sqlite3
+from typing import Optional
+
+from passlib.context import CryptContext
+
+BENCH_PASSWORD = "benchmark123"
+ROLES = ("Veterinario", "Recepcionista", "Administrador")
+
+SCHEMA = """
+DROP TABLE IF EXISTS Veterinario;
+DROP TABLE IF EXISTS Recepcionista;
+DROP TABLE IF EXISTS Administrador;
+DROP TABLE IF EXISTS Especialidad;
+DROP TABLE IF EXISTS usuarios;
+
+CREATE TABLE usuarios (
+    id_usuario INTEGER PRIMARY KEY,
+    username VARCHAR(20) NOT NULL UNIQUE,
+    contraseña VARCHAR(255) NOT NULL,
+    tipo_usuario VARCHAR(20) NOT NULL,
+    estado VARCHAR(10) NOT NULL DEFAULT 'Activo',
+    fecha_creacion TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE Especialidad (
+    id_especialidad INTEGER PRIMARY KEY,
+    descripcion VARCHAR(100) NOT NULL
+);
+CREATE TABLE Veterinario (
+    id_veterinario INTEGER PRIMARY KEY,
+    id_usuario INTEGER NOT NULL UNIQUE REFERENCES usuarios(id_usuario),
+    nombre VARCHAR(50), apellido_paterno VARCHAR(50), apellido_materno VARCHAR(50),
+    email VARCHAR(100), dni VARCHAR(8), telefono VARCHAR(9), genero CHAR(1),
+    fecha_ingreso DATE, id_especialidad INTEGER REFERENCES Especialidad(id_especialidad),
+    codigo_CMVP VARCHAR(20), tipo_veterinario VARCHAR(20), fecha_nacimiento DATE,
+    disposicion VARCHAR(10), turno VARCHAR(10)
+);
+CREATE TABLE Recepcionista (
+    id_recepcionista INTEGER PRIMARY KEY,
+    id_usuario INTEGER NOT NULL UNIQUE REFERENCES usuarios(id_usuario),
+    nombre VARCHAR(50), apellido_paterno VARCHAR(50), apellido_materno VARCHAR(50),
+    email VARCHAR(100), dni VARCHAR(8), telefono VARCHAR(9), genero CHAR(1),
+    fecha_ingreso DATE, turno VARCHAR(10)
+);
+CREATE TABLE Administrador (
+    id_administrador INTEGER PRIMARY KEY,
+    id_usuario INTEGER NOT NULL UNIQUE REFERENCES usuarios(id_usuario),
+    nombre VARCHAR(50), apellido_paterno VARCHAR(50), apellido_materno VARCHAR(50),
+    email VARCHAR(100), dni VARCHAR(8), telefono VARCHAR(9), genero CHAR(1),
+    fecha_ingreso DATE
+);
+"""
+
+def bench_username(index: int) -> str:
+    return f"bench{index:05d}"
+
+def seed(database: str, users: int, bcrypt_rounds: Optional[int] = None) -> None:
+    """Recrear el esquema y cargar `users` usuarios repartidos entre los tres roles"""
+    context = CryptContext(schemes=["bcrypt"])
+    if bcrypt_rounds is not None:
+        context.update(bcrypt__rounds=bcrypt_rounds)
+    # Todos comparten contraseña: un solo hash evita minutos de bcrypt al sembrar
+    password_hash = context.hash(BENCH_PASSWORD)
+
+    connection = sqlite3.connect(database)
+    try:
+        connection.executescript(SCHEMA)
+        connection.executemany(
+            "INSERT INTO Especialidad (id_especialidad, descripcion) VALUES (?, ?)",
+            [(1, "Medicina general"), (2, "Cirugía"), (3, "Dermatología")]
+        )
+        for index in range(1, users + 1):
+            role = ROLES[index % len(ROLES)]
+            connection.execute(
+                "INSERT INTO usuarios (id_usuario, username, contraseña, tipo_usuario, estado) "
+                "VALUES (?, ?, ?, ?, 'Activo')",
+                (index, bench_username(index), password_hash, role)
+            )
+            person = (
+                index, f"Nombre{index}", "Paterno", "Materno", f"user{index}@bench.local",
+                f"{index:08d}", f"9{index:08d}", "F" if index % 2 else "M", "2024-01-15"
+            )
+            if role == "Veterinario":
+                connection.execute(
+                    "INSERT INTO Veterinario (id_usuario, nombre, apellido_paterno, apellido_materno, "
+                    "email, dni, telefono, genero, fecha_ingreso, id_especialidad, codigo_CMVP, "
+                    "tipo_veterinario, fecha_nacimiento, disposicion, turno) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'Especializado', '1990-05-01', 'Libre', 'Mañana')",
+                    person + (index % 3 + 1, f"CMVP{index:05d}")
+                )
+            elif role == "Recepcionista":
+                connection.execute(
+                    "INSERT INTO Recepcionista (id_usuario, nombre, apellido_paterno, apellido_materno, "
+                    "email, dni, telefono, genero, fecha_ingreso, turno) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'Tarde')",
+                    person
+                )
+            else:
+                connection.execute(
+                    "INSERT INTO Administrador (id_usuario, nombre, apellido_paterno, apellido_materno, "
+                    "email, dni, telefono, genero, fecha_ingreso) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    person
+                )
+        connection.commit()
+    finally:
+        connection.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", required=True, help="Ruta del archivo SQLite")
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--bcrypt-rounds", type=int, default=None, help="Por defecto, el de passlib")
+    args = parser.parse_args()
+    seed(args.database, args.users, args.bcrypt_rounds)
+    print(f"Base {args.database} poblada con {args.users} usuarios")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Configuración de las pruebas: una base SQLite temporal poblada con benchmarks.seed.
+
+La configuración de la app se lee al importarla (decouple), así que las variables de entorno
+se definen aquí antes de cualquier import de `app`. Las pruebas que necesitan otra
+configuración de arranque (DB_ASYNC, réplicas) corren en un proceso pytest aparte con
+`run_pytest`.
+"""
+from benchmarks.seed import BENCH_PASSWORD, ROLES, bench_username, seed
+from typing import Any, Callable, Dict, Iterator
+import itertools
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BCRYPT_TEST_ROUNDS = 4
+SEEDED_USERS = 9
+
+_workdir = tempfile.mkdtemp(prefix="vet-auth-tests-")
+DATABASE_PATH = os.path.join(_workdir, "auth.sqlite")
+
+# Variables que las pruebas fijan; un proceso hijo las recibe solo si se pasan explícitamente
+TEST_ENV: Dict[str, str] = {
+    "DATABASE_URL": f"sqlite:///{DATABASE_PATH}",
+    "SECRET_KEY": "clave-de-pruebas",
+    "JWT_KEYS_DIR": os.path.join(_workdir, "keys"),
+    "BCRYPT_ROUNDS": str(BCRYPT_TEST_ROUNDS),
+    "DB_AUTO_MIGRATE": "True",
+    "SCHEMA_EXPLAIN_ON_STARTUP": "False",
+    "LOGIN_USER_BURST": "1000",
+    "LOGIN_USER_PER_MINUTE": "1000",
+    "LOGIN_IP_BURST": "1000",
+    "LOGIN_IP_PER_MINUTE": "1000",
+    "LOGIN_LOCKOUT_USER_FAILURES": "1000",
+    "LOGIN_LOCKOUT_IP_FAILURES": "1000",
+    "DB_STARTUP_ATTEMPTS": "1",
+    "DB_BREAKER_RESET_SECONDS": "0.2",
+}
+_overridden = {name for name in TEST_ENV if name in os.environ}
+for _name, _value in TEST_ENV.items():
+    os.environ.setdefault(_name, _value)
+
+seed(DATABASE_PATH, SEEDED_USERS, bcrypt_rounds=BCRYPT_TEST_ROUNDS)
+
+def user_for_role(role: str) -> str:
+    """Username sembrado del rol (benchmarks.seed reparte los roles por índice)"""
+    return bench_username(next(index for index in range(1, SEEDED_USERS + 1) if ROLES[index % len(ROLES)] == role))
+
+@pytest.fixture(scope="session")
+def client() -> Iterator[Any]:
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def login(client: Any) -> Callable[..., Dict[str, Any]]:
+    """Iniciar sesión y devolver el cuerpo de la respuesta"""
+
+    def _login(username: str, password: str = BENCH_PASSWORD) -> Dict[str, Any]:
+        response = client.post("/auth/login", json={"username": username, "password": password})
+        assert response.status_code == 200, response.text
+        body: Dict[str, Any] = response.json()
+        return body
+
+    return _login
+
+_user_ids = itertools.count(SEEDED_USERS + 100)
+
+def create_user(password: str = BENCH_PASSWORD, rounds: int = BCRYPT_TEST_ROUNDS) -> Dict[str, Any]:
+    """Administrador propio de la prueba (para cambiarle la contraseña o el estado sin afectar a otras)"""
+    from passlib.context import CryptContext
+
+    id_usuario = next(_user_ids)
+    user = {"id_usuario": id_usuario, "username": f"prueba{id_usuario:05d}", "password": password}
+    password_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds).hash(password)
+    connection = sqlite3.connect(DATABASE_PATH)
+    try:
+        connection.execute(
+            "INSERT INTO usuarios (id_usuario, username, contraseña, tipo_usuario, estado) "
+            "VALUES (?, ?, ?, 'Administrador', 'Activo')",
+            (id_usuario, user["username"], password_hash)
+        )
+        connection.execute(
+            "INSERT INTO Administrador (id_usuario, nombre, apellido_paterno, apellido_materno, "
+            "email, dni, telefono, genero, fecha_ingreso) "
+            "VALUES (?, 'Prueba', 'Paterno', 'Materno', 'prueba@test.local', '00000000', '900000000', 'F', '2024-01-15')",
+            (id_usuario,)
+        )
+        connection.commit()
+    finally:
+        connection.close()
+    return user
+
+def stored_password_hash(id_usuario: int) -> str:
+    connection = sqlite3.connect(DATABASE_PATH)
+    try:
+        return str(connection.execute(
+            "SELECT contraseña FROM usuarios WHERE id_usuario = ?", (id_usuario,)
+        ).fetchone()[0])
+    finally:
+        connection.close()
+
+def auth_headers(body: Dict[str, Any]) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {body['access_token']}"}
+
+def _failing_statements(error: Exception) -> Iterator[None]:
+    """Hacer fallar con `error` toda sentencia de los motores primarios (y cerrar el breaker al final)"""
+    from sqlalchemy import event
+    from app.config import database
+
+    dialects = {database.engine.dialect}
+    if database.async_engine is not None:
+        dialects.add(database.async_engine.sync_engine.dialect)
+
+    def fail(cursor: Any, statement: str, parameters: Any, context: Any) -> None:
+        raise error
+
+    for dialect in dialects:
+        event.listen(dialect, "do_execute", fail)
+    try:
+        yield
+    finally:
+        for dialect in dialects:
+            event.remove(dialect, "do_execute", fail)
+        database.db_breaker.record_success()
+
+@pytest.fixture
+def database_down(client: Any) -> Iterator[None]:
+    """Simular la base caída: cada sentencia falla con un OperationalError"""
+    yield from _failing_statements(sqlite3.OperationalError("unable to open database file"))
+
+@pytest.fixture
+def database_disconnected(client: Any) -> Iterator[None]:
+    """Simular la conexión perdida: el dialecto reconoce el error como desconexión"""
+    yield from _failing_statements(sqlite3.ProgrammingError("Cannot operate on a closed database."))
+
+@pytest.fixture
+def run_pytest() -> Callable[..., "subprocess.CompletedProcess[str]"]:
+    """Correr módulos de prueba en otro proceso con otra configuración de arranque"""
+
+    def _run(*paths: str, **env: str) -> "subprocess.CompletedProcess[str]":
+        child_env = {
+            name: value for name, value in os.environ.items()
+            if name not in TEST_ENV or name in _overridden
+        }
+        child_env.update(env)
+        return subprocess.run(
+            [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", *paths],
+            cwd=ROOT, env=child_env, capture_output=True, text=True, timeout=300,
+        )
+
+    return _run
@@ -0,0 +1,97 @@
+"""Login, perfil y verificación de token (corre en modo síncrono y, desde test_db_modes, asíncrono)"""
+from conftest import auth_headers, user_for_role
+from typing import Any, Callable, Dict
+import inspect
+import logging
+
+import pytest
+
+from app.services.auth_service import AsyncAuthService, AuthService, invalidate_profile
+from app.utils.dependencies import get_current_user
+from benchmarks.seed import ROLES
+
+@pytest.mark.parametrize("role", ROLES)
+def test_login_returns_tokens_and_profile(login: Callable[..., Dict[str, Any]], role: str) -> None:
+    body = login(user_for_role(role))
+
+    assert body["token_type"] == "bearer"
+    assert body["access_token"] and body["refresh_token"]
+    assert body["user"]["username"] == user_for_role(role)
+    assert body["user"]["tipo_usuario"] == role
+    assert body["user"]["estado"] == "Activo"
+
+@pytest.mark.parametrize("role", ROLES)
+def test_profile_and_verify_token(client: Any, login: Callable[..., Dict[str, Any]], role: str) -> None:
+    headers = auth_headers(login(user_for_role(role)))
+
+    profile = client.get("/auth/profile", headers=headers)
+    assert profile.status_code == 200
+    assert profile.json()["tipo_usuario"] == role
+    assert profile.headers["etag"]
+
+    not_modified = client.get("/auth/profile", headers={**headers, "If-None-Match": profile.headers["etag"]})
+    assert not_modified.status_code == 304
+
+    verify = client.get("/auth/verify-token", headers=headers)
+    assert verify.status_code == 200
+    assert verify.json()["user"]["username"] == user_for_role(role)
+
+@pytest.mark.parametrize("role", ROLES)
+def test_login_and_profile_queries_return_the_same_body(
+    client: Any, login: Callable[..., Dict[str, Any]], role: str
+) -> None:
+    body = login(user_for_role(role))
+    headers = auth_headers(body)
+    id_usuario = body["user"]["id_usuario"]
+
+    # El login deja el perfil en caché: se quita para que /profile y el lote lean la base
+    invalidate_profile(id_usuario)
+    profile = client.get("/auth/profile", headers=headers).json()
+    invalidate_profile(id_usuario)
+    batch = client.post("/auth/profiles/batch", json={"ids": [id_usuario]}, headers=headers).json()
+
+    assert profile == body["user"]
+    assert batch == {"profiles": [body["user"]], "missing": []}
+    if role != "Administrador":
+        assert body["user"]["turno" if role == "Veterinario" else "turno_recepcionista"]
+
+def test_login_rejects_wrong_password(client: Any) -> None:
+    response = client.post("/auth/login", json={"username": user_for_role("Veterinario"), "password": "incorrecta"})
+    assert response.status_code == 401
+
+def test_login_rejects_unknown_user(client: Any) -> None:
+    response = client.post("/auth/login", json={"username": "noexiste", "password": "incorrecta"})
+    assert response.status_code == 401
+
+def test_profile_requires_token(client: Any) -> None:
+    assert client.get("/auth/profile").status_code == 403
+
+def test_sync_principal_dependency_runs_in_the_threadpool() -> None:
+    # Una dependencia async con db.execute síncrono bloquearía el event loop en cada petición
+    assert not inspect.iscoroutinefunction(get_current_user)
+
+def test_logout_revokes_token(client: Any, login: Callable[..., Dict[str, Any]]) -> None:
+    headers = auth_headers(login(user_for_role("Administrador")))
+
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+    assert client.get("/auth/verify-token", headers=headers).status_code == 401
+
+def test_unexpected_error_is_logged_not_exposed(
+    client: Any, login: Callable[..., Dict[str, Any]], monkeypatch: Any, caplog: Any
+) -> None:
+    headers = auth_headers(login(user_for_role("Veterinario")))
+
+    def fail(*args: Any) -> None:
+        raise RuntimeError("detalle interno")
+
+    async def fail_async(*args: Any) -> None:
+        fail()
+
+    monkeypatch.setattr(AuthService, "get_profile_entry", fail)
+    monkeypatch.setattr(AsyncAuthService, "get_profile_entry", fail_async)
+    with caplog.at_level(logging.ERROR, logger="app.routes.auth"):
+        response = client.get("/auth/profile", headers=headers)
+
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Error al obtener perfil"}
+    assert "detalle interno" in caplog.text
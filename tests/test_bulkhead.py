@@ -0,0 +1,99 @@
+"""Bulkhead por grupo de rutas: 503 con Retry-After al saturarse, sin afectar a otros grupos"""
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from typing import Any, Dict, Tuple
+import asyncio
+
+import httpx
+
+from app.utils import resilience
+from app.utils.resilience import BULKHEAD_RETRY_AFTER_SECONDS, Bulkhead, BulkheadMiddleware, route_group
+
+def _app(release: asyncio.Event) -> Any:
+    """App mínima: /auth/login espera a `release`; el resto responde enseguida"""
+
+    async def slow(request: Request) -> PlainTextResponse:
+        await release.wait()
+        return PlainTextResponse("login")
+
+    async def fast(request: Request) -> PlainTextResponse:
+        return PlainTextResponse(request.url.path)
+
+    app = Starlette(routes=[
+        Route("/auth/login", slow, methods=["POST"]),
+        Route("/auth/profile", fast),
+        Route("/health", fast),
+        Route("/citas", fast),
+    ])
+    return BulkheadMiddleware(app)
+
+def _bulkheads(monkeypatch: Any, **limits: Tuple[int, int]) -> Dict[str, Bulkhead]:
+    """Reemplazar los bulkheads del proceso: grupo=(límite, máximo en espera)"""
+    replaced = {
+        group: Bulkhead(f"prueba-{group}", limit, max_wait=0.05, max_queue=max_queue)
+        for group, (limit, max_queue) in limits.items()
+    }
+    monkeypatch.setattr(resilience, "bulkheads", replaced)
+    return replaced
+
+async def _saturate(bulkheads: Dict[str, Bulkhead]) -> Dict[str, Any]:
+    """Ocupar el único lugar de login y pedir otra vez login y otros grupos"""
+    release = asyncio.Event()
+    transport = httpx.ASGITransport(app=_app(release))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        held = asyncio.ensure_future(client.post("/auth/login"))
+        while bulkheads["login"].in_flight == 0:
+            await asyncio.sleep(0.001)
+        responses = {
+            "shed": await client.post("/auth/login"),
+            "auth": await client.get("/auth/profile"),
+            "default": await client.get("/citas"),
+            "exempt": await client.get("/health"),
+        }
+        release.set()
+        responses["held"] = await held
+        responses["after"] = await client.post("/auth/login")
+    return responses
+
+def test_over_limit_requests_get_503_with_retry_after(monkeypatch: Any) -> None:
+    bulkheads = _bulkheads(monkeypatch, login=(1, 10), auth=(1, 10), default=(1, 10))
+
+    responses = asyncio.run(_saturate(bulkheads))
+
+    shed = responses["shed"]
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == str(BULKHEAD_RETRY_AFTER_SECONDS)
+    assert shed.json() == {"detail": "Servidor saturado, intente nuevamente"}
+    assert bulkheads["login"].stats()["shed"] == 1
+
+    # Los otros grupos tienen su propio límite y no esperan al de login
+    assert responses["auth"].status_code == 200
+    assert responses["default"].status_code == 200
+    assert responses["exempt"].status_code == 200
+    assert bulkheads["auth"].stats()["shed"] == 0 and bulkheads["default"].stats()["shed"] == 0
+
+    # El lugar se libera al terminar la petición retenida
+    assert responses["held"].status_code == 200
+    assert responses["after"].status_code == 200
+    assert bulkheads["login"].stats()["in_flight"] == 0
+
+def test_full_queue_sheds_without_waiting(monkeypatch: Any) -> None:
+    bulkheads = _bulkheads(monkeypatch, login=(1, 0))
+
+    responses = asyncio.run(_saturate(bulkheads))
+
+    assert responses["shed"].status_code == 503
+    assert "retry-after" in responses["shed"].headers
+    # Sin bulkhead configurado para el grupo (límite 0) no se limita
+    assert responses["auth"].status_code == 200
+    assert responses["default"].status_code == 200
+
+def test_route_groups() -> None:
+    assert route_group("/auth/login") == "login"
+    assert route_group("/auth/change-password") == "login"
+    assert route_group("/auth/profile") == "auth"
+    assert route_group("/citas/1") == "default"
+    assert route_group("/health/ready") is None
+    assert route_group("/.well-known/jwks.json") is None
@@ -0,0 +1,79 @@
+"""Cambio de contraseña y re-hash en el login"""
+from conftest import BCRYPT_TEST_ROUNDS, auth_headers, create_user, stored_password_hash
+from sqlalchemy import text
+from typing import Any, Callable, Dict
+
+from app.services import auth_service
+
+NEW_PASSWORD = "contraseña-nueva-123"
+
+def _change(client: Any, body: Dict[str, Any], current: str, new: str = NEW_PASSWORD) -> Any:
+    return client.put(
+        "/auth/change-password", headers=auth_headers(body),
+        json={"current_password": current, "new_password": new},
+    )
+
+def test_change_password_closes_every_session(client: Any, login: Callable[..., Dict[str, Any]]) -> None:
+    user = create_user()
+    body = login(user["username"], user["password"])
+
+    response = _change(client, body, user["password"])
+
+    assert response.status_code == 200, response.text
+    assert client.get("/auth/verify-token", headers=auth_headers(body)).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": body["refresh_token"]}).status_code == 401
+    login_old = client.post("/auth/login", json={"username": user["username"], "password": user["password"]})
+    assert login_old.status_code == 401
+    assert login(user["username"], NEW_PASSWORD)["access_token"]
+
+def test_change_password_rejects_wrong_current_password(
+    client: Any, login: Callable[..., Dict[str, Any]]
+) -> None:
+    user = create_user()
+    body = login(user["username"], user["password"])
+    stored = stored_password_hash(user["id_usuario"])
+
+    response = _change(client, body, "no-es-la-actual")
+
+    assert response.status_code == 400
+    assert stored_password_hash(user["id_usuario"]) == stored
+    assert client.get("/auth/verify-token", headers=auth_headers(body)).status_code == 200
+
+def test_concurrent_change_answers_conflict(
+    client: Any, login: Callable[..., Dict[str, Any]], monkeypatch: Any
+) -> None:
+    user = create_user()
+    other = create_user(password="otra-contraseña")
+    body = login(user["username"], user["password"])
+    hash_password = auth_service.get_password_hash_blocking
+
+    def changed_meanwhile(password: str) -> str:
+        # Otra petición guardó una contraseña nueva entre la lectura y el UPDATE
+        with auth_service.SessionLocal() as db:
+            db.execute(text("UPDATE usuarios SET contraseña = :hash WHERE id_usuario = :id"), {
+                "hash": stored_password_hash(other["id_usuario"]), "id": user["id_usuario"],
+            })
+            db.commit()
+        return str(hash_password(password))
+
+    async def changed_meanwhile_async(password: str) -> str:
+        return changed_meanwhile(password)
+
+    # Modo síncrono y asíncrono (DB_ASYNC) hashean por caminos distintos
+    monkeypatch.setattr(auth_service, "get_password_hash_blocking", changed_meanwhile)
+    monkeypatch.setattr(auth_service, "get_password_hash_async", changed_meanwhile_async)
+    response = _change(client, body, user["password"])
+
+    assert response.status_code == 409
+    assert stored_password_hash(user["id_usuario"]) == stored_password_hash(other["id_usuario"])
+
+def test_login_upgrades_a_legacy_hash(client: Any, login: Callable[..., Dict[str, Any]]) -> None:
+    user = create_user(rounds=BCRYPT_TEST_ROUNDS + 1)
+    assert stored_password_hash(user["id_usuario"]).startswith(f"$2b${BCRYPT_TEST_ROUNDS + 1:02d}$")
+
+    login(user["username"], user["password"])
+
+    # El re-hash corre como tarea en segundo plano de la respuesta (TestClient la espera)
+    upgraded = stored_password_hash(user["id_usuario"])
+    assert upgraded.startswith(f"$2b${BCRYPT_TEST_ROUNDS:02d}$")
+    assert login(user["username"], user["password"])["access_token"]
@@ -0,0 +1,24 @@
+"""Las pruebas de login, sesiones y estado con otra configuración de arranque (se lee al importar la app)"""
+from typing import Any
+import os
+
+import pytest
+
+@pytest.mark.skipif(os.environ.get("DB_ASYNC") is not None, reason="ya corre en un proceso con DB_ASYNC fijado")
+def test_auth_flow_async_mode(run_pytest: Any) -> None:
+    result = run_pytest("tests/test_auth_flow.py", DB_ASYNC="True")
+    assert result.returncode == 0, result.stdout + result.stderr
+
+@pytest.mark.skipif(
+    os.environ.get("AUTH_TRUSTED_CLAIMS") is not None, reason="ya corre en un proceso con AUTH_TRUSTED_CLAIMS fijado"
+)
+@pytest.mark.parametrize("db_async", ["False", "True"])
+def test_trusted_claims_mode(run_pytest: Any, db_async: str) -> None:
+    # Desactivar y cambiar la contraseña deben invalidar los tokens también sin consultar la base
+    result = run_pytest(
+        "tests/test_auth_flow.py", "tests/test_change_password.py", "tests/test_user_status.py",
+        "tests/test_token_versions.py", "-rs",
+        AUTH_TRUSTED_CLAIMS="True", DB_ASYNC=db_async,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "skipped" not in result.stdout, result.stdout
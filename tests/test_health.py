@@ -0,0 +1,38 @@
+"""Probes de salud y estado del pool"""
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+from typing import Any
+
+from app.config.database import pool_status
+from app.config.migrations import SchemaCheck, upgrade
+from app.routes import health
+
+def test_ready_reports_pool_usage(client: Any) -> None:
+    response = client.get("/health/ready")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert body["pool"]["pool"].endswith("QueuePool")
+    assert body["pool"]["capacity"] == body["pool"]["size"] + 10
+    assert 0.0 <= body["pool"]["saturation"] <= 1.0
+
+def test_pool_status_without_queue_pool() -> None:
+    assert pool_status(create_engine("sqlite://", poolclass=NullPool)) == {"pool": "NullPool"}
+
+def test_live_does_not_need_database(client: Any) -> None:
+    assert client.get("/health/live").json() == {"status": "alive"}
+
+def test_ready_fails_while_required_migrations_are_pending(client: Any, tmp_path: Any, monkeypatch: Any) -> None:
+    unmigrated = create_engine(f"sqlite:///{tmp_path / 'sin-migrar.sqlite'}")
+    upgrade(unmigrated, ["0005_refresh_tokens"])
+    monkeypatch.setattr(health, "schema_check", SchemaCheck(unmigrated, 0))
+
+    response = client.get("/health/ready")
+
+    assert response.status_code == 503
+    assert set(response.json()["pending_migrations"]) >= {"0006_revoked_tokens", "0007_login_audit"}
+    assert "0005_refresh_tokens" not in response.json()["pending_migrations"]
+
+    upgrade(unmigrated, ["0006_revoked_tokens", "0007_login_audit"])
+    assert client.get("/health/ready").status_code == 200
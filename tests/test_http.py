@@ -0,0 +1,11 @@
+"""Utilidades HTTP compartidas por las rutas"""
+from app.utils.http import etag_matches
+
+def test_etag_matches_lists_wildcard_and_weak_etags() -> None:
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"xyz", "abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"xyz"', etag)
+    assert not etag_matches(None, etag)
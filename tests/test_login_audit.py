@@ -0,0 +1,68 @@
+"""Escritor de auditoría de logins"""
+from sqlalchemy import create_engine, func, select, text
+from typing import Any, List
+import threading
+import time
+
+from app.config.migrations import upgrade
+from app.config.schema import login_audit, login_stats
+from app.services.login_audit import LOGIN_FAILURE, LOGIN_SUCCESS, LOGOUT, AuditEvent, LoginAuditWriter
+
+def _writer(tmp_path: Any, queue_size: int = 100) -> LoginAuditWriter:
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.sqlite'}")
+    upgrade(engine, ["0007_login_audit"])
+    return LoginAuditWriter(engine, True, queue_size, batch_size=1, flush_seconds=0.05)
+
+def test_stop_writes_pending_events(tmp_path: Any) -> None:
+    writer = _writer(tmp_path)
+    for index in range(3):
+        writer.record(LOGOUT, f"usuario{index}", index)
+
+    writer.stop(timeout=5)
+
+    with writer.engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(login_audit)).scalar() == 3
+    assert writer.stats()["written"] == 3
+
+def test_stop_is_bounded_when_the_writer_is_stuck(tmp_path: Any) -> None:
+    writer = _writer(tmp_path, queue_size=1)
+    release = threading.Event()
+    writing = threading.Event()
+
+    def stuck_write(batch: List[AuditEvent]) -> None:
+        writing.set()
+        release.wait(5)
+
+    writer._write = stuck_write  # type: ignore[method-assign]
+    writer.record(LOGOUT, "usuario1", 1)
+    assert writing.wait(5)
+    writer.record(LOGOUT, "usuario2", 2)
+
+    started = time.monotonic()
+    writer.stop(timeout=0.2)
+    try:
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+
+def test_case_mismatched_username_does_not_drop_the_batch(tmp_path: Any) -> None:
+    writer = _writer(tmp_path)
+    writer.batch_size = 100
+    with writer.engine.begin() as connection:
+        # Collation sin distinción de mayúsculas, como la de MySQL por defecto
+        connection.execute(text(
+            "CREATE TABLE usuarios (id_usuario INTEGER PRIMARY KEY, username VARCHAR(20) COLLATE NOCASE)"
+        ))
+        connection.execute(text("INSERT INTO usuarios VALUES (1, 'admin'), (2, 'vet')"))
+
+    writer.record(LOGIN_FAILURE, "ADMIN")
+    writer.record(LOGIN_FAILURE, "admin")
+    writer.record(LOGIN_SUCCESS, "vet", 2)
+    writer.record(LOGIN_FAILURE, "nadie")
+    writer.stop(timeout=5)
+
+    assert writer.stats()["dropped_write_error"] == 0
+    with writer.engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(login_audit)).scalar() == 4
+        failures = dict(connection.execute(select(login_stats.c.id_usuario, login_stats.c.failed_attempts)).all())
+    assert failures == {1: 2, 2: 0}
@@ -0,0 +1,58 @@
+"""Limitador de intentos de login"""
+from fastapi import HTTPException
+from typing import Callable, Optional
+
+import pytest
+
+from app.services.login_throttle import (
+    InMemoryThrottleStore,
+    LoginThrottle,
+    State,
+    ThrottleStore,
+    _Limit,
+)
+
+@pytest.fixture
+def throttle() -> LoginThrottle:
+    limiter = LoginThrottle(InMemoryThrottleStore(100, 60))
+    limiter.user_limit = _Limit("user", burst=2, per_minute=1, lockout_failures=2)
+    return limiter
+
+def test_burst_then_429_with_retry_after(throttle: LoginThrottle) -> None:
+    throttle.check("usuario", None)
+    throttle.check("usuario", None)
+
+    with pytest.raises(HTTPException) as error:
+        throttle.check("usuario", None)
+    assert error.value.status_code == 429
+    assert error.value.headers is not None and int(error.value.headers["Retry-After"]) >= 1
+    # Otro usuario tiene su propio bucket
+    throttle.check("otro", None)
+
+def test_lockout_after_consecutive_failures(throttle: LoginThrottle) -> None:
+    throttle.record_failure("usuario", None)
+    throttle.record_failure("usuario", None)
+
+    with pytest.raises(HTTPException) as error:
+        throttle.check("USUARIO", None)
+    assert error.value.status_code == 429
+
+def test_success_clears_failures(throttle: LoginThrottle) -> None:
+    throttle.record_failure("usuario", None)
+    throttle.record_success("usuario")
+    throttle.record_failure("usuario", None)
+
+    throttle.check("usuario", None)
+
+def test_store_interface_is_abstract() -> None:
+    class Incomplete(ThrottleStore):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()  # type: ignore[abstract]
+
+    class Forgetful(ThrottleStore):
+        def update(self, key: str, function: Callable[[Optional[State]], State], ttl_seconds: float) -> State:
+            return function(None)
+
+    assert Forgetful().update("k", lambda state: {"tokens": 1.0}, 1)["tokens"] == 1.0
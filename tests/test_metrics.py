@@ -0,0 +1,30 @@
+"""Etiquetas de las métricas SQL"""
+from sqlalchemy import bindparam, create_engine, text
+from typing import Set
+
+from app.utils.metrics import DB_QUERY_DURATION, instrument_engine
+
+def _statement_labels(engine_name: str) -> Set[str]:
+    return {key[1] for key in DB_QUERY_DURATION._values if key[0] == engine_name}
+
+def test_expanding_in_batches_share_one_series() -> None:
+    engine = create_engine("sqlite://")
+    instrument_engine(engine, "metrics_test")
+    query = text("SELECT :n WHERE 1 IN :ids").bindparams(bindparam("ids", expanding=True))
+
+    with engine.connect() as connection:
+        for size in (1, 2, 50, 200):
+            connection.execute(query, {"n": size, "ids": list(range(size))}).fetchall()
+
+    labels = _statement_labels("metrics_test")
+    assert len(labels) == 1
+    assert "POSTCOMPILE_ids" in labels.pop()
+
+def test_driver_sql_uses_statement_text() -> None:
+    engine = create_engine("sqlite://")
+    instrument_engine(engine, "metrics_driver_test")
+
+    with engine.connect() as connection:
+        connection.exec_driver_sql("SELECT 1").fetchall()
+
+    assert _statement_labels("metrics_driver_test") == {"SELECT 1"}
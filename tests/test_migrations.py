@@ -0,0 +1,20 @@
+"""Migraciones del esquema"""
+from sqlalchemy import create_engine, inspect
+from typing import Any
+
+from app.config.migrations import MIGRATIONS, pending_migrations, upgrade
+
+def test_store_table_in_a_separate_database(tmp_path: Any) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'store.sqlite'}")
+
+    assert upgrade(engine, ["0005_refresh_tokens"]) == ["0005_refresh_tokens"]
+
+    assert "refresh_tokens" in inspect(engine).get_table_names()
+    assert "0005_refresh_tokens" not in {migration.id for migration in pending_migrations(engine)}
+    assert len(pending_migrations(engine)) == len(MIGRATIONS) - 1
+
+def test_status_does_not_create_the_migrations_table(tmp_path: Any) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.sqlite'}")
+
+    assert len(pending_migrations(engine)) == len(MIGRATIONS)
+    assert inspect(engine).get_table_names() == []
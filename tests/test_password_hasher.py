@@ -0,0 +1,85 @@
+"""Pool de hashing con hilos y con procesos (forkserver/spawn, nunca fork)"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+import asyncio
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from app.utils.security import (
+    HashingOverloadedError,
+    PasswordHasher,
+    get_password_hash,
+    verify_password,
+)
+
+@pytest.fixture(scope="module")
+def password_hash() -> str:
+    return get_password_hash("contraseña-de-prueba")
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_verify_in_pool(kind: str, password_hash: str) -> None:
+    hasher = PasswordHasher(kind, 2, 4)
+    hasher.start()
+    try:
+        assert hasher.run_blocking(verify_password, "contraseña-de-prueba", password_hash)
+        assert not asyncio.run(hasher.run(verify_password, "otra", password_hash))
+        assert hasher.stats()["completed"] == 2
+    finally:
+        hasher.shutdown()
+
+def test_process_pool_does_not_fork() -> None:
+    hasher = PasswordHasher("process", 1, 1)
+    executor: Any = hasher.start()
+    try:
+        assert isinstance(executor, ProcessPoolExecutor)
+        assert executor._mp_context.get_start_method() in ("forkserver", "spawn")
+        assert hasher.start() is executor
+    finally:
+        hasher.shutdown()
+
+def test_rejects_when_queue_is_full(password_hash: str) -> None:
+    hasher = PasswordHasher("thread", 1, 0)
+    hasher.start()
+    busy = threading.Event()
+    try:
+        first = hasher._submit(busy.wait, 5)
+        with pytest.raises(HashingOverloadedError):
+            hasher.run_blocking(verify_password, "contraseña-de-prueba", password_hash)
+        busy.set()
+        assert first.result()
+    finally:
+        hasher.shutdown()
+
+def test_replaces_the_process_pool_after_a_worker_dies(password_hash: str) -> None:
+    hasher = PasswordHasher("process", 1, 1)
+    executor: Any = hasher.start()
+    try:
+        assert hasher.run_blocking(verify_password, "contraseña-de-prueba", password_hash)
+        for process in list(executor._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+        deadline = time.monotonic() + 10
+        while not executor._broken and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        for _ in range(3):
+            assert hasher.run_blocking(verify_password, "contraseña-de-prueba", password_hash)
+        stats = hasher.stats()
+        assert stats["restarts"] == 1
+        assert stats["in_flight"] == 0
+    finally:
+        hasher.shutdown()
+
+def test_failed_submit_releases_its_slot() -> None:
+    hasher = PasswordHasher("thread", 1, 0)
+    executor = hasher.start()
+    executor.shutdown()
+    try:
+        with pytest.raises(RuntimeError):
+            hasher._submit(time.sleep, 0)
+        assert hasher.stats()["in_flight"] == 0
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,47 @@
+"""Caché de usuarios autenticados e invalidación por username y por id"""
+from conftest import auth_headers, user_for_role
+from typing import Any, Callable, Dict
+
+from app.utils import dependencies
+from app.utils.cache import TTLCache
+from app.utils.dependencies import _cached_principal, _user_from_row, invalidate_principal, principal_cache
+
+def _cache_user(id_usuario: int, username: str) -> None:
+    _user_from_row((id_usuario, username, "Veterinario", "Activo"))  # type: ignore[arg-type]
+
+def test_invalidate_by_id_after_lru_pressure(monkeypatch: Any) -> None:
+    monkeypatch.setattr(dependencies, "principal_cache", TTLCache(2, 60))
+    monkeypatch.setattr(dependencies, "_principal_ids", TTLCache(2, 60))
+    _cache_user(1, "frecuente")
+    _cache_user(2, "ocasional")
+    # Los aciertos mantienen al usuario frecuente en las dos cachés; se desaloja el ocasional
+    assert _cached_principal("frecuente") is not None
+    _cache_user(3, "nuevo")
+    assert _cached_principal("ocasional") is None
+
+    invalidate_principal(id_usuario=1)
+
+    assert _cached_principal("frecuente") is None
+    assert _cached_principal("nuevo") is not None
+
+def _cached_after_request(client: Any, login: Callable[..., Dict[str, Any]]) -> Dict[str, Any]:
+    body = login(user_for_role("Administrador"))
+    assert client.get("/auth/verify-token", headers=auth_headers(body)).status_code == 200
+    principal: Dict[str, Any] = principal_cache.get(body["user"]["username"])
+    assert principal is not None
+    return principal
+
+def test_invalidate_by_username(client: Any, login: Callable[..., Dict[str, Any]]) -> None:
+    principal = _cached_after_request(client, login)
+
+    invalidate_principal(username=principal["username"])
+
+    assert principal_cache.get(principal["username"]) is None
+    assert dependencies._principal_ids.get(principal["id_usuario"]) is None
+
+def test_invalidate_by_id(client: Any, login: Callable[..., Dict[str, Any]]) -> None:
+    principal = _cached_after_request(client, login)
+
+    invalidate_principal(id_usuario=principal["id_usuario"])
+
+    assert principal_cache.get(principal["username"]) is None
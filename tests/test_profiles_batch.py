@@ -0,0 +1,65 @@
+"""Perfiles en lote: desconocidos, duplicados, tope y respuesta por partes"""
+from conftest import SEEDED_USERS, auth_headers, user_for_role
+from typing import Any, Callable, Dict, List
+import json
+
+import pytest
+
+from app.models.user import PROFILE_BATCH_MAX_IDS
+from app.routes import auth as auth_routes
+from app.services.auth_service import invalidate_profile
+
+@pytest.fixture
+def headers(login: Callable[..., Dict[str, Any]]) -> Dict[str, str]:
+    return auth_headers(login(user_for_role("Recepcionista")))
+
+def _batch(client: Any, headers: Dict[str, str], ids: List[Any]) -> Any:
+    return client.post("/auth/profiles/batch", json={"ids": ids}, headers=headers)
+
+def test_unknown_and_duplicate_ids(client: Any, headers: Dict[str, str]) -> None:
+    response = _batch(client, headers, [3, 999999, 1, 3, 999998, 999999])
+
+    assert response.status_code == 200
+    body = response.json()
+    # Cada perfil una sola vez, en el orden pedido; los desconocidos van aparte
+    assert [profile["id_usuario"] for profile in body["profiles"]] == [3, 1]
+    assert body["missing"] == [999999, 999998]
+
+def test_batch_matches_single_profiles(client: Any, headers: Dict[str, str], login: Callable[..., Dict[str, Any]]) -> None:
+    ids = list(range(1, SEEDED_USERS + 1))
+    for id_usuario in ids[::2]:
+        invalidate_profile(id_usuario)  # mitad desde la caché, mitad desde la base
+
+    body = _batch(client, headers, ids).json()
+
+    assert [profile["id_usuario"] for profile in body["profiles"]] == ids
+    own = login(user_for_role("Veterinario"))["user"]
+    assert body["profiles"][own["id_usuario"] - 1] == own
+
+def test_streams_profiles_in_chunks(client: Any, headers: Dict[str, str], monkeypatch: Any) -> None:
+    # Partes de dos perfiles: el cuerpo armado por partes sigue siendo un JSON válido
+    monkeypatch.setattr(auth_routes, "_STREAM_CHUNK_PROFILES", 2)
+    ids = list(range(1, SEEDED_USERS + 1))
+
+    response = _batch(client, headers, ids + [999999])
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert "content-length" not in response.headers
+    body = json.loads(response.content)
+    assert [profile["id_usuario"] for profile in body["profiles"]] == ids
+    assert body["missing"] == [999999]
+
+@pytest.mark.parametrize("ids", [[], list(range(1, PROFILE_BATCH_MAX_IDS + 2)), [1] * (PROFILE_BATCH_MAX_IDS + 1), ["uno"]])
+def test_invalid_batches_are_rejected(client: Any, headers: Dict[str, str], ids: List[Any]) -> None:
+    assert _batch(client, headers, ids).status_code == 422
+
+def test_batch_at_the_cap_is_accepted(client: Any, headers: Dict[str, str]) -> None:
+    response = _batch(client, headers, list(range(1, PROFILE_BATCH_MAX_IDS + 1)))
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["profiles"]) + len(body["missing"]) == PROFILE_BATCH_MAX_IDS
+
+def test_batch_requires_a_token(client: Any) -> None:
+    assert client.post("/auth/profiles/batch", json={"ids": [1]}).status_code == 403
@@ -0,0 +1,53 @@
+"""Rotación de refresh tokens, detección de reutilización y errores del almacén"""
+from conftest import user_for_role
+from typing import Any, Callable, Dict
+import logging
+
+import pytest
+
+from app.services.refresh_token_service import RefreshTokenStore, refresh_token_service
+
+def _refresh(client: Any, token: str) -> Any:
+    return client.post("/auth/refresh", json={"refresh_token": token})
+
+def test_refresh_rotates_the_token(client: Any, login: Callable[..., Dict[str, Any]]) -> None:
+    body = login(user_for_role("Veterinario"))
+
+    response = _refresh(client, body["refresh_token"])
+
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != body["refresh_token"]
+    verify = client.get("/auth/verify-token", headers={"Authorization": f"Bearer {rotated['access_token']}"})
+    assert verify.status_code == 200
+
+def test_reused_token_revokes_the_session(client: Any, login: Callable[..., Dict[str, Any]]) -> None:
+    body = login(user_for_role("Recepcionista"))
+    rotated = _refresh(client, body["refresh_token"]).json()
+
+    assert _refresh(client, body["refresh_token"]).status_code == 401
+    # La reutilización revoca toda la familia, incluido el token que sí era vigente
+    assert _refresh(client, rotated["refresh_token"]).status_code == 401
+
+def test_unknown_token_is_rejected(client: Any) -> None:
+    assert _refresh(client, "x" * 43).status_code == 401
+
+def test_store_error_is_logged_not_exposed(
+    client: Any, login: Callable[..., Dict[str, Any]], monkeypatch: Any, caplog: Any
+) -> None:
+    body = login(user_for_role("Administrador"))
+
+    def fail(token_hash: str) -> None:
+        raise RuntimeError("no such table: refresh_tokens")
+
+    monkeypatch.setattr(refresh_token_service.store, "get", fail)
+    with caplog.at_level(logging.ERROR, logger="app.routes.auth"):
+        response = _refresh(client, body["refresh_token"])
+
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Error al renovar el token"}
+    assert "no such table" in caplog.text
+
+def test_store_interface_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        RefreshTokenStore()  # type: ignore[abstract]
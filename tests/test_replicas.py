@@ -0,0 +1,83 @@
+"""Lecturas en réplicas: respaldo en el primario y lectura de lo propio escrito"""
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from typing import Any, Callable
+import time
+
+import pytest
+
+from app.config import database
+from app.config.database import Replica, ReplicaRouter, RoutingSession, mark_write, route_reads_for
+from app.utils.cache import TTLCache
+
+def _database(path: Any, origin: str) -> Engine:
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE origen (nombre VARCHAR(10))"))
+        connection.execute(text("INSERT INTO origen VALUES (:nombre)"), {"nombre": origin})
+    return engine
+
+def _origin(db: Session) -> str:
+    return str(db.execute(text("SELECT nombre FROM origen")).scalar_one())
+
+@pytest.fixture
+def primary(tmp_path: Any) -> Engine:
+    return _database(tmp_path / "primary.sqlite", "primario")
+
+def _sessions(primary: Engine, replica: Engine) -> Callable[[], Session]:
+    router = ReplicaRouter([Replica("replica1", replica)], cooldown=30)
+    return sessionmaker(class_=RoutingSession, router=router, primary=primary)
+
+def test_reads_go_to_the_replica(primary: Engine, tmp_path: Any) -> None:
+    sessions = _sessions(primary, _database(tmp_path / "replica.sqlite", "replica"))
+    with sessions() as db:
+        assert _origin(db) == "replica"
+
+def test_failed_replica_falls_back_to_primary(primary: Engine, tmp_path: Any) -> None:
+    # Una ruta inexistente falla al conectar como una réplica caída
+    unreachable = create_engine(f"sqlite:///{tmp_path / 'no' / 'existe.sqlite'}")
+    router = ReplicaRouter([Replica("replica1", unreachable)], cooldown=30)
+    sessions = sessionmaker(class_=RoutingSession, router=router, primary=primary)
+
+    with sessions() as db:
+        assert _origin(db) == "primario"
+
+    assert router.stats()[0]["healthy"] is False
+    assert router.stats()[0]["failures"] == 1
+    assert router.pick() is None
+
+def test_exhausted_replica_pool_falls_back_to_primary(primary: Engine, tmp_path: Any) -> None:
+    path = tmp_path / "replica.sqlite"
+    _database(path, "replica")
+    # Pool de una sola conexión, ocupada: la réplica no da abasto
+    replica = create_engine(f"sqlite:///{path}", poolclass=QueuePool, pool_size=1, max_overflow=0, pool_timeout=0.1)
+    router = ReplicaRouter([Replica("replica1", replica)], cooldown=30)
+    sessions = sessionmaker(class_=RoutingSession, router=router, primary=primary)
+
+    with replica.connect():
+        with sessions() as db:
+            assert _origin(db) == "primario"
+
+    assert router.stats()[0]["healthy"] is False
+    assert router.pick() is None
+
+def test_reads_after_a_write_use_the_primary_until_the_window_ends(
+    primary: Engine, tmp_path: Any, monkeypatch: Any
+) -> None:
+    monkeypatch.setattr(database, "_recent_writes", TTLCache(100, 0.2))
+    sessions = _sessions(primary, _database(tmp_path / "replica.sqlite", "replica"))
+    mark_write(7)
+
+    with sessions() as db:
+        route_reads_for(db, 7)
+        assert _origin(db) == "primario"
+    with sessions() as db:
+        route_reads_for(db, 8)
+        assert _origin(db) == "replica"
+
+    time.sleep(0.3)
+    with sessions() as db:
+        route_reads_for(db, 7)
+        assert _origin(db) == "replica"
@@ -0,0 +1,66 @@
+"""Circuit breaker de la base: 503 ante errores de conexión y apertura solo por desconexiones"""
+from conftest import auth_headers, user_for_role
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+from typing import Any, Callable, Dict
+
+import pytest
+
+from app.config import database
+from app.config.database import db_breaker, guarded_connection
+from app.utils.resilience import CLOSED, OPEN, DatabaseUnavailableError
+
+def _select_one() -> None:
+    with guarded_connection(database.engine) as connection:
+        connection.execute(text("SELECT 1"))
+
+@pytest.fixture
+def session_tokens(client: Any, login: Callable[..., Dict[str, Any]]) -> Dict[str, Any]:
+    """Sesión abierta con la base disponible (el principal queda en caché)"""
+    body = login(user_for_role("Veterinario"))
+    assert client.get("/auth/verify-token", headers=auth_headers(body)).status_code == 200
+    return body
+
+def test_direct_engine_paths_answer_503_when_the_database_is_down(
+    client: Any, session_tokens: Dict[str, Any], database_down: Any
+) -> None:
+    response = client.post("/auth/refresh", json={"refresh_token": session_tokens["refresh_token"]})
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+    response = client.post("/auth/logout", headers=auth_headers(session_tokens))
+    assert response.status_code == 503
+    assert "OperationalError" not in response.text
+
+def test_query_errors_do_not_open_the_breaker(database_down: Any) -> None:
+    for _ in range(db_breaker.failure_threshold * 2):
+        with pytest.raises(DatabaseUnavailableError):
+            _select_one()
+    assert db_breaker.state == CLOSED
+
+def test_disconnects_open_the_breaker(database_disconnected: Any) -> None:
+    for _ in range(db_breaker.failure_threshold):
+        with pytest.raises(DatabaseUnavailableError):
+            _select_one()
+    assert db_breaker.state == OPEN
+
+    # Abierto: se rechaza sin pedir conexión al pool
+    rejected = db_breaker.rejected
+    with pytest.raises(DatabaseUnavailableError):
+        _select_one()
+    assert db_breaker.rejected == rejected + 1
+
+def test_pool_timeout_counts_as_a_failure(tmp_path: Any, monkeypatch: Any) -> None:
+    small = create_engine(
+        f"sqlite:///{tmp_path / 'pool.sqlite'}", poolclass=QueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    monkeypatch.setattr(database, "_breaker_engines", {small})
+    held = small.connect()
+    try:
+        with pytest.raises(DatabaseUnavailableError):
+            with guarded_connection(small):
+                pass
+        assert db_breaker.failures == 1
+    finally:
+        held.close()
+        db_breaker.record_success()
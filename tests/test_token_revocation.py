@@ -0,0 +1,118 @@
+"""Lista de tokens revocados: consultas en memoria, sincronización y política ante fallos"""
+from conftest import auth_headers, user_for_role
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict
+import asyncio
+import time
+
+import pytest
+
+from app.config.migrations import upgrade
+from app.config.schema import revoked_tokens
+from app.services.token_revocation import RevocationList
+from app.utils.resilience import DatabaseUnavailableError
+
+@pytest.fixture
+def store(tmp_path: Any) -> Engine:
+    engine = create_engine(f"sqlite:///{tmp_path / 'revocations.sqlite'}")
+    upgrade(engine, ["0006_revoked_tokens"])
+    return engine
+
+@pytest.fixture
+def unreachable(tmp_path: Any) -> Engine:
+    return create_engine(f"sqlite:///{tmp_path / 'no-existe' / 'db.sqlite'}")
+
+def _revocations(engine: Engine, **options: Any) -> RevocationList:
+    settings: Dict[str, Any] = {"sync_seconds": 30, "max_stale_seconds": 120, "max_entries": 1000}
+    settings.update(options)
+    return RevocationList(engine, **settings)
+
+def test_revocations_are_shared_through_the_database(store: Engine) -> None:
+    first, second = _revocations(store), _revocations(store)
+    assert asyncio.run(first.refresh()) and asyncio.run(second.refresh())
+
+    first.revoke("jti-1", time.time() + 60)
+    assert first.is_revoked("jti-1")
+    assert not second.is_revoked("jti-1")
+
+    assert asyncio.run(second.refresh())
+    assert second.is_revoked("jti-1")
+    # Una lista nueva (reinicio) la carga desde la base
+    restarted = _revocations(store)
+    assert asyncio.run(restarted.refresh()) and restarted.is_revoked("jti-1")
+
+def test_sync_reads_revocations_committed_late(store: Engine) -> None:
+    first, second = _revocations(store), _revocations(store)
+    assert asyncio.run(second.refresh())
+    first.revoke("jti-nuevo", time.time() + 60)
+    assert asyncio.run(second.refresh()) and second.is_revoked("jti-nuevo")
+
+    # Revocada antes que la última ya sincronizada, pero confirmada después (o con el reloj atrasado)
+    with store.begin() as connection:
+        connection.execute(insert(revoked_tokens).values(
+            jti="jti-tardio",
+            expires_at=datetime.utcnow() + timedelta(minutes=1),
+            revoked_at=datetime.utcnow() - timedelta(seconds=30),
+        ))
+    assert asyncio.run(second.refresh())
+    assert second.is_revoked("jti-tardio")
+
+def test_repeated_logout_of_the_same_token(store: Engine) -> None:
+    exp = time.time() + 60
+    _revocations(store).revoke("jti-1", exp)
+    # Otro worker, que todavía no lo tiene en memoria, revoca el mismo token
+    _revocations(store).revoke("jti-1", exp)
+
+    restarted = _revocations(store)
+    assert asyncio.run(restarted.refresh()) and restarted.is_revoked("jti-1")
+
+def test_fail_open_answers_from_memory(unreachable: Engine) -> None:
+    revocations = _revocations(unreachable)
+
+    assert not asyncio.run(revocations.refresh())
+    assert revocations.stats()["sync_failures"] == 1
+    assert not revocations.is_revoked("jti-1")
+
+def test_fail_closed_rejects_until_loaded(unreachable: Engine) -> None:
+    revocations = _revocations(unreachable, fail_closed=True)
+
+    assert not asyncio.run(revocations.refresh())
+    with pytest.raises(DatabaseUnavailableError) as error:
+        revocations.is_revoked("jti-1")
+    assert error.value.status_code == 503
+
+def test_fail_closed_rejects_when_stale(store: Engine) -> None:
+    revocations = _revocations(store, fail_closed=True, max_stale_seconds=0.05)
+    assert asyncio.run(revocations.refresh())
+    assert not revocations.is_revoked("jti-1")
+
+    time.sleep(0.1)
+    with pytest.raises(DatabaseUnavailableError):
+        revocations.is_revoked("jti-1")
+
+def test_entries_are_capped(store: Engine) -> None:
+    revocations = _revocations(store, max_entries=2)
+    now = time.time()
+    revocations.revoke("expira-primero", now + 10)
+    revocations.revoke("expira-despues", now + 60)
+    revocations.revoke("expira-ultimo", now + 120)
+
+    assert len(revocations) == 2
+    assert not revocations.is_revoked("expira-primero")
+    assert revocations.is_revoked("expira-ultimo")
+    assert revocations.stats()["overflow_evictions"] == 1
+
+@pytest.fixture
+def verified_headers(client: Any, login: Callable[..., Dict[str, Any]]) -> Dict[str, str]:
+    headers = auth_headers(login(user_for_role("Veterinario")))
+    assert client.get("/auth/verify-token", headers=headers).status_code == 200
+    return headers
+
+def test_verify_token_does_not_touch_the_database(
+    client: Any, verified_headers: Dict[str, str], database_down: Any
+) -> None:
+    # Usuario en la caché de principales y revocaciones en memoria: responde sin la base
+    response = client.get("/auth/verify-token", headers=verified_headers)
+    assert response.status_code == 200
@@ -0,0 +1,85 @@
+"""Mapa de token_version y modo de claims confiables (AUTH_TRUSTED_CLAIMS, desde test_db_modes)"""
+from conftest import auth_headers, create_user
+from jose import jwt
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from typing import Any, Callable, Dict
+
+import pytest
+
+from app.services.token_versions import AUTH_TRUSTED_CLAIMS, TokenVersionMap, UserVersion
+
+trusted_only = pytest.mark.skipif(not AUTH_TRUSTED_CLAIMS, reason="solo con AUTH_TRUSTED_CLAIMS=True")
+
+@pytest.fixture
+def users_engine(tmp_path: Any) -> Engine:
+    engine = create_engine(f"sqlite:///{tmp_path / 'versions.sqlite'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE usuarios (id_usuario INTEGER PRIMARY KEY, "
+            "token_version INTEGER NOT NULL DEFAULT 0, estado VARCHAR(10))"
+        ))
+        connection.execute(text("INSERT INTO usuarios VALUES (1, 0, 'Activo'), (2, 0, 'Inactivo')"))
+    return engine
+
+def test_user_version_accepts_only_the_current_version() -> None:
+    assert UserVersion(2, True).accepts(2) is True
+    assert UserVersion(2, True).accepts(1) is False
+    assert UserVersion(2, False).accepts(2) is False
+    # Token más nuevo que el mapa: hay que leer la base
+    assert UserVersion(2, True).accepts(3) is None
+
+def test_load_and_lookup(users_engine: Engine) -> None:
+    versions = TokenVersionMap(users_engine, refresh_seconds=15, max_age_seconds=60)
+    assert versions.lookup(1) is None
+
+    versions.load()
+
+    assert versions.lookup(1) == UserVersion(0, True)
+    assert versions.lookup(2) == UserVersion(0, False)
+    assert versions.lookup(3) is None
+    assert versions.stats()["size"] == 2
+
+def test_stale_map_is_not_trusted(users_engine: Engine) -> None:
+    versions = TokenVersionMap(users_engine, refresh_seconds=15, max_age_seconds=0)
+    versions.load()
+
+    assert versions.lookup(1) is None
+
+def test_bump_during_load_is_kept(users_engine: Engine) -> None:
+    versions = TokenVersionMap(users_engine, refresh_seconds=15, max_age_seconds=60)
+    versions.load()
+
+    # El cambio de estado se confirma y aplica en memoria justo después de que la recarga leyó la base
+    @event.listens_for(users_engine, "after_cursor_execute")
+    def bump_meanwhile(*args: Any) -> None:
+        versions.bump(1, active=False)
+
+    versions.load()
+    event.remove(users_engine, "after_cursor_execute", bump_meanwhile)
+
+    assert versions.lookup(1) == UserVersion(1, False)
+    assert versions.lookup(2) == UserVersion(0, False)
+
+def test_remember_replaces_and_forgets(users_engine: Engine) -> None:
+    versions = TokenVersionMap(users_engine, refresh_seconds=15, max_age_seconds=60)
+    versions.load()
+    versions.set(1, 5, True)
+
+    assert versions.fetch(1) == UserVersion(0, True)
+    assert versions.fetch(99) is None
+    assert versions.stats()["db_lookups"] == 2
+
+@trusted_only
+def test_trusted_claims_survive_a_database_outage(
+    client: Any, login: Callable[..., Dict[str, Any]], request: Any
+) -> None:
+    user = create_user()
+    body = login(user["username"], user["password"])
+    claims = jwt.get_unverified_claims(body["access_token"])
+    assert claims["id_usuario"] == user["id_usuario"]
+    assert claims["tipo_usuario"] == "Administrador" and claims["estado"] == "Activo"
+    assert isinstance(claims["token_version"], int)
+
+    request.getfixturevalue("database_down")
+    assert client.get("/auth/verify-token", headers=auth_headers(body)).status_code == 200
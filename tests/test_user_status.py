@@ -0,0 +1,41 @@
+"""Activar y desactivar usuarios (corre también con AUTH_TRUSTED_CLAIMS desde test_db_modes)"""
+from conftest import auth_headers, create_user, user_for_role
+from typing import Any, Callable, Dict
+
+def _set_status(client: Any, admin: Dict[str, Any], id_usuario: int, estado: str) -> Any:
+    return client.put(f"/auth/users/{id_usuario}/estado", headers=auth_headers(admin), json={"estado": estado})
+
+def test_deactivation_invalidates_tokens_and_sessions(client: Any, login: Callable[..., Dict[str, Any]]) -> None:
+    admin = login(create_user()["username"])
+    user = create_user()
+    body = login(user["username"])
+    # El principal queda en caché (o en el mapa de versiones): desactivar debe invalidarlo
+    assert client.get("/auth/verify-token", headers=auth_headers(body)).status_code == 200
+
+    response = _set_status(client, admin, user["id_usuario"], "Inactivo")
+
+    assert response.status_code == 200, response.text
+    assert client.get("/auth/verify-token", headers=auth_headers(body)).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": body["refresh_token"]}).status_code == 401
+    login_inactive = client.post("/auth/login", json={"username": user["username"], "password": user["password"]})
+    assert login_inactive.status_code == 401
+
+    assert _set_status(client, admin, user["id_usuario"], "Activo").status_code == 200
+    renewed = login(user["username"])
+    assert client.get("/auth/verify-token", headers=auth_headers(renewed)).status_code == 200
+
+def test_only_administrators_change_status(client: Any, login: Callable[..., Dict[str, Any]]) -> None:
+    user = create_user()
+    body = login(user["username"])
+    veterinarian = login(user_for_role("Veterinario"))
+
+    assert _set_status(client, veterinarian, user["id_usuario"], "Inactivo").status_code == 403
+    assert client.get("/auth/verify-token", headers=auth_headers(body)).status_code == 200
+
+def test_unknown_user_or_unchanged_status(client: Any, login: Callable[..., Dict[str, Any]]) -> None:
+    admin = login(create_user()["username"])
+    user = create_user()
+
+    assert _set_status(client, admin, 999999, "Inactivo").status_code == 404
+    assert _set_status(client, admin, user["id_usuario"], "Activo").status_code == 404
+    assert _set_status(client, admin, user["id_usuario"], "Suspendido").status_code == 422